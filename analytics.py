@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, literal, select, union_all
+from models import db, LedgerEntry, ArchivedCashIn, ArchivedCashOut, Income, Expense
+from ledger import INCOME, EXPENSE
+from money import from_cents, to_cents, stored_cents
+
+# Integer codes of the ledger kinds in the kind array
+KIND_CODES = {INCOME: 0, EXPENSE: 1}
+
+def load_ledger_frame(user_id, start_date, end_date):
+    """
+    Load a user's CashIn and CashOut rows, archived ones included, between two dates into columnar arrays in one query.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+
+    Returns:
+        DataFrame: One row per transaction with the columns 'kind' (see KIND_CODES),
+            'day' (datetime64), 'cents' (int64) and 'category_id' (int64).
+    """
+    # The hot transactions come from one range scan of the unified ledger
+    selects = [select(
+        case((LedgerEntry.kind == INCOME, KIND_CODES[INCOME]), else_=KIND_CODES[EXPENSE]).label('kind'),
+        LedgerEntry.date.label('day'),
+        stored_cents(func.abs(LedgerEntry.amount)).label('cents'),
+        LedgerEntry.category_id.label('category_id')
+    ).where(LedgerEntry.user_id == user_id, LedgerEntry.date >= start_date, LedgerEntry.date <= end_date)]
+
+    # Archived transactions are read one by one as well, since the buckets split months by day
+    for kind, model, category_column in ((INCOME, ArchivedCashIn, 'income_id'), (EXPENSE, ArchivedCashOut, 'expense_id')):
+        selects.append(select(
+            literal(KIND_CODES[kind]).label('kind'),
+            model.date.label('day'),
+            stored_cents(model.amount).label('cents'),
+            getattr(model, category_column).label('category_id')
+        ).where(model.user_id == user_id, model.date >= start_date, model.date <= end_date))
+
+    rows = db.session.execute(union_all(*selects)).all()
+    kinds, days, cents, categories = zip(*rows) if rows else ((), (), (), ())
+
+    return pd.DataFrame({
+        'kind': np.array(kinds, dtype=np.int8),
+        'day': np.array(days, dtype='datetime64[D]'),
+        'cents': np.array(cents, dtype=np.int64),
+        'category_id': np.array(categories, dtype=np.int64)
+    })
+
+def summarize_ledger_frame(frame, start_date, end_date, buckets=()):
+    """
+    Compute totals, per-category totals and bucket totals from a ledger frame.
+
+    Args:
+        frame (DataFrame): A frame returned by load_ledger_frame.
+        start_date (date): The start date of the totals (inclusive).
+        end_date (date): The end date of the totals (inclusive).
+        buckets (list, optional): (start_date, end_date) tuples for which expenses are summed.
+
+    Returns:
+        dict: A dictionary with the keys 'total_income', 'total_expense' and 'balance' (Decimal),
+            'income_by_category' and 'expense_by_category' (category ID to Decimal, in category ID
+            order) and 'expense_buckets' (a list of Decimal, in the order of the buckets).
+    """
+    days = frame['day'].to_numpy()
+    kinds = frame['kind'].to_numpy()
+    cents = frame['cents'].to_numpy()
+
+    in_range = (days >= np.datetime64(start_date, 'D')) & (days <= np.datetime64(end_date, 'D'))
+    is_expense = kinds == KIND_CODES[EXPENSE]
+
+    # Per-category sums; the kind and category columns are the group keys
+    grouped = frame[in_range].groupby(['kind', 'category_id'], sort=True)['cents'].sum()
+    by_category = {KIND_CODES[INCOME]: {}, KIND_CODES[EXPENSE]: {}}
+    for (kind, category_id), category_cents in grouped.items():
+        by_category[kind][int(category_id)] = from_cents(category_cents)
+
+    total_income = int(cents[in_range & ~is_expense].sum())
+    total_expense = int(cents[in_range & is_expense].sum())
+
+    # Expense buckets, a day is counted in every bucket containing it, so overlapping buckets share days
+    bucket_cents = np.zeros(len(buckets), dtype=np.int64)
+    for index, (bucket_start, bucket_end) in enumerate(buckets):
+        in_bucket = is_expense & (days >= np.datetime64(bucket_start, 'D')) & (days <= np.datetime64(bucket_end, 'D'))
+        bucket_cents[index] = cents[in_bucket].sum()
+
+    return {
+        'total_income': from_cents(total_income),
+        'total_expense': from_cents(total_expense),
+        'balance': from_cents(total_income - total_expense),
+        'income_by_category': by_category[KIND_CODES[INCOME]],
+        'expense_by_category': by_category[KIND_CODES[EXPENSE]],
+        'expense_buckets': [from_cents(value) for value in bucket_cents]
+    }
+
+def dashboard_analytics(user_id, start_date, end_date, buckets=()):
+    """
+    Compute everything the dashboard and its charts need from a single fetch of the ledger.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the totals (inclusive).
+        end_date (date): The end date of the totals (inclusive).
+        buckets (list, optional): (start_date, end_date) tuples for which expenses are summed.
+
+    Returns:
+        dict: See summarize_ledger_frame.
+    """
+    first_day = min([start_date] + [bucket_start for bucket_start, _ in buckets])
+    last_day = max([end_date] + [bucket_end for _, bucket_end in buckets])
+
+    frame = load_ledger_frame(user_id, first_day, last_day)
+    return summarize_ledger_frame(frame, start_date, end_date, buckets)
+
+def expense_shares(expense_by_category, total_income):
+    """
+    Calculate the percentage of income taken by each expense category.
+
+    Args:
+        expense_by_category (dict): Category IDs mapped to their totals, as returned by dashboard_analytics.
+        total_income (Decimal): The total income of the same range.
+
+    Returns:
+        list: Dictionaries with the keys 'expense_id', 'expense_name', 'total_amount' and 'percentage',
+            sorted by percentage in descending order.
+    """
+    category_ids = np.array(sorted(expense_by_category), dtype=np.int64)
+    names = dict(db.session.query(Expense.id, Expense.name).filter(Expense.id.in_(category_ids.tolist())).all()) if len(category_ids) else {}
+
+    # Rank on the integer cents, ties keep category ID order
+    cents = np.array([to_cents(expense_by_category[category_id]) for category_id in category_ids.tolist()], dtype=np.int64)
+    order = np.argsort(-cents if total_income > 0 else np.zeros_like(cents), kind='stable')
+
+    shares = []
+    for index in order:
+        category_id = int(category_ids[index])
+        total_amount = expense_by_category[category_id]
+        shares.append({
+            'expense_id': category_id,
+            'expense_name': names.get(category_id),
+            'total_amount': total_amount,
+            'percentage': (total_amount / total_income) * 100 if total_income > 0 else 0
+        })
+
+    return shares
+
+def top_expense_chart(shares, limit=6):
+    """
+    Build the labels and values of the expense chart: the largest categories plus 'Others'.
+
+    Args:
+        shares (list): The output of expense_shares.
+        limit (int, optional): The number of categories shown on their own. Defaults to 6.
+
+    Returns:
+        tuple: (labels, values) lists.
+    """
+    top = shares[:limit]
+    others = sum(share['percentage'] for share in shares[limit:])
+
+    labels = [share['expense_name'] for share in top] + ['Others']
+    values = [share['percentage'] for share in top] + [others]
+    return labels, values
+
+def income_category_totals(user_id, income_by_category):
+    """
+    Map a user's income category names to their totals, 0 for categories without transactions.
+
+    Args:
+        user_id (int): The user's ID.
+        income_by_category (dict): Category IDs mapped to their totals, as returned by dashboard_analytics.
+
+    Returns:
+        dict: A dictionary mapping income category names to their total amounts.
+    """
+    return {
+        category.name: income_by_category.get(category.id, 0)
+        for category in Income.query.filter_by(user_id=user_id).all()
+    }
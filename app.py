@@ -1,15 +1,37 @@
 from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, abort
 from auth import register_user, authenticate_user
 from forms import RegistrationForm, LoginForm, IncomeCategoryForm, IncomeTransactionForm
-from models import db, initialize_default_income_types, User, Income, IncomeType, Credit, CashIn, Expense, Debt, CashOut, Budget, BudgetExpense, DebtorPayment, CreditorPayment
+from models import db, initialize_default_income_types, User, IncomeType, Credit, CashIn, Expense, Debt, CashOut, Budget, BudgetExpense, RecurringTransaction, Job
 from flask_login import login_required, logout_user, LoginManager, login_user, current_user
-from transactions import add_income, add_cash_in_transaction, calculate_income_totals, add_expense, calculate_expense_totals, add_cash_out_transaction, calculate_income_totals_formatted_debt, create_budget
+from transactions import add_income, add_cash_in_transaction, add_expense, calculate_expense_totals_formatted_credit, add_cash_out_transaction, calculate_income_totals_formatted_debt, create_budget
 from datetime import date, datetime, timedelta
-from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates, calculate_expense_percentage_of_income
+from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates
+from rollups import rebuild_rollups
+from balance_index import rebuild_balance_index
+from totals import reconcile_user_totals
+from cache import result_cache
+from money import parse_amount, format_money, migrate_amounts_to_cents
+from indexes import create_missing_indexes
+from summaries import last_periods, period_summaries
+from analytics import dashboard_analytics, expense_shares, top_expense_chart, income_category_totals
+from bulk import bulk_add_transactions, bulk_update_transactions, bulk_delete_transactions
+from importer import DEFAULT_DATE_FORMAT, import_statement
+from categories import get_category_name, find_category, get_category, user_categories
+from ledger import INCOME, EXPENSE
+from budgets import month_spending, rebuild_budget_spend
+from settlements import SettlementNotFound, settle_credit_payment, settle_debt_payment, reconcile_settlements
+from jobs import job_task, enqueue_job, job_status, run_pending_jobs, run_worker_pool
+from recurring import create_recurring_transaction, materialize_recurring, user_recurring_transactions, due_count, MAX_INLINE_OCCURRENCES
+from archive import ARCHIVE_HORIZON_MONTHS, archive_transactions
+from entries import install_ledger_triggers, install_missing_ledger_triggers, rebuild_ledger_entries, query_ledger_entries
+from projections import category_transactions, user_credits, user_debts, serialize_transaction
+from loading import eager
 from sqlalchemy import func
 from titlecase import titlecase
 from decimal import Decimal
 import os
+import uuid
+import click
 from dotenv import load_dotenv
 import pymysql
 from flask_migrate import Migrate
@@ -33,6 +55,9 @@ login_manager.init_app(app)
 
 migrate = Migrate(app, db, render_as_batch=True)
 
+# Templates format amounts as {{ amount|money }}
+app.add_template_filter(format_money, 'money')
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -129,21 +154,34 @@ def logout():
 
 @app.route('/chart_data', methods=['POST'])
 def chart_data():
-    # Expense Chart
-    expense_percentages = calculate_expense_percentage_of_income(current_user.id)
+    today = date.today()
+    start_date = date(today.year, today.month, 1)
 
-    # Sort the expenses by percentage in descending order
-    expense_percentages.sort(key=lambda x: x['percentage'], reverse=True)
+    # Calculate the end dates for each week
+    end_date1 = start_date + timedelta(days=6)
+    end_date2 = start_date + timedelta(days=13)
+    end_date3 = start_date + timedelta(days=20)
+    end_date4 = start_date + timedelta(days=27)
 
-    # Extract the top 6 expenses and their percentages
-    top_expenses = expense_percentages[:6]
+    # Load the month's transactions once and compute every total, share and weekly bucket from them
+    analytics = dashboard_analytics(
+        current_user.id,
+        start_date,
+        today,
+        [
+            (start_date, end_date1),
+            (end_date1 + timedelta(days=1), end_date2),
+            (end_date2 + timedelta(days=1), end_date3),
+            (end_date3 + timedelta(days=1), end_date4),
+        ]
+    )
 
-    # Calculate the total percentage of the remaining expenses
-    remaining_percentage = sum(expense['percentage'] for expense in expense_percentages[6:])
+    # Expense Chart
+    # Expenses as a percentage of income, sorted in descending order
+    expense_percentages = expense_shares(analytics['expense_by_category'], analytics['total_income'])
 
-    # Create labels and values for the chart
-    labels = [expense['expense_name'] for expense in top_expenses] + ['Others']
-    values = [expense['percentage'] for expense in top_expenses] + [remaining_percentage]
+    # The top 6 expenses and the total percentage of the remaining ones
+    labels, values = top_expense_chart(expense_percentages)
 
     colors = ['#ffb65d', '#465bca', '#9d3171', '#3eeed0', '#ff5497', '#309a6a', '#141c33']
     expense_chart_data = {
@@ -153,23 +191,13 @@ def chart_data():
     }
 
     # Income chart
-    # Query the contribution of each category to the user's total income
-    income_totals = calculate_income_totals(current_user.id)
+    # The contribution of each category to the user's total income
+    income_totals = income_category_totals(current_user.id, analytics['income_by_category'])
 
-    today = date.today()
-    start_date = date(today.year, today.month, 1)
-    end_date = date.today()
+    end_date = today
 
     # Sum the amount for the current user's credits settled since the beginning of the month
-    total_amount_paid = db.session.query(func.sum(CashIn.amount)).filter(
-        CashIn.income_id==2,
-        CashIn.user_id == current_user.id,
-        CashIn.date >= start_date,
-        CashIn.date <= end_date
-    ).scalar()
-
-    if total_amount_paid is None:
-        total_amount_paid = 0 
+    total_amount_paid = analytics['income_by_category'].get(2, 0)
 
     # Sum the debt taken the beginning of the month
     total_amount_taken = db.session.query(func.sum(Debt.amount)).filter(
@@ -209,39 +237,7 @@ def chart_data():
         income_values.append(percentage)
 
     # Cash Out trend chart
-    today = date.today()
-    start_date = date(today.year, today.month, 1)
-
-    # Calculate the end dates for each week
-    end_date1 = start_date + timedelta(days=6)
-    end_date2 = start_date + timedelta(days=13)
-    end_date3 = start_date + timedelta(days=20)
-    end_date4 = start_date + timedelta(days=27)
-
-    # Calculate the total cash-out for each week
-    total_cash_out1 = db.session.query(func.sum(CashOut.amount)).filter(
-        CashOut.user_id == current_user.id,
-        CashOut.date >= start_date,
-        CashOut.date <= end_date1
-    ).scalar()
-
-    total_cash_out2 = db.session.query(func.sum(CashOut.amount)).filter(
-        CashOut.user_id == current_user.id,
-        CashOut.date >= end_date1 + timedelta(days=1),
-        CashOut.date <= end_date2
-    ).scalar()
-
-    total_cash_out3 = db.session.query(func.sum(CashOut.amount)).filter(
-        CashOut.user_id == current_user.id,
-        CashOut.date >= end_date2 + timedelta(days=1),
-        CashOut.date <= end_date3
-    ).scalar()
-
-    total_cash_out4 = db.session.query(func.sum(CashOut.amount)).filter(
-        CashOut.user_id == current_user.id,
-        CashOut.date >= end_date3 + timedelta(days=1),
-        CashOut.date <= end_date4
-    ).scalar()
+    total_cash_out1, total_cash_out2, total_cash_out3, total_cash_out4 = analytics['expense_buckets']
 
     cash_out_labels = [f"Week 1",
                        f"Week 2",
@@ -278,16 +274,14 @@ def dashboard():
 
         user = User.query.get(user_id).first_name
 
-        # Calculate total income and individual income transactions for the current month
-        total_income, income_transactions = calculate_total_income_between_dates(user_id)
+        # Income and expense transactions for the current month, sorted by date by the database
+        today = date.today()
+        all_transactions = query_ledger_entries(user_id, date(today.year, today.month, 1), today)
 
-        # Calculate total expenses and individual expense transactions for the current month
-        total_expenses, expense_transactions = calculate_total_expenses_between_dates(user_id)
+        # Total income and expenses from the same rows, the current month is never archived
+        total_income = sum((transaction['amount'] for transaction in all_transactions if transaction['type'] == 'Income'), Decimal('0.00'))
+        total_expenses = sum((transaction['amount'] for transaction in all_transactions if transaction['type'] == 'Expense'), Decimal('0.00'))
 
-        # Merge income and expense transactions, and sort them by date
-        all_transactions = income_transactions + expense_transactions
-        all_transactions.sort(key=lambda x: x['date'])
-        
         # Calculate total balance
         total_balance = total_income - total_expenses
 
@@ -300,6 +294,153 @@ def dashboard():
     else:
         return redirect(url_for('login'))
 
+@app.route('/period_summary', methods=['GET', 'POST'])
+@login_required
+def period_summary():
+    """
+    Summarize income, expense and savings per period for trend charts.
+
+    GET takes 'unit' (week, month or quarter, default month) and 'count' (default 12) and covers the
+    last periods up to the current one, at most summaries.MAX_PERIODS. POST takes a JSON list of periods as
+    {"periods": [{"label": ..., "from": "yyyy-mm-dd", "to": "yyyy-mm-dd"}, ...]}; periods may overlap.
+
+    Returns:
+        JSON: A list of period summaries, oldest first.
+    """
+    try:
+        if request.method == 'POST':
+            periods = [
+                (
+                    period.get('label') or period['from'],
+                    datetime.strptime(period['from'], '%Y-%m-%d').date(),
+                    datetime.strptime(period['to'], '%Y-%m-%d').date()
+                )
+                for period in (request.get_json(silent=True) or {}).get('periods', [])
+            ]
+        else:
+            periods = last_periods(request.args.get('unit', 'month'), int(request.args.get('count', 12)))
+
+        summaries = period_summaries(current_user.id, periods)
+
+        for summary in summaries:
+            summary['start_date'] = summary['start_date'].strftime('%Y-%m-%d')
+            summary['end_date'] = summary['end_date'].strftime('%Y-%m-%d')
+
+        return jsonify({'periods': summaries}), 200
+
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/bulk_transactions', methods=['POST'])
+@login_required
+def bulk_transactions():
+    """
+    Add many income or expense transactions in one request.
+
+    Takes JSON as {"kind": "income" or "expense", "transactions": [{"amount": ..., "date": "yyyy-mm-dd",
+    "category_id": ..., "description": ..., "settled_id": ...}, ...]}. Invalid rows are reported by
+    their position and do not prevent the other rows from being added.
+
+    Returns:
+        JSON: The number of transactions added and the per-row errors.
+    """
+    payload = request.get_json(silent=True) or {}
+    rows = payload.get('transactions')
+
+    if not isinstance(rows, list):
+        return jsonify({'error': 'Expected a list of transactions'}), 400
+
+    try:
+        result = bulk_add_transactions(current_user.id, payload.get('kind'), rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
+
+@app.route('/bulk_edit_transactions', methods=['POST'])
+@login_required
+def bulk_edit_transactions():
+    """
+    Apply the same changes to many income or expense transactions in one request.
+
+    Takes JSON as {"kind": "income" or "expense", "ids": [...], "patch": {"category_id": ..., "date": "yyyy-mm-dd",
+    "amount": ..., "description": ...}}, with any subset of the patch keys.
+
+    Returns:
+        JSON: The number of transactions changed and the IDs that were not found.
+    """
+    payload = request.get_json(silent=True) or {}
+    ids, patch = payload.get('ids'), payload.get('patch')
+
+    if not isinstance(ids, list) or not isinstance(patch, dict):
+        return jsonify({'error': 'Expected a list of ids and a patch'}), 400
+
+    try:
+        result = bulk_update_transactions(current_user.id, payload.get('kind'), ids, patch)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
+
+@app.route('/bulk_delete_transactions', methods=['POST'])
+@login_required
+def bulk_delete_transactions_route():
+    """
+    Delete many income or expense transactions in one request.
+
+    Takes JSON as {"kind": "income" or "expense", "ids": [...]}.
+
+    Returns:
+        JSON: The number of transactions deleted and the IDs that were not found.
+    """
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids')
+
+    if not isinstance(ids, list):
+        return jsonify({'error': 'Expected a list of ids'}), 400
+
+    try:
+        result = bulk_delete_transactions(current_user.id, payload.get('kind'), ids)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
+
+@app.route('/import_statement', methods=['POST'])
+@login_required
+def import_statement_upload():
+    """
+    Queue the import of an uploaded CSV or OFX bank statement.
+
+    Takes the file as 'statement' and optionally 'format' (csv or ofx, guessed from the file name
+    otherwise) and, for CSV files, 'date_format'. The file is imported by a job worker; poll the
+    returned status URL for its progress and report.
+
+    Returns:
+        JSON: The ID and status URL of the import job.
+    """
+    statement = request.files.get('statement')
+    if statement is None:
+        return jsonify({'error': 'No statement file uploaded'}), 400
+
+    statement_format = request.form.get('format') or os.path.splitext(statement.filename or '')[1].lstrip('.').lower() or 'csv'
+    if statement_format not in ('csv', 'ofx'):
+        return jsonify({'error': "Unknown statement format '{}'".format(statement_format)}), 400
+
+    upload_folder = os.path.join(app.instance_path, 'uploads')
+    os.makedirs(upload_folder, exist_ok=True)
+    path = os.path.join(upload_folder, '{}.{}'.format(uuid.uuid4().hex, statement_format))
+    statement.save(path)
+
+    job = enqueue_job('import-statement', {
+        'user_id': current_user.id,
+        'path': path,
+        'statement_format': statement_format,
+        'date_format': request.form.get('date_format') or DEFAULT_DATE_FORMAT,
+    }, user_id=current_user.id)
+
+    return jsonify({'job_id': job.id, 'status_url': url_for('job_status_route', job_id=job.id)}), 202
+
 # Income Magement ------------------------------------------------------------------------
 @login_required
 @app.route('/income', methods=['GET', 'POST'])
@@ -320,35 +461,21 @@ def income():
             category_name = request.json.get('category_name')
             
 
-            # Find the income category ID for the given category name and current user
-            if   category_name == 'Debt':
-                income_category = Income.query.filter_by(user_id=1, name=category_name).first()
-            elif category_name == 'Settled Credit':
-                income_category = Income.query.filter_by(user_id=1, name=category_name).first()
-            else:
-                income_category = Income.query.filter_by(user_id=user_id, name=category_name).first()
+            # Find the income category ID for the given category name and current user ('Debt' and
+            # 'Settled Credit' are the shared system categories)
+            income_category = find_category(user_id, INCOME, category_name, include_system=True)
 
             if income_category:
                 income_category_id = income_category.id
 
-                # Query CashIn transactions for the specified income category ID and user ID
-                transactions = CashIn.query.filter_by(income_id=income_category_id, user_id=user_id).all()
-                
-                total = 0
-                # Extract the required fields from the transactions
-                transaction_data = []
-                for transaction in transactions:
-                    total += transaction.amount
-                    transaction_data.append({
-                        'id': transaction.id,
-                        'category': category_name,
-                        'amount': "{:,.2f}/=".format(float(transaction.amount)),
-                        'date': transaction.date.strftime('%Y-%m-%d'),
-                        'description': transaction.description
-                    })
+                # Read-only rows of the CashIn transactions for the specified income category ID and user ID
+                transactions = category_transactions(user_id, INCOME, income_category_id)
+
+                total = sum(transaction.amount for transaction in transactions)
+                transaction_data = [serialize_transaction(transaction, category_name) for transaction in transactions]
 
                 return jsonify({'transactions': transaction_data, 
-                                'total': "{:,.2f}/=".format(total)
+                                'total': format_money(total)
                                 }), 200
             
             else:
@@ -366,7 +493,7 @@ def income():
 
 
     # Query Income categories for the current user and Populate the incomeCategory field
-    income_categories = Income.query.filter_by(user_id=current_user.id).all()
+    income_categories = user_categories(current_user.id, INCOME)
     transaction_form.incomeCategory.choices = [(ic.id, ic.name) for ic in income_categories]
 
     # Calculates total income including debt
@@ -382,7 +509,7 @@ def income():
             'income_category_id': income['income_category_id'],
             'description': income['description'],
             'date': income['date'].strftime('%Y-%m-%d'),
-            'amount': "{:,.2f}/=".format(income['amount']),
+            'amount': format_money(income['amount']),
         }
         for income in individual_incomes
     ]
@@ -400,7 +527,7 @@ def income():
                            income_categories=income_categories, # form data
                            income_totals=income_totals, # card data
                            income_transactions=income_transactions, # Table
-                           total_income="{:,.2f}/=".format(total_income), # Summary
+                           total_income=format_money(total_income), # Summary
                            from_date=from_date_formatted, # summary
                            to_date=to_date_formatted)  # summary
 
@@ -457,10 +584,10 @@ def create_income_transaction():
     debtor = request.form.get('debtor')
     description = request.form.get('description')
 
-    # Convert income_category and amount to appropriate data types (e.g., int, float)
+    # Convert income_category and amount to appropriate data types (int, exact two-place Decimal)
     try:
         income_category = int(income_category)
-        amount = float(amount)
+        amount = parse_amount(amount)
     except ValueError:
         return jsonify({'error': 'Invalid data provided'}), 400
     
@@ -480,41 +607,28 @@ def create_income_transaction():
         if not credit_to_settle and income_category == 1:
             raise ValueError("No outstanding credit found for the specified debtor.")
 
-        # Call the add_cash_in_transaction function with the settled_credit_id
-        cash_in = add_cash_in_transaction(
-            user_id=user_id,
-            amount=amount,
-            date=date_obj,
-            income_id=income_category,
-            description=description,
-            settled_credit_id=credit_to_settle.id if credit_to_settle else None
-        )
-
         if credit_to_settle:
-            credit = Credit.query.filter_by(id=credit_to_settle.id, user_id=current_user.id).first()
-            if not credit:
-                return jsonify({"error": "Credit not found or unauthorized"}), 403
-
-            '''if credit.is_paid:
-                return jsonify({"error": "Credit is already paid"}), 400'''
-
-            payment = DebtorPayment(credit_id=credit.id, amount=amount, date=date_obj)
-            db.session.add(payment)
-
-            credit.amount_paid += Decimal(amount)
-
-            if credit.amount_paid >= credit.amount:
-                credit.is_paid = True
-
-            db.session.commit()
+            # Raise the paid amount in the database and record the payment and the cash in with it
+            try:
+                cash_in = settle_credit_payment(user_id, credit_to_settle.id, amount, date_obj, income_id=income_category, description=description).transaction
+            except SettlementNotFound as e:
+                return jsonify({"error": str(e)}), 403
+        else:
+            cash_in = add_cash_in_transaction(
+                user_id=user_id,
+                amount=amount,
+                date=date_obj,
+                income_id=income_category,
+                description=description
+            )
 
-        income_category_name = Income.query.get(income_category).name
+        income_category_name = get_category_name(user_id, INCOME, income_category)
         # Construct the JSON response with all required information
         response_data = {
             'message': 'Income transaction created successfully',
             'transaction_id': cash_in.id,
             'income_category_name': income_category_name,
-            'amount': "{:,.2f}/=".format(amount),
+            'amount': format_money(amount),
             'description': description,
             'date': date,
         }
@@ -539,8 +653,10 @@ def search_income_transactions():
         # Convert date strings to date objects with 'yyyy-mm-dd' format
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        # Archived transactions are listed as monthly totals unless detail=1
+        detail = request.args.get('detail') == '1'
 
-        total_income, individual_incomes = calculate_total_income_between_dates(user_id, start_date, end_date)
+        total_income, individual_incomes = calculate_total_income_between_dates(user_id, start_date, end_date, detail)
         income_totals = calculate_income_totals_formatted_debt(user_id, start_date, end_date)
 
         response_data = {
@@ -596,7 +712,7 @@ def edit_income_transaction():
     if not transaction:
         return jsonify({'error': 'Transaction not found.'}), 404
 
-    category = Income.query.get(new_category_id)
+    category = get_category(current_user.id, INCOME, new_category_id)
     if not category:
         return jsonify({'error': 'Income category not found.'}), 404
 
@@ -608,13 +724,13 @@ def edit_income_transaction():
         db.session.rollback()
         return jsonify({'error': 'Error editing the transaction.'}), 500
 
-    new_category_name = Income.query.get(transaction.income_id).name
+    new_category_name = get_category_name(current_user.id, INCOME, transaction.income_id)
 
     # Return the edited transaction details in the response
     edited_transaction = {
         'transaction_id': transaction.id,
         'new_date': transaction.date.strftime('%Y-%m-%d'),
-        'new_amount': "{:,.2f}/=".format(transaction.amount),
+        'new_amount': format_money(transaction.amount),
         'new_description': transaction.description,
         'new_category_id': transaction.income_id,
         'new_category_name': new_category_name,
@@ -657,59 +773,10 @@ def expense():
     if request.method == 'GET':
 
         # Query Income categories for the current user
-        expense_categories = Expense.query.filter_by(user_id=current_user.id).all()
-
-        # Query the contribution of each category to the user's total expense
-        expense_totals = calculate_expense_totals(current_user.id)
-
-        '''
-        Include credit and settled debt as categories that take out Income
-        '''
-        today = date.today()
-        start_date = date(today.year, today.month, 1)
-        end_date = date.today()
-
-        # settled debt amount
-        total_amount_paid = db.session.query(func.sum(Debt.amount_payed)).filter(
-            Debt.user_id == current_user.id,
-            Debt.date_taken >= start_date,
-            Debt.date_taken <= end_date
-        ).scalar()
-
-        if total_amount_paid is None:
-            total_amount_paid = 0 
-
-        # credit given amount
-        total_amount_given = db.session.query(func.sum(Credit.amount)).filter(
-            Credit.user_id == current_user.id,
-            Debt.date_taken >= start_date,
-            Debt.date_taken <= end_date
-        ).scalar()
-
-        if total_amount_given is None:
-            total_amount_given = 0 
-
-        expense_totals['Settled Debt'] = total_amount_paid
-        expense_totals['Credit'] = total_amount_given
-    
-
-        # Initialize a dictionary to store formatted amounts and percentages
-        formatted_expense_totals = {}
+        expense_categories = user_categories(current_user.id, EXPENSE)
 
-        # Calculate the total income
-        total_expense = sum(expense_totals.values())
-
-        # Format the amount values and update the income_totals dictionary
-        for category, amount in expense_totals.items():
-            formatted_amount = "{:,.2f}/=".format(amount)
-            try:
-                percentage = "{:.2f}".format((amount / total_expense) * 100)
-            except:
-                percentage = "{:.2f}".format(0)
-            formatted_expense_totals[category] = (formatted_amount, percentage)
-
-        # Replace the original income_totals dictionary with the formatted one
-        expense_totals = formatted_expense_totals
+        # The contribution of each category, credit given and settled debt included, to the user's total expense
+        expense_totals = calculate_expense_totals_formatted_credit(current_user.id)
 
         # Call the calculate_total_income_between_dates function
         total_expenses, individual_expenses = calculate_total_expenses_between_dates(current_user.id)
@@ -722,7 +789,7 @@ def expense():
                 'expense_category_id': exp['expense_category_id'],
                 'description': exp['description'],
                 'date': exp['date'].strftime('%Y-%m-%d'),
-                'amount': "{:,.2f}/=".format(exp['amount']), 
+                'amount': format_money(exp['amount']), 
             }
             for index, exp in enumerate(individual_expenses)
         ]
@@ -738,7 +805,7 @@ def expense():
                                expense_categories = expense_categories,
                                expense_totals = expense_totals,
                                expense_transactions = expense_transactions, 
-                               total_expenses = "{:,.2f}/=".format(total_expenses),
+                               total_expenses = format_money(total_expenses),
                                from_date=from_date_formatted,
                                to_date=to_date_formatted
                                )
@@ -752,13 +819,9 @@ def expense():
 
             user_id = current_user.id
 
-            # Find the expense category ID for the given category name and current user
-            if   category_name == 'Credit':
-                expense_category = Expense.query.filter_by(user_id=1, name=category_name).first()
-            elif   category_name == 'Settled Debt':
-                expense_category = Expense.query.filter_by(user_id=1, name=category_name).first()
-            else:
-                expense_category = Expense.query.filter_by(user_id=user_id, name=category_name).first()
+            # Find the expense category ID for the given category name and current user ('Credit' and
+            # 'Settled Debt' are the shared system categories)
+            expense_category = find_category(user_id, EXPENSE, category_name, include_system=True)
 
             if expense_category:
                 if category_name == 'Credit':
@@ -767,25 +830,14 @@ def expense():
                 else:
                     expense_category_id = expense_category.id
 
-                # Query CashOut transactions for the specified expense category ID and user ID
-                transactions = CashOut.query.filter_by(expense_id=expense_category_id, user_id=user_id).all()
+                # Read-only rows of the CashOut transactions for the specified expense category ID and user ID
+                transactions = category_transactions(user_id, EXPENSE, expense_category_id)
 
-                total_expenses = 0
-
-                # Extract the required fields from the transactions
-                transaction_data = []
-                for transaction in transactions:
-                    transaction_data.append({
-                        'id': transaction.id,
-                        'category': category_name,
-                        'amount': "{:,.2f}/=".format(float(transaction.amount)),
-                        'date': transaction.date.strftime('%Y-%m-%d'),
-                        'description': transaction.description
-                    })
-                    total_expenses += transaction.amount
+                total_expenses = sum(transaction.amount for transaction in transactions)
+                transaction_data = [serialize_transaction(transaction, category_name) for transaction in transactions]
 
                 return jsonify({'transactions': transaction_data,
-                                'total_expenses':"{:,.2f}/=".format(total_expenses)
+                                'total_expenses': format_money(total_expenses)
                                 })
             
             else:
@@ -830,10 +882,10 @@ def create_expense_transaction():
     creditor = request.form.get('creditor')
     description = request.form.get('description')
 
-    # Convert income_category and amount to appropriate data types (e.g., int, float)
+    # Convert expense_category and amount to appropriate data types (int, exact two-place Decimal)
     try:
         expense_category = int(expense_category)
-        amount = float(amount)
+        amount = parse_amount(amount)
     except ValueError:
         return jsonify({'error': 'Invalid data provided'}), 400
     
@@ -847,26 +899,7 @@ def create_expense_transaction():
     try:
         user_id = current_user.id
 
-        # Check if the budget for the current month and year exists
-        current_month = datetime.now().month
-        current_year = datetime.now().year
- 
-        current_budget = Budget.query.filter_by(user_id=user_id, month=current_month, year=current_year).first()
-
-        if current_budget:
-            # Check if the expense is listed in the current month's BudgetExpense
-            budget_expense = BudgetExpense.query.filter_by(budget_id=current_budget.id, expense_id=expense_category).first()
-            if budget_expense:
-                print('Budget Expense before transaction', budget_expense.spent_amount)
-                try:
-                    amount = int(amount) if amount else 0.0
-                    budget_expense.update_spent_amount(amount)
-                    db.session.commit()
-                    print('Budget Expense after transaction', budget_expense.spent_amount)
-                except Exception as e:
-                    print('Budget Expense not updated')
-                    db.session.rollback() 
-
+        # The spending is added to the budget of the transaction's month in the same commit (see budgets.py)
         # Call the add_cash_out_transaction function with the settled_credit_id
         cash_out = add_cash_out_transaction(
             user_id=user_id,
@@ -876,14 +909,14 @@ def create_expense_transaction():
             description=description,
         )
 
-        expense_category_name = Expense.query.get(expense_category).name
+        expense_category_name = get_category_name(user_id, EXPENSE, expense_category)
 
         # Construct the JSON response with all required information
         response_data = {
             'message': 'Expense transaction created successfully',
             'transaction_id': cash_out.id,
             'expense_category_name': expense_category_name,
-            'amount': "{:,.2f}/=".format(amount),
+            'amount': format_money(amount),
             'description': description,
             'date': date,
         }
@@ -912,63 +945,15 @@ def search_expense_transactions():
         # Convert date strings to date objects with 'yyyy-mm-dd' format
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        # Archived transactions are listed as monthly totals unless detail=1
+        detail = request.args.get('detail') == '1'
 
         total_expense, individual_expenses = calculate_total_expenses_between_dates(
-            user_id, start_date, end_date
+            user_id, start_date, end_date, detail
         )
 
-        # Query the contribution of each category to the user's total expense
-        expense_totals = calculate_expense_totals(current_user.id, start_date, end_date)
-
-        '''
-        Include credit as a category that contributes to expense
-        '''
-        # Sum the credit given in the date period
-        total_amount_given = db.session.query(func.sum(Credit.amount)).filter(
-            Credit.user_id == user_id,
-            Credit.date_taken >= start_date,
-            Credit.date_taken <= end_date
-        ).scalar()
-
-        if total_amount_given is None:
-            total_amount_given = 0
-
-        # Add the total_credit_amount to the expense_totals dictionary with 'Credit' as the key
-        expense_totals['Credit'] = total_amount_given
-
-        '''
-        Include settled debt as a category that contributes to expense
-        '''
-        total_amount_paid = db.session.query(func.sum(CashOut.amount)).filter(
-            CashOut.expense_id==2,
-            CashOut.user_id == user_id,
-            CashOut.date >= start_date,
-            CashOut.date <= end_date
-        ).scalar()
-
-        if total_amount_paid is None:
-            total_amount_paid = 0 
-        
-        expense_totals['Settled Debt'] = total_amount_paid
-    
-
-        # Initialize a dictionary to store formatted amounts and percentages
-        formatted_expense_totals = {}
-
-        # Calculate the total income
-        total_expense = sum(expense_totals.values())
-
-        # Format the amount values and update the expense_totals dictionary
-        for category, amount in expense_totals.items():
-            formatted_amount = "{:,.2f}/=".format(amount)
-            try:
-                percentage = "{:.2f}".format((amount / total_expense) * 100)
-            except:
-                percentage = "{:.2f}".format(0)
-            formatted_expense_totals[category] = (formatted_amount, percentage)
-
-        # Replace the original expense_totals dictionary with the formatted one
-        expense_totals = formatted_expense_totals
+        # The contribution of each category, credit given and settled debt included, to the user's total expense
+        expense_totals = calculate_expense_totals_formatted_credit(user_id, start_date, end_date)
 
         response_data = {
             'total_expense': str(total_expense),
@@ -993,7 +978,6 @@ def edit_expense_transaction():
     new_amount = data.get('new_amount')
     new_description = data.get('new_description')
     expense_id = data.get('expense_id')
-    amount_diff = data.get('amount_diff')
 
     # Check if all required fields are provided
     if not (new_date_str and new_amount):
@@ -1023,38 +1007,8 @@ def edit_expense_transaction():
     if not transaction:
         return jsonify({'error': 'Transaction not found.'}), 404
     
-    # Extract month and year from the new date
-    new_month = get_month_name(new_date.month)
-    new_year = new_date.year
-
-    # Find the current user's budget for the same month and year, if it exists
-    budget = Budget.query.filter_by(
-        user_id=current_user.id,
-        month=new_month,
-        year=new_year
-    ).first()
-
-    if budget:
-        # Find the BudgetExpense entry with the same budget and expense_id
-        budget_expense = BudgetExpense.query.filter_by(
-            budget_id=budget.id,
-            expense_id=expense_id
-        ).first()
- 
-        if budget_expense:
-            try:     
-                # Update the spent amount in BudgetExpense using the amount_diff
-                if amount_diff < 0:
-                    budget_expense.spent_amount -= abs(amount_diff)
-                elif amount_diff > 0:
-                    budget_expense.update_spent_amount(amount_diff)
-                db.session.commit()
-
-            except Exception as e:
-                db.session.rollback()
-                return jsonify({'error': 'Error updating the spent amount in BudgetExpense.'}), 500
-
-    # Perform the edit operation on the transaction using the CashOut model
+    # Perform the edit operation on the transaction using the CashOut model; the spending moves
+    # between the old and the new budget expense in the same commit (see budgets.py)
     try:
         transaction.update_transaction(new_description, new_amount, new_date, int(expense_id))
         db.session.commit()
@@ -1062,12 +1016,12 @@ def edit_expense_transaction():
         db.session.rollback()
         return jsonify({'error': 'Error editing the transaction.'}), 500
     
-    new_category_name = Expense.query.get(transaction.expense_id).name
+    new_category_name = get_category_name(current_user.id, EXPENSE, transaction.expense_id)
     # Return the edited transaction details in the response
     edited_transaction = {
         'transaction_id': transaction.id,
         'new_date': transaction.date.strftime('%Y-%m-%d'),
-        'new_amount': "{:,.2f}/=".format(transaction.amount),
+        'new_amount': format_money(transaction.amount),
         'new_description': transaction.description,
         'new_category_id': transaction.expense_id,
         'new_category_name': new_category_name,
@@ -1092,32 +1046,8 @@ def delete_expense_transaction():
         return jsonify({'error': 'Transaction not found.'}), 404
 
     try:
-        # Check if the transaction is associated with a budget
-        if transaction.date and transaction.expense_id:
-            # Extract the month and year from the transaction's date
-            transaction_month = transaction.date.month
-            transaction_year = transaction.date.year
-
-            # Find the corresponding budget
-            budget = Budget.query.filter_by(
-                user_id=current_user.id,
-                month=transaction_month,
-                year=transaction_year
-            ).first()
-
-            if budget:
-                # Find the BudgetExpense entry with the same budget and expense_id
-                budget_expense = BudgetExpense.query.filter_by(
-                    budget_id=budget.id,
-                    expense_id=transaction.expense_id
-                ).first()
-
-                if budget_expense:
-                    # Subtract the transaction amount from spent_amount
-                    budget_expense.spent_amount -= transaction.amount
-                    db.session.commit()
-
-        # Use the CashOut model method to delete the transaction
+        # Use the CashOut model method to delete the transaction; its spending is taken off
+        # the budget in the same commit (see budgets.py)
         transaction.delete_transaction()
     except Exception as e:
         db.session.rollback()
@@ -1167,15 +1097,14 @@ def budget():
     # Query for all expenses for the current user
     expenses = Expense.query.filter_by(user_id=user_id).all()
 
-    # Query for all budgets created by the user
-    budgets = Budget.query.filter_by(user_id=user_id).all()
+    # Query for all budgets created by the user, with their expenses and the expense categories
+    budgets = Budget.query.filter_by(user_id=user_id).options(eager(Budget.expenses, BudgetExpense.expense)).all()
 
     budget_with_totals = []
 
     # Calculate total expected and actual amounts for each budget
     for budget in budgets:
-        # Query for budget expenses associated with the current budget
-        budget_expenses = BudgetExpense.query.filter_by(budget_id=budget.id).all()
+        budget_expenses = budget.expenses
 
         total_expected_amount = sum(budget_expense.expected_amount for budget_expense in budget_expenses)
         total_actual_amount = sum(budget_expense.spent_amount for budget_expense in budget_expenses)
@@ -1189,38 +1118,20 @@ def budget():
             'total_actual_amount': total_actual_amount
         })
 
-    current_budget = Budget.query.filter_by(user_id=user_id, year=current_year, month=current_month).first()
+    current_budget = next((budget for budget in budgets if budget.year == current_year and budget.month == current_month), None)
 
     budget_expenses_with_names = []
     current_total_expected_amount = 0
     current_total_actual_amount = 0
     expense_count = 0
 
-    # If a current budget exists, query for its expenses and join with expense names
+    # If a current budget exists, list its expenses with their (already loaded) expense names
     if current_budget:
-        # Calculate the start and end dates for the current month
-        start_date = date(current_year, current_month, 1)
-        end_date = date.today()
-        budget_expenses = BudgetExpense.query.filter_by(budget_id=current_budget.id).all()
-        
-        # Join budget expenses with expense names
+        budget_expenses = current_budget.expenses
+
         for budget_expense in budget_expenses:
             expense_count += 1
-            expense = Expense.query.get(budget_expense.expense_id)
-            total_spent_amount = db.session.query(func.sum(CashOut.amount)).filter(
-                CashOut.user_id == user_id,
-                CashOut.expense_id == expense.id,
-                CashOut.date >= start_date,
-                CashOut.date <= end_date
-            ).scalar()
-
-            # Update the spent amount for the BudgetExpense
-            if budget_expense.spent_amount == 0:
-                amt = total_spent_amount if total_spent_amount else 0.0
-                budget_expense.update_spent_amount(amt)
-                db.session.commit()
-
-            budget_expense=BudgetExpense.query.get(budget_expense.id)
+            expense = budget_expense.expense
             budget_expenses_with_names.append({
                 'id': budget_expense.id,
                 'budget_id': budget_expense.budget_id,
@@ -1271,21 +1182,24 @@ def create_budget_expense():
         if not expense_id or not budgetId or expected_amount is None or expected_amount < 0:
             return jsonify({'error': 'Invalid data'}), 400
 
-        # Create a new BudgetExpense record
+        budget = Budget.query.filter_by(id=budgetId, user_id=current_user.id).first()
+        if not budget:
+            return jsonify({'error': 'Budget not found'}), 404
+
+        # Create a new BudgetExpense record, starting from what was already spent that month
         budget_expense = BudgetExpense(
             budget_id=budgetId,
             expense_id=expense_id,
             expected_amount=expected_amount,
-            spent_amount=0.0
+            spent_amount=month_spending(current_user.id, budget.year, budget.month, expense_id)
         )
 
         # Add the new budget expense to the database and commit the transaction
         db.session.add(budget_expense)
         db.session.commit()
 
-        # Get the related expense and budget information
-        expense = Expense.query.get(expense_id)
-        budget = Budget.query.get(budgetId)
+        # Get the related expense information
+        expense = get_category(current_user.id, EXPENSE, expense_id)
 
         # Prepare the JSON response with additional data
         response_data = {
@@ -1294,8 +1208,8 @@ def create_budget_expense():
             'expense_name': expense.name,
             'budget_id': budget.id,
             'budget_expense_id': budget_expense.id,
-            'expected_amount': "{:,.2f}/=".format(budget_expense.expected_amount),
-            'actual_amount': "{:,.2f}/=".format(0.00)
+            'expected_amount': format_money(budget_expense.expected_amount),
+            'actual_amount': format_money(budget_expense.spent_amount)
         }
 
         # Return the JSON response
@@ -1309,13 +1223,12 @@ def create_budget_expense():
 @login_required
 def search_budget_expenses(budget_id):
     try:
-        # Check if the budget exists
-        budget = Budget.query.get(budget_id)
+        # Check if the budget exists, loading its expenses and their categories with it
+        budget = Budget.query.filter_by(id=budget_id).options(eager(Budget.expenses, BudgetExpense.expense)).first()
         if not budget:
             return jsonify({'error': 'Budget not found'}), 404
 
-        # Query for BudgetExpense records associated with the budget ID
-        budget_expenses = BudgetExpense.query.filter_by(budget_id=budget_id).all()
+        budget_expenses = budget.expenses
 
         # Calculate the sum of expected and spent amounts
         total_expected_amount = sum(expense.expected_amount for expense in budget_expenses)
@@ -1330,10 +1243,10 @@ def search_budget_expenses(budget_id):
                 'id': expense.id,
                 'budget_id': expense.budget_id,
                 'expense_id': expense.expense_id,
-                'expected_amount':  "{:,.2f}/=".format(expense.expected_amount),
-                'spent_amount':  "{:,.2f}/=".format(expense.spent_amount),
+                'expected_amount':  format_money(expense.expected_amount),
+                'spent_amount':  format_money(expense.spent_amount),
                 'percentage': "{:.2f}".format((expense.spent_amount / expense.expected_amount) * 100),
-                'expense_name': Expense.query.get(expense.expense_id).name  # Get the expense name
+                'expense_name': expense.expense.name
             })
 
         if isinstance(budget.month, int):
@@ -1362,13 +1275,14 @@ def search_budget_by_year_month():
     month = int(month)
     
     try:
-        # Query for the budget with the specified year and month
-        budget = Budget.query.filter_by(year=year, month=month, user_id=current_user.id).first()
+        # Query for the budget with the specified year and month, with its expenses and their categories
+        budget = Budget.query.filter_by(year=year, month=month, user_id=current_user.id).options(
+            eager(Budget.expenses, BudgetExpense.expense)
+        ).first()
         if not budget:
             return jsonify({'error': 'Budget not found for the specified year and month'}), 404
 
-        # Query for BudgetExpense records associated with the budget ID
-        budget_expenses = BudgetExpense.query.filter_by(budget_id=budget.id).all()
+        budget_expenses = budget.expenses
 
         # Calculate the sum of expected and spent amounts
         total_expected_amount = sum(expense.expected_amount for expense in budget_expenses)
@@ -1384,10 +1298,10 @@ def search_budget_by_year_month():
                 'budget_expense_id': expense.id,
                 'budget_id': expense.budget_id,
                 'expense_id': expense.expense_id,
-                'expected_amount': "{:,.2f}/=".format(expense.expected_amount),
-                'spent_amount':  "{:,.2f}/=".format(expense.spent_amount),
+                'expected_amount': format_money(expense.expected_amount),
+                'spent_amount':  format_money(expense.spent_amount),
                 'percentage': "{:.2f}".format((expense.spent_amount / expense.expected_amount) * 100),
-                'expense_name': Expense.query.get(expense.expense_id).name 
+                'expense_name': expense.expense.name
             })
 
         return jsonify({
@@ -1528,12 +1442,12 @@ def credit():
                 'id': new_credit.id,
                 'user_id': new_credit.user_id,
                 'debtor': new_credit.debtor,
-                'amount': "{:,.2f}/=".format(new_credit.amount),
+                'amount': format_money(new_credit.amount),
                 'date_taken': new_credit.date_taken.strftime('%Y-%m-%d'),
                 'date_due': new_credit.date_due.strftime('%Y-%m-%d') if new_credit.date_due else None,
                 'description': new_credit.description,
                 'is_paid': new_credit.is_paid,
-                'amount_paid': "{:,.2f}/=".format(new_credit.amount_paid)
+                'amount_paid': format_money(new_credit.amount_paid)
             }
 
             return jsonify(response_data), 201  # Return 201 status code for successful creation
@@ -1542,8 +1456,8 @@ def credit():
             # Handle errors and return an error response
             error_message = str(e)
             return jsonify({'error': error_message}), 400  # Return 400 status code for bad request
-    # Fetch all rows in the Credit model for the current user, ordered by date_taken
-    credits = Credit.query.filter_by(user_id=current_user.id).order_by(Credit.date_taken.desc()).all()
+    # Read-only rows of the current user's credits, ordered by date_taken
+    credits = user_credits(current_user.id)
     total_amount_paid = db.session.query(func.sum(Credit.amount_paid)).filter(
         Credit.user_id == current_user.id,
     ).scalar()
@@ -1569,45 +1483,26 @@ def settle_credit():
     try:
         data = request.json
         credit_id = int(data['creditId'])
-        amount_to_pay = data['amountToPay'] 
+        amount_to_pay = parse_amount(data['amountToPay'])
         date_paid_str = data['datePaid']
         date_paid = datetime.strptime(date_paid_str, '%Y-%m-%d').date() 
 
-        credit = Credit.query.filter_by(id=credit_id, user_id=current_user.id).first()
-
-        if not credit:
-            return jsonify({"error": "Credit not found or unauthorized"}), 403
-
-        if credit.is_paid:
-            return jsonify({"error": "Credit is already paid"}), 400
-
-        payment = DebtorPayment(credit_id=credit_id, amount=amount_to_pay, date=date_paid)
-        db.session.add(payment)
-
-        credit.amount_paid += amount_to_pay
-
-        if credit.amount_paid >= credit.amount:
-            credit.is_paid = True
-
-        # Create a CashIn transaction
-        cash_in = CashIn(
-            user_id=current_user.id,
-            income_id=2,
-            amount=amount_to_pay,
-            date=date_paid,
-            description="settling {}'s credit".format(credit.debtor), 
-            settled_credit_id=credit.id
-        )
-        db.session.add(cash_in)
-        db.session.commit()
+        # Raise the paid amount in the database and record the payment and the cash in with it
+        credit = settle_credit_payment(current_user.id, credit_id, amount_to_pay, date_paid).record
 
         progress = round((credit.amount_paid / credit.amount) * 100, 2) 
 
         return jsonify({
-            "amountPaid": "{:,.2f}/=".format(credit.amount_paid),
+            "amountPaid": format_money(credit.amount_paid),
             "progress": "{}%".format(progress),
         }), 200
 
+    except SettlementNotFound as e:
+        return jsonify({"error": str(e)}), 403
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -1671,12 +1566,12 @@ def debt():
                 'id': new_debt.id,
                 'user_id': new_debt.user_id,
                 'debtor': new_debt.creditor,
-                'amount': "{:,.2f}/=".format(new_debt.amount),
+                'amount': format_money(new_debt.amount),
                 'date_taken': new_debt.date_taken.strftime('%Y-%m-%d'),
                 'date_due': new_debt.date_due.strftime('%Y-%m-%d') if new_debt.date_due else None,
                 'description': new_debt.description,
                 'is_paid': new_debt.is_paid,
-                'amount_paid': "{:,.2f}/=".format(new_debt.amount_payed)
+                'amount_paid': format_money(new_debt.amount_payed)
             }
 
             return jsonify(response_data), 201
@@ -1686,8 +1581,8 @@ def debt():
             error_message = str(e)
             return jsonify({'error': error_message}), 400 
          
-    # Fetch all rows in the Credit model for the current user, ordered by date_taken
-    debits = Debt.query.filter_by(user_id=current_user.id).order_by(Debt.date_taken.desc()).all()
+    # Read-only rows of the current user's debts, ordered by date_taken
+    debits = user_debts(current_user.id)
 
     total_amount_returned = 0
 
@@ -1714,52 +1609,343 @@ def settle_debt():
     try:
         data = request.json
         debt_id = int(data['creditId'])
-        amount_to_pay = data['amountToPay'] 
+        amount_to_pay = parse_amount(data['amountToPay'])
         date_paid_str = data['datePaid']
         date_paid = datetime.strptime(date_paid_str, '%Y-%m-%d').date()
 
-        debt = Debt.query.filter_by(id=debt_id, user_id=current_user.id).first()
+        # Raise the paid amount in the database and record the payment and the cash out with it
+        debt = settle_debt_payment(current_user.id, debt_id, amount_to_pay, date_paid).record
 
-        if not debt:
-            return jsonify({"error": "debt not found or unauthorized"}), 403
+        progress = round((debt.amount_payed / debt.amount) * 100, 2) 
 
-        if debt.is_paid:
-            return jsonify({"error": "Credit is already paid"}), 400
+        return jsonify({
+            "amountPaid": format_money(debt.amount_payed),
+            "progress": "{}%".format(progress),
+        }), 200
+
+    except SettlementNotFound as e:
+        return jsonify({"error": str(e)}), 403
 
-        payment = CreditorPayment(debt_id=debt_id, amount=amount_to_pay, date=date_paid)
-        db.session.add(payment)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        debt.amount_payed += Decimal(amount_to_pay)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+ 
+@app.route('/cache_stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """
+    Report the hit, miss and eviction counters of the calculation result cache.
+
+    Returns:
+        JSON: The cache counters.
+    """
+    return jsonify(result_cache.stats()), 200
+
+# Recurring transactions ------------------------------------------------------------------------
+@app.route('/recurring_transactions', methods=['GET'])
+@login_required
+def recurring_transactions():
+    """
+    List the user's recurring transactions.
+
+    Returns:
+        JSON: The recurring transactions, dates formatted as yyyy-mm-dd.
+    """
+    recurring = user_recurring_transactions(current_user.id)
+    for entry in recurring:
+        entry['amount'] = format_money(entry['amount'])
+        for key in ('start_date', 'end_date', 'next_date'):
+            entry[key] = entry[key].strftime('%Y-%m-%d') if entry[key] else None
+
+    return jsonify({'recurring_transactions': recurring}), 200
+
+@app.route('/create_recurring_transaction', methods=['POST'])
+@login_required
+def create_recurring_transaction_route():
+    """
+    Add a recurring transaction and write the occurrences already due.
+
+    Takes JSON as {"kind": "income" or "expense", "category_id": ..., "amount": ..., "frequency": "daily",
+    "weekly", "monthly" or "yearly", "interval": ..., "start_date": "yyyy-mm-dd", "end_date": "yyyy-mm-dd",
+    "description": ...}; interval, end_date and description are optional.
+
+    Returns:
+        JSON: The ID of the recurring transaction and the number of transactions written, or with
+            202 the status URL of the job writing them when more than MAX_INLINE_OCCURRENCES are due.
+    """
+    data = request.get_json(silent=True) or {}
 
-        if debt.amount_payed >= debt.amount:
-            credit.is_paid = True
+    try:
+        start_date = datetime.strptime(data.get('start_date') or '', '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}), 400
 
-        # Create a CashOut transaction
-        cash_out = CashOut(
-            user_id=current_user.id,
-            expense_id=2,
-            amount=amount_to_pay,
-            date=date_paid,
-            description="settling {}'s debt".format(debt.creditor), 
-            settled_debt_id=debt.id 
+    try:
+        recurring = create_recurring_transaction(
+            current_user.id,
+            data.get('kind'),
+            data.get('category_id'),
+            data.get('amount'),
+            data.get('frequency'),
+            start_date,
+            interval=data.get('interval', 1),
+            end_date=end_date,
+            description=data.get('description')
         )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        db.session.add(cash_out)
+    # A long backlog, e.g. a daily schedule started years ago, is written by the job workers
+    if due_count(recurring, date.today()) > MAX_INLINE_OCCURRENCES:
+        job = enqueue_job('materialize-recurring', {'user_id': current_user.id}, user_id=current_user.id)
+        return jsonify({
+            'message': 'Recurring transaction created successfully',
+            'recurring_id': recurring.id,
+            'job_id': job.id,
+            'status_url': url_for('job_status_route', job_id=job.id)
+        }), 202
+
+    # Catch up on a start date in the past right away instead of waiting for the next scheduled run
+    report = materialize_recurring(user_id=current_user.id)
+
+    return jsonify({
+        'message': 'Recurring transaction created successfully',
+        'recurring_id': recurring.id,
+        'transactions_created': report['transactions']
+    }), 201
+
+@app.route('/delete_recurring_transaction', methods=['POST'])
+@login_required
+def delete_recurring_transaction():
+    """
+    Delete a recurring transaction. The transactions it already wrote are kept.
+
+    Returns:
+        JSON: A success message, or an error if the recurring transaction is not the user's.
+    """
+    data = request.get_json(silent=True) or {}
+    recurring = RecurringTransaction.query.filter_by(id=data.get('recurring_id'), user_id=current_user.id).first()
+
+    if not recurring:
+        return jsonify({'error': 'Recurring transaction not found.'}), 404
+
+    try:
+        db.session.delete(recurring)
         db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Error deleting the recurring transaction.'}), 500
 
-        progress = round((debt.amount_payed / debt.amount) * 100, 2) 
+    return jsonify({'message': 'Recurring transaction deleted successfully'}), 200
 
-        return jsonify({
-            "amountPaid": "{:,.2f}/=".format(debt.amount_payed),
-            "progress": "{}%".format(progress),
-        }), 200
+# Background jobs ------------------------------------------------------------------------
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def job_status_route(job_id):
+    """
+    Report the status, progress and result of one of the user's jobs.
+
+    Returns:
+        JSON: The job's status, or an error if the job is not the user's.
+    """
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Job not found.'}), 404
+
+    return jsonify(job_status(job)), 200
+
+# Imports are not retried: the chunks written before a failure would be imported twice
+@job_task('import-statement', max_attempts=1)
+def import_statement_job(progress, user_id, path, statement_format, date_format):
+    try:
+        with open(path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+            return import_statement(user_id, stream, statement_format, date_format=date_format, progress=progress)
+    finally:
+        os.remove(path)
+
+@job_task('rebuild-rollups')
+def rebuild_rollups_job(progress):
+    return {'written': rebuild_rollups()}
+
+@job_task('rebuild-balance-index')
+def rebuild_balance_index_job(progress):
+    return {'written': rebuild_balance_index()}
+
+@job_task('reconcile-totals')
+def reconcile_totals_job(progress):
+    return {'drift': reconcile_user_totals()}
+
+@job_task('reconcile-settlements')
+def reconcile_settlements_job(progress, full=False):
+    return {'drift': reconcile_settlements(full=full)}
+
+@job_task('rebuild-budget-spend')
+def rebuild_budget_spend_job(progress):
+    return {'corrected': rebuild_budget_spend()}
+
+@job_task('materialize-recurring')
+def materialize_recurring_job(progress, user_id=None):
+    return materialize_recurring(user_id=user_id)
+
+@job_task('rebuild-ledger-entries')
+def rebuild_ledger_entries_job(progress):
+    return {'written': rebuild_ledger_entries()}
+
+@job_task('archive-transactions')
+def archive_transactions_job(progress, horizon_months=ARCHIVE_HORIZON_MONTHS):
+    report = archive_transactions(horizon_months, progress=progress)
+    return dict(report, cutoff=report['cutoff'].isoformat())
+
+# Maintenance commands ------------------------------------------------------------------------
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """
+    Recompute the daily rollup table from the CashIn and CashOut ledger.
+    """
+    written = rebuild_rollups()
+    print('Rebuilt {} daily rollup rows.'.format(written))
+
+@app.cli.command('rebuild-ledger-entries')
+def rebuild_ledger_entries_command():
+    """
+    Install the ledger entry triggers and recompute the unified ledger from the CashIn and CashOut tables.
+    """
+    with db.engine.begin() as connection:
+        install_ledger_triggers(connection)
+    written = rebuild_ledger_entries()
+    print('Rebuilt {} ledger entries.'.format(written))
+
+@app.cli.command('rebuild-balance-index')
+def rebuild_balance_index_command():
+    """
+    Recompute the running balance index from the CashIn and CashOut ledger.
+    """
+    written = rebuild_balance_index()
+    print('Rebuilt {} balance index rows.'.format(written))
+
+@app.cli.command('migrate-money-to-cents')
+def migrate_money_to_cents_command():
+    """
+    Convert amount columns still stored as decimals to integer cents.
+    """
+    with db.engine.begin() as connection:
+        converted = migrate_amounts_to_cents(connection, db.metadata)
+    for table_name, column_name in converted:
+        print('Converted {}.{} to cents.'.format(table_name, column_name))
+    print('{} amount columns converted.'.format(len(converted)))
+
+@app.cli.command('create-indexes')
+def create_indexes_command():
+    """
+    Add the indexes declared on the models that the database does not have yet.
+    """
+    with db.engine.begin() as connection:
+        created = create_missing_indexes(connection, db.metadata)
+    for table_name, index_name in created:
+        print('Created {} on {}.'.format(index_name, table_name))
+    print('{} indexes created.'.format(len(created)))
+
+@app.cli.command('reconcile-totals')
+@click.option('--dry-run', is_flag=True, help='Only report the drift, do not repair it.')
+def reconcile_totals_command(dry_run):
+    """
+    Recompute every user's lifetime income and expense counters and report any drift.
+    """
+    drift = reconcile_user_totals(repair=not dry_run)
+    for entry in drift:
+        print('User {user_id}: {column} stored {stored}, actual {actual}'.format(**entry))
+    print('{} drifted counters{}.'.format(len(drift), '' if dry_run else ' repaired'))
+
+@app.cli.command('reconcile-settlements')
+@click.option('--dry-run', is_flag=True, help='Only report the drift, do not repair it.')
+@click.option('--full', is_flag=True, help='Check every credit and debt, not only the ones changed since the last run.')
+def reconcile_settlements_command(dry_run, full):
+    """
+    Check the paid amounts of credits and debts against their payments and report any drift.
+    """
+    drift = reconcile_settlements(repair=not dry_run, full=full)
+    for entry in drift:
+        print('{table} {id} (user {user_id}): {column} stored {stored}, actual {actual}'.format(**entry))
+    print('{} drifted values{}.'.format(len(drift), '' if dry_run else ' repaired'))
+
+@app.cli.command('rebuild-budget-spend')
+def rebuild_budget_spend_command():
+    """
+    Recompute the spent amount of every budget expense from the ledger.
+    """
+    corrected = rebuild_budget_spend()
+    print('Corrected {} budget expenses.'.format(corrected))
+
+@app.cli.command('materialize-recurring')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to materialize, today by default.')
+@click.option('--batch-size', default=500, show_default=True, help='Recurring transactions per database transaction.')
+def materialize_recurring_command(until, batch_size):
+    """
+    Write every due occurrence of the recurring transactions. Safe to run repeatedly, e.g. from cron.
+    """
+    report = materialize_recurring(until=until.date() if until else None, batch_size=batch_size)
+    print('Wrote {transactions} transactions for {templates} recurring transactions in {batches} batches.'.format(**report))
+
+@app.cli.command('archive-transactions')
+@click.option('--horizon-months', default=ARCHIVE_HORIZON_MONTHS, show_default=True, help='Months kept in the hot tables besides the current one.')
+@click.option('--batch-size', default=1000, show_default=True, help='Transactions moved per database transaction.')
+def archive_transactions_command(horizon_months, batch_size):
+    """
+    Move transactions older than the horizon into the archive tables and their monthly totals.
+    """
+    report = archive_transactions(horizon_months, batch_size)
+    print('Archived {income} income and {expense} expense transactions dated before {cutoff}.'.format(**report))
+
+@app.cli.command('import-statement')
+@click.argument('user_id', type=int)
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'statement_format', type=click.Choice(['csv', 'ofx']), help='Statement format, guessed from the file name by default.')
+@click.option('--date-format', default=DEFAULT_DATE_FORMAT, show_default=True, help='Date format of CSV statements.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows written per transaction.')
+def import_statement_command(user_id, path, statement_format, date_format, chunk_size):
+    """
+    Import a CSV or OFX bank statement as a user's transactions.
+    """
+    statement_format = statement_format or ('ofx' if path.lower().endswith('.ofx') else 'csv')
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+        report = import_statement(user_id, stream, statement_format, date_format=date_format, chunk_size=chunk_size)
+    for error in report['errors']:
+        print('Line {line}: {error}'.format(**error))
+    print('Imported {inserted} of {rows} rows in {seconds}s ({rows_per_second} rows/sec), {error_count} errors.'.format(**report))
+
+@app.cli.command('run-workers')
+@click.option('--processes', default=2, show_default=True, help='Number of worker processes.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds between polls of an empty queue.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due in this process, then exit.')
+def run_workers_command(processes, poll_interval, once):
+    """
+    Run queued background jobs until interrupted.
+    """
+    if once:
+        print('Ran {} jobs.'.format(run_pending_jobs()))
+        return
+    run_worker_pool(processes, poll_interval)
+
+@app.cli.command('enqueue-job')
+@click.argument('name')
+def enqueue_job_command(name):
+    """
+    Queue a maintenance job (e.g. rebuild-rollups, reconcile-settlements) for the workers.
+    """
+    try:
+        job = enqueue_job(name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print('Queued job {}.'.format(job.id))
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
- 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        with db.engine.begin() as connection:
+            install_missing_ledger_triggers(connection)
         initialize_default_income_types()
 
     app.run(debug=True)
@@ -0,0 +1,246 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_, literal, select, union_all
+from models import db, CashIn, CashOut, Income, IncomeType, Expense, ArchivedCashIn, ArchivedCashOut, ArchiveMonthlyTotal
+from ledger import INCOME, EXPENSE, query_income_ledger, query_expense_ledger
+from counters import increment_counters
+from money import from_cents, stored_cents
+from cache import invalidate_users
+
+# Transactions dated before the first day of the month this many months ago are archived
+ARCHIVE_HORIZON_MONTHS = int(os.getenv('ARCHIVE_HORIZON_MONTHS', 24))
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Per kind: hot model, archive model, category column name and the query listing its rows and total
+ARCHIVED_KINDS = {
+    INCOME: (CashIn, ArchivedCashIn, 'income_id', query_income_ledger),
+    EXPENSE: (CashOut, ArchivedCashOut, 'expense_id', query_expense_ledger),
+}
+
+def archive_cutoff(horizon_months=ARCHIVE_HORIZON_MONTHS, today=None):
+    """
+    Return the first day that is not archived: the start of the month `horizon_months` months ago.
+
+    Only whole months are archived, so a month's aggregate covers every archived row of that month.
+
+    Args:
+        horizon_months (int, optional): The number of months kept in the hot tables besides the
+            current one. Defaults to ARCHIVE_HORIZON_MONTHS.
+        today (date, optional): The day to count back from. Defaults to today.
+
+    Returns:
+        date: The cutoff; transactions dated before it are archived.
+    """
+    today = today or date.today()
+    return date(today.year, today.month, 1) - relativedelta(months=horizon_months)
+
+def ledger_rows(kind, user_id=None):
+    """
+    Select a kind's hot and archived transactions together, e.g. to rebuild a summary table.
+
+    Args:
+        kind (str): INCOME or EXPENSE.
+        user_id (int, optional): Only select this user's transactions. Defaults to every user.
+
+    Returns:
+        Subquery: The columns 'id', 'user_id', 'category_id', 'amount' and 'date'.
+    """
+    hot_model, archive_model, category_column, _ = ARCHIVED_KINDS[kind]
+
+    selects = []
+    for model in (hot_model, archive_model):
+        rows = select(
+            model.id.label('id'),
+            model.user_id.label('user_id'),
+            getattr(model, category_column).label('category_id'),
+            model.amount.label('amount'),
+            model.date.label('date')
+        )
+        if user_id is not None:
+            rows = rows.where(model.user_id == user_id)
+        selects.append(rows)
+
+    return union_all(*selects).subquery()
+
+def _take_batch(connection, hot, cutoff, batch_size):
+    """
+    Delete the next batch of hot rows dated before the cutoff and return them as they were deleted.
+    """
+    ids = connection.execute(
+        select(hot.c.id).where(hot.c.date < cutoff).order_by(hot.c.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return []
+
+    # The date is checked again so a row edited forward since the SELECT stays hot
+    owned = (hot.c.id.in_(ids), hot.c.date < cutoff)
+    if connection.dialect.delete_returning:
+        return connection.execute(hot.delete().where(*owned).returning(*hot.c)).all()
+
+    rows = connection.execute(select(hot).where(*owned).with_for_update()).all()
+    connection.execute(hot.delete().where(hot.c.id.in_([row.id for row in rows])))
+    return rows
+
+def _add_monthly_totals(connection, kind, category_column, rows):
+    """
+    Add a batch of archived rows to their ArchiveMonthlyTotal buckets.
+    """
+    table = ArchiveMonthlyTotal.__table__
+
+    buckets = defaultdict(lambda: [0, 0])
+    for row in rows:
+        bucket = buckets[(row.user_id, row._mapping[category_column], row.date.replace(day=1))]
+        bucket[0] += row.amount
+        bucket[1] += 1
+
+    for (user_id, category_id, month), (amount, count) in buckets.items():
+        where = and_(
+            table.c.user_id == user_id,
+            table.c.kind == kind,
+            table.c.category_id == category_id,
+            table.c.month == month
+        )
+        if increment_counters(connection, table, where, {'amount': amount, 'count': count}) == 0:
+            connection.execute(table.insert().values(
+                user_id=user_id, kind=kind, category_id=category_id, month=month, amount=amount, count=count
+            ))
+
+def archive_transactions(horizon_months=ARCHIVE_HORIZON_MONTHS, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Move the transactions dated before the archive cutoff into the archive tables.
+
+    Each batch is deleted from CashIn or CashOut, copied to ArchivedCashIn or ArchivedCashOut and
+    added to the monthly totals in one commit. The money is only moved, not changed, so no ledger
+    deltas are published and the rollups, balance index and lifetime totals stay as they are.
+
+    Args:
+        horizon_months (int, optional): The number of months kept in the hot tables besides the
+            current one. Defaults to ARCHIVE_HORIZON_MONTHS.
+        batch_size (int, optional): The number of transactions per commit. Defaults to DEFAULT_BATCH_SIZE.
+        progress (callable, optional): Called with the number of transactions archived so far.
+
+    Returns:
+        dict: The cutoff and the number of archived 'income' and 'expense' transactions.
+    """
+    cutoff = archive_cutoff(horizon_months)
+    archived = {'cutoff': cutoff, INCOME: 0, EXPENSE: 0}
+
+    for kind, (hot_model, archive_model, category_column, _) in ARCHIVED_KINDS.items():
+        hot, archive = hot_model.__table__, archive_model.__table__
+
+        while True:
+            connection = db.session.connection()
+            rows = _take_batch(connection, hot, cutoff, batch_size)
+            if not rows:
+                db.session.commit()
+                break
+
+            archived_at = datetime.utcnow()
+            connection.execute(archive.insert(), [dict(row._mapping, archived_at=archived_at) for row in rows])
+            _add_monthly_totals(connection, kind, category_column, rows)
+            # The totals are unchanged, but the hot rows listed by the range calculations are not
+            invalidate_users(connection, {row.user_id for row in rows})
+            db.session.commit()
+
+            archived[kind] += len(rows)
+            if progress is not None:
+                progress(archived[INCOME] + archived[EXPENSE])
+
+    return archived
+
+def _monthly_total_rows(user_id, kind, first_month, end_month):
+    """
+    List a user's archived monthly totals for the months in [first_month, end_month) as ledger rows.
+
+    Returns:
+        tuple: (their sum in cents, the rows).
+    """
+    if kind == INCOME:
+        rows = db.session.query(
+            ArchiveMonthlyTotal.month, ArchiveMonthlyTotal.category_id, stored_cents(ArchiveMonthlyTotal.amount),
+            ArchiveMonthlyTotal.count, Income.name, IncomeType.name
+        ).outerjoin(
+            Income, ArchiveMonthlyTotal.category_id == Income.id
+        ).outerjoin(
+            IncomeType, Income.income_type_id == IncomeType.id
+        )
+    else:
+        rows = db.session.query(
+            ArchiveMonthlyTotal.month, ArchiveMonthlyTotal.category_id, stored_cents(ArchiveMonthlyTotal.amount),
+            ArchiveMonthlyTotal.count, Expense.name, literal(None)
+        ).outerjoin(
+            Expense, ArchiveMonthlyTotal.category_id == Expense.id
+        )
+
+    rows = rows.filter(
+        ArchiveMonthlyTotal.user_id == user_id,
+        ArchiveMonthlyTotal.kind == kind,
+        ArchiveMonthlyTotal.month >= first_month,
+        ArchiveMonthlyTotal.month < end_month
+    ).order_by(ArchiveMonthlyTotal.month, ArchiveMonthlyTotal.category_id).all()
+
+    total_cents = 0
+    summaries = []
+    for month, category_id, cents, count, name, income_type in rows:
+        total_cents += cents
+        summary = {
+            'amount': from_cents(cents),
+            'date': month,
+            'name': name,
+            'description': '{} archived transactions'.format(count),
+            'id': None,
+            'type': 'Income' if kind == INCOME else 'Expense',
+            'archived': True,
+            'count': count,
+        }
+        if kind == INCOME:
+            summary.update(income_type=income_type, income_category_id=category_id)
+        else:
+            summary['expense_category_id'] = category_id
+        summaries.append(summary)
+    return total_cents, summaries
+
+def range_ledger_rows(user_id, kind, start_date, end_date, detail=False):
+    """
+    List a user's transactions between two dates, hot and archived, in the shape of the ledger rows.
+
+    Without detail, the archived transactions of the months lying wholly inside the range are
+    listed from the monthly totals, one row per category and month with `id` None and the number
+    of transactions in 'count'. Those of the partial months at either end of the range are listed
+    one by one, since the totals can't be split by day, in the same query as the hot rows.
+    Archived rows have 'archived' set to True.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+        detail (bool, optional): List every archived transaction instead of monthly totals.
+            Defaults to False.
+
+    Returns:
+        tuple: (the total of the rows in cents, dictionaries with the keys of query_income_rows or
+            query_expense_rows).
+    """
+    query_rows = ARCHIVED_KINDS[kind][3]
+
+    # Whole months are [first_month, end_month)
+    first_month = start_date if start_date.day == 1 else start_date.replace(day=1) + relativedelta(months=1)
+    end_month = end_date.replace(day=1)
+    if (end_date + timedelta(days=1)).day == 1:
+        end_month += relativedelta(months=1)
+
+    if detail or first_month >= end_month:
+        return query_rows(user_id, start_date, end_date, archived_ranges=[(start_date, end_date)])
+
+    archived_ranges = [
+        (range_start, range_end)
+        for range_start, range_end in ((start_date, first_month - timedelta(days=1)), (end_month, end_date))
+        if range_start <= range_end
+    ]
+    total_cents, rows = query_rows(user_id, start_date, end_date, archived_ranges)
+    monthly_cents, monthly_rows = _monthly_total_rows(user_id, kind, first_month, end_month)
+    return total_cents + monthly_cents, rows + monthly_rows
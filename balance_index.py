@@ -0,0 +1,152 @@
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import func, literal, select, union_all
+from models import db, BalanceIndex
+from ledger import INCOME, EXPENSE, register_delta_listener
+from archive import ledger_rows
+
+@register_delta_listener
+def apply_balance_deltas(connection, deltas):
+    """
+    Fold a batch of ledger deltas into the BalanceIndex.
+
+    The row of each touched day is created from its predecessor if needed, then that row and every
+    later row of the user are shifted by the day's net change. Writes dated today only touch one row.
+
+    Args:
+        connection (Connection): The connection of the transaction that wrote the ledger rows.
+        deltas (list): LedgerDelta instances.
+    """
+    table = BalanceIndex.__table__
+
+    # Net income and expense change per (user, day)
+    changes = {}
+    for delta in deltas:
+        income, expense = changes.get((delta.user_id, delta.day), (Decimal('0.00'), Decimal('0.00')))
+        if delta.kind == INCOME:
+            income += delta.amount
+        else:
+            expense += delta.amount
+        changes[(delta.user_id, delta.day)] = (income, expense)
+
+    for (user_id, day), (income, expense) in sorted(changes.items()):
+        if income == 0 and expense == 0:
+            continue
+
+        exists = connection.execute(
+            select(table.c.id).where(table.c.user_id == user_id, table.c.day == day)
+        ).first()
+
+        if not exists:
+            previous = connection.execute(
+                select(table.c.cumulative_income, table.c.cumulative_expense, table.c.balance)
+                .where(table.c.user_id == user_id, table.c.day < day)
+                .order_by(table.c.day.desc())
+                .limit(1)
+            ).first()
+
+            connection.execute(table.insert().values(
+                user_id=user_id,
+                day=day,
+                cumulative_income=previous[0] if previous else 0,
+                cumulative_expense=previous[1] if previous else 0,
+                balance=previous[2] if previous else 0
+            ))
+
+        connection.execute(
+            table.update().where(table.c.user_id == user_id, table.c.day >= day).values(
+                cumulative_income=table.c.cumulative_income + income,
+                cumulative_expense=table.c.cumulative_expense + expense,
+                balance=table.c.balance + (income - expense)
+            )
+        )
+
+def rebuild_balance_index(user_id=None):
+    """
+    Recompute the BalanceIndex from the CashIn and CashOut rows, archived ones included, with running sums.
+
+    Args:
+        user_id (int, optional): Only rebuild this user's index. Defaults to every user.
+
+    Returns:
+        int: The number of index rows written.
+    """
+    table = BalanceIndex.__table__
+
+    delete = table.delete()
+    if user_id is not None:
+        delete = delete.where(table.c.user_id == user_id)
+    db.session.execute(delete)
+
+    # Archived transactions still move the balance
+    incomes, expenses = ledger_rows(INCOME, user_id), ledger_rows(EXPENSE, user_id)
+    movements = union_all(
+        select(incomes.c.user_id, incomes.c.date.label('day'), incomes.c.amount.label('income'), literal(0).label('expense')),
+        select(expenses.c.user_id, expenses.c.date.label('day'), literal(0).label('income'), expenses.c.amount.label('expense'))
+    ).subquery()
+
+    daily = select(
+        movements.c.user_id,
+        movements.c.day,
+        func.sum(movements.c.income).label('income'),
+        func.sum(movements.c.expense).label('expense')
+    ).group_by(movements.c.user_id, movements.c.day).subquery()
+
+    running = select(
+        daily.c.user_id,
+        daily.c.day,
+        func.sum(daily.c.income).over(partition_by=daily.c.user_id, order_by=daily.c.day),
+        func.sum(daily.c.expense).over(partition_by=daily.c.user_id, order_by=daily.c.day),
+        func.sum(daily.c.income - daily.c.expense).over(partition_by=daily.c.user_id, order_by=daily.c.day)
+    )
+
+    written = db.session.execute(table.insert().from_select(
+        ['user_id', 'day', 'cumulative_income', 'cumulative_expense', 'balance'], running
+    )).rowcount
+
+    db.session.commit()
+    return written
+
+def cumulative_as_of(user_id, day):
+    """
+    Look up a user's running totals at the end of a day.
+
+    Args:
+        user_id (int): The user's ID.
+        day (date): The day to look up.
+
+    Returns:
+        tuple: (cumulative_income, cumulative_expense, balance) as Decimals.
+    """
+    row = db.session.query(
+        BalanceIndex.cumulative_income,
+        BalanceIndex.cumulative_expense,
+        BalanceIndex.balance
+    ).filter(
+        BalanceIndex.user_id == user_id,
+        BalanceIndex.day <= day
+    ).order_by(BalanceIndex.day.desc()).first()
+
+    if row is None:
+        return Decimal('0.00'), Decimal('0.00'), Decimal('0.00')
+    return tuple(row)
+
+def index_range_totals(user_id, start_date, end_date):
+    """
+    Calculate a user's income and expense between two dates from two index lookups.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+
+    Returns:
+        tuple: (total_income, total_expense) as Decimals.
+    """
+    if start_date > end_date:
+        return Decimal('0.00'), Decimal('0.00')
+
+    end_income, end_expense, _ = cumulative_as_of(user_id, end_date)
+    start_income, start_expense, _ = cumulative_as_of(user_id, start_date - timedelta(days=1))
+
+    return end_income - start_income, end_expense - start_expense
@@ -0,0 +1,83 @@
+"""
+Benchmark for the bank-statement importer.
+
+Writes a CSV statement of N lines to a temporary file and imports it into a throwaway SQLite
+database, reporting the import rate and the peak Python memory traced during a second import
+(tracemalloc slows the import, so the rate comes from the untraced run).
+
+Usage:
+    python benchmarks/bench_import.py [N ...]
+
+With no arguments the benchmark runs at 100k and 1M lines.
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+# Importing the app registers the ledger listeners that keep the rollups, indexes and totals in step
+import app  # noqa: F401
+from models import db, initialize_default_income_types, User
+from importer import import_statement
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+CATEGORIES = ['Rent', 'Food', 'Transport', 'Utilities', 'Salary', 'Fun']
+
+
+def write_statement(path, size):
+    with open(path, 'w', newline='') as statement:
+        statement.write('date,amount,description,category\n')
+        for i in range(size):
+            amount = '{}.{:02d}'.format(i % 900 + 1, i % 100)
+            category = CATEGORIES[i % len(CATEGORIES)]
+            sign = '' if category == 'Salary' else '-'
+            statement.write('2024-{:02d}-{:02d},{}{},Row {},{}\n'.format(i % 12 + 1, i % 28 + 1, sign, amount, i, category))
+
+
+def run_import(database, statement_path):
+    bench = Flask(__name__)
+    bench.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database
+    bench.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(bench)
+
+    with bench.app_context():
+        db.create_all()
+        initialize_default_income_types()
+        user = User(first_name='bench', last_name='bench', password='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        with open(statement_path, newline='') as statement:
+            report = import_statement(user.id, statement)
+
+        db.session.remove()
+        db.drop_all()
+    return report
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as directory:
+        statement_path = os.path.join(directory, 'statement.csv')
+        write_statement(statement_path, size)
+
+        report = run_import(os.path.join(directory, 'rate.db'), statement_path)
+
+        tracemalloc.start()
+        run_import(os.path.join(directory, 'memory.db'), statement_path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print('{:>9,} lines | imported {:>9,} in {:7.1f} s | {:>7,} rows/sec | peak traced memory {:6.1f} MiB'.format(
+        size, report['inserted'], report['seconds'], report['rows_per_second'], peak / 2 ** 20
+    ))
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,129 @@
+"""
+Benchmark for the ledger read layer.
+
+Seeds a throwaway SQLite database with N income and N expense transactions inside a single
+month and measures how many SQL statements calculate_total_income_between_dates and
+calculate_total_expenses_between_dates issue with a cold identity map.
+
+Usage:
+    python benchmarks/bench_ledger_queries.py [N ...]
+
+With no arguments the benchmark runs at 10k, 100k and 1M rows.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, User, IncomeType, Income, Expense, CashIn, CashOut
+from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+CATEGORY_COUNT = 40
+START_DATE = date(2023, 8, 1)
+END_DATE = date(2023, 8, 31)
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(rows):
+    """
+    Insert a user, CATEGORY_COUNT income and expense categories and `rows` transactions of each kind.
+    """
+    user = User(first_name='bench', last_name='bench', password='bench', email='bench@example.com')
+    income_type = IncomeType(name='Earned Income')
+    db.session.add_all([user, income_type])
+    db.session.commit()
+
+    incomes = [Income(user_id=user.id, name='Income {}'.format(i), income_type_id=income_type.id) for i in range(CATEGORY_COUNT)]
+    expenses = [Expense(user_id=user.id, name='Expense {}'.format(i)) for i in range(CATEGORY_COUNT)]
+    db.session.add_all(incomes + expenses)
+    db.session.commit()
+
+    income_ids = [income.id for income in incomes]
+    expense_ids = [expense.id for expense in expenses]
+
+    # Insert in chunks with executemany so seeding 1M rows stays reasonable
+    chunk = 50_000
+    for offset in range(0, rows, chunk):
+        count = min(chunk, rows - offset)
+        db.session.execute(CashIn.__table__.insert(), [
+            {
+                'user_id': user.id,
+                'income_id': income_ids[i % CATEGORY_COUNT],
+                'amount': (i % 5000) + 0.25,
+                'date': date(2023, 8, (i % 31) + 1),
+                'description': 'bench',
+            }
+            for i in range(offset, offset + count)
+        ])
+        db.session.execute(CashOut.__table__.insert(), [
+            {
+                'user_id': user.id,
+                'expense_id': expense_ids[i % CATEGORY_COUNT],
+                'amount': (i % 3000) + 0.75,
+                'date': date(2023, 8, (i % 31) + 1),
+                'description': 'bench',
+            }
+            for i in range(offset, offset + count)
+        ])
+        db.session.commit()
+
+    return user.id
+
+
+def measure(function, user_id):
+    """
+    Run `function` against a cold identity map and return (statement count, seconds).
+    """
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expunge_all()
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        started = time.perf_counter()
+        function(user_id, START_DATE, END_DATE)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    return len(statements), elapsed
+
+
+def run(rows):
+    handle, database_path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        app = create_app(database_path)
+        with app.app_context():
+            db.create_all()
+            user_id = seed(rows)
+            for function in (calculate_total_income_between_dates, calculate_total_expenses_between_dates):
+                queries, elapsed = measure(function, user_id)
+                print('{:>10,} rows  {:<40} {:>3} queries  {:>8.3f}s'.format(rows, function.__name__, queries, elapsed))
+            db.session.remove()
+    finally:
+        os.remove(database_path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,149 @@
+"""
+Benchmark for integer-cents amounts.
+
+Seeds a throwaway SQLite database with N income transactions in the current month and totals them
+the way calculate_total_income_between_dates does: once through the rows' Decimal amounts (summed
+as Decimal and quantized, the previous approach) and once through their stored integer cents
+(summed as int and converted once, the current code path). It also compares a SQL SUM over the
+old NUMERIC(10,2) column with one over the integer-cents column.
+
+Usage:
+    python benchmarks/bench_money_aggregation.py [N ...]
+
+With no arguments the benchmark runs at 100k amounts.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import Column, Integer, MetaData, Numeric, Table, create_engine, func, select
+
+from models import db, User, IncomeType, Income, CashIn
+from ledger import query_income_rows
+from calculations import calculate_total_income_between_dates
+from money import Money
+
+DEFAULT_SIZES = [100_000]
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def timed(function, repeat=3):
+    """
+    Return the result of `function` and its best wall time in milliseconds over `repeat` runs.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def seed(rows):
+    """
+    Insert a user, one income category and `rows` transactions dated in the current month.
+    """
+    user = User(first_name='bench', last_name='bench', password='bench', email='bench@example.com')
+    income_type = IncomeType(name='Earned Income')
+    db.session.add_all([user, income_type])
+    db.session.commit()
+
+    income = Income(user_id=user.id, name='Salary', income_type_id=income_type.id)
+    db.session.add(income)
+    db.session.commit()
+
+    today = date.today()
+    chunk = 50_000
+    for offset in range(0, rows, chunk):
+        db.session.execute(CashIn.__table__.insert(), [
+            {
+                'user_id': user.id,
+                'income_id': income.id,
+                'amount': Decimal((i % 500_000) + 25).scaleb(-2),
+                'date': today.replace(day=(i % today.day) + 1),
+            }
+            for i in range(offset, offset + min(chunk, rows - offset))
+        ])
+        db.session.commit()
+
+    return user.id
+
+
+def decimal_total(user_id, start_date, end_date):
+    incomes = query_income_rows(user_id, start_date, end_date)
+    return Decimal(sum(income['amount'] for income in incomes)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def cents_total(user_id, start_date, end_date):
+    return calculate_total_income_between_dates.uncached(user_id, start_date, end_date)[0]
+
+
+def run_sql(size):
+    """
+    Time a SQL SUM over NUMERIC(10,2) amounts against one over integer cents, in milliseconds.
+    """
+    amounts = [Decimal((i % 500_000) + 25).scaleb(-2) for i in range(size)]
+
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    numeric_table = Table('numeric_amounts', metadata, Column('id', Integer, primary_key=True), Column('amount', Numeric(10, 2)))
+    cents_table = Table('cents_amounts', metadata, Column('id', Integer, primary_key=True), Column('amount', Money))
+    metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(numeric_table.insert(), [{'amount': value} for value in amounts])
+        connection.execute(cents_table.insert(), [{'amount': value} for value in amounts])
+
+    with engine.connect() as connection:
+        numeric_sum, numeric_ms = timed(lambda: connection.execute(select(func.sum(numeric_table.c.amount))).scalar())
+        cents_sum, cents_ms = timed(lambda: connection.execute(select(func.sum(cents_table.c.amount))).scalar())
+        assert Decimal(str(numeric_sum)).quantize(Decimal('0.01')) == cents_sum
+
+    return numeric_ms, cents_ms
+
+
+def run(size):
+    today = date.today()
+    start_date = today.replace(day=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            user_id = seed(size)
+
+            old_total, decimal_ms = timed(lambda: decimal_total(user_id, start_date, today))
+            new_total, cents_ms = timed(lambda: cents_total(user_id, start_date, today))
+            assert old_total == new_total
+
+            db.session.remove()
+            db.drop_all()
+
+    numeric_ms, bigint_ms = run_sql(size)
+
+    print('{:>9,} amounts | range total: Decimal {:8.1f} ms, cents {:8.1f} ms ({:4.2f}x) | sql: NUMERIC {:8.1f} ms, BIGINT {:8.1f} ms ({:4.1f}x)'.format(
+        size,
+        decimal_ms, cents_ms, decimal_ms / cents_ms,
+        numeric_ms, bigint_ms, numeric_ms / bigint_ms
+    ))
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(size)
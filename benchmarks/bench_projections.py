@@ -0,0 +1,137 @@
+"""
+Benchmark for the read-only row projections.
+
+Seeds a throwaway SQLite database with N income transactions in one category, then lists and
+serializes them the way the income page's category filter does: once through ORM instances
+(the previous approach) and once through TransactionRow projections. For each it reports the
+time taken, the memory still held by the loaded rows and the peak memory traced while loading
+and serializing them.
+
+Usage:
+    python benchmarks/bench_projections.py [N ...]
+
+With no arguments the benchmark runs at 100k rows.
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from models import db, User, IncomeType, Income, CashIn
+from ledger import INCOME
+from projections import category_transactions, serialize_transaction
+
+DEFAULT_SIZES = [100_000]
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(rows):
+    """
+    Insert a user, one income category and `rows` transactions in it.
+    """
+    user = User(first_name='bench', last_name='bench', password='bench', email='bench@example.com')
+    income_type = IncomeType(name='Earned Income')
+    db.session.add_all([user, income_type])
+    db.session.commit()
+
+    income = Income(user_id=user.id, name='Salary', income_type_id=income_type.id)
+    db.session.add(income)
+    db.session.commit()
+
+    chunk = 50_000
+    for offset in range(0, rows, chunk):
+        db.session.execute(CashIn.__table__.insert(), [
+            {
+                'user_id': user.id,
+                'income_id': income.id,
+                'amount': (i % 5000) + 0.25,
+                'date': date(2023, (i % 12) + 1, (i % 28) + 1),
+                'description': 'bench {}'.format(i),
+            }
+            for i in range(offset, offset + min(chunk, rows - offset))
+        ])
+        db.session.commit()
+
+    return user.id, income.id
+
+
+def orm_listing(user_id, income_id):
+    transactions = CashIn.query.filter_by(income_id=income_id, user_id=user_id).all()
+    return transactions, [
+        {
+            'id': transaction.id,
+            'category': 'Salary',
+            'amount': "{:,.2f}/=".format(float(transaction.amount)),
+            'date': transaction.date.strftime('%Y-%m-%d'),
+            'description': transaction.description
+        }
+        for transaction in transactions
+    ]
+
+
+def projected_listing(user_id, income_id):
+    transactions = category_transactions(user_id, INCOME, income_id)
+    return transactions, [serialize_transaction(transaction, 'Salary') for transaction in transactions]
+
+
+def measure(listing, user_id, income_id):
+    """
+    Return the seconds taken, the bytes held by the loaded rows and the peak bytes traced.
+    """
+    db.session.remove()
+    gc.collect()
+
+    started = time.perf_counter()
+    listing(user_id, income_id)
+    seconds = time.perf_counter() - started
+    db.session.remove()
+    gc.collect()
+
+    tracemalloc.start()
+    rows, serialized = listing(user_id, income_id)
+    del serialized
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del rows
+    db.session.remove()
+    return seconds, held, peak
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            user_id, income_id = seed(size)
+
+            for name, listing in (('ORM instances', orm_listing), ('projections', projected_listing)):
+                seconds, held, peak = measure(listing, user_id, income_id)
+                print('{:>9,} rows | {:<13} | {:6.2f} s | rows held {:7.1f} MiB | peak traced {:7.1f} MiB'.format(
+                    size, name, seconds, held / 2 ** 20, peak / 2 ** 20
+                ))
+
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(size)
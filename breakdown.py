@@ -0,0 +1,96 @@
+from sqlalchemy import and_, func, or_
+from models import db, Income, Expense, DailyRollup
+from ledger import INCOME, EXPENSE
+from money import format_money
+
+# The category model of each ledger kind
+CATEGORY_MODELS = {
+    INCOME: Income,
+    EXPENSE: Expense,
+}
+
+# Categories shared by every user (owned by the default user), with the label shown for them
+SYSTEM_CATEGORIES = {
+    INCOME: {2: 'Settled Credit', 1: 'Debt'},
+    EXPENSE: {2: 'Settled Debt', 1: 'Credit'},
+}
+
+def category_breakdown(user_id, kind, start_date, end_date, include_system=True):
+    """
+    Sum a user's transactions per category between two dates, categories without activity included.
+
+    All categories come from one grouped query: the user's categories (and the shared system ones)
+    outer joined to the daily rollups of the range.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+        include_system (bool, optional): Include the shared system categories. Defaults to True.
+
+    Returns:
+        list: (category_id, label, amount) tuples, the user's categories by ID followed by the
+            system categories. Amounts are Decimal, 0 for categories without transactions.
+    """
+    category = CATEGORY_MODELS[kind]
+    system = SYSTEM_CATEGORIES[kind] if include_system else {}
+
+    owned = category.user_id == user_id
+    if system:
+        owned = or_(owned, category.id.in_(list(system)))
+
+    rows = db.session.query(
+        category.id,
+        category.name,
+        func.coalesce(func.sum(DailyRollup.amount), 0)
+    ).outerjoin(DailyRollup, and_(
+        DailyRollup.category_id == category.id,
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == kind,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    )).filter(owned).group_by(category.id, category.name).all()
+
+    user_rows = sorted((row for row in rows if row[0] not in system), key=lambda row: row[0])
+    system_rows = {row[0]: row for row in rows if row[0] in system}
+
+    breakdown = [(category_id, name, amount) for category_id, name, amount in user_rows]
+    breakdown += [
+        (category_id, label, system_rows[category_id][2])
+        for category_id, label in system.items()
+        if category_id in system_rows
+    ]
+    return breakdown
+
+def breakdown_amounts(breakdown):
+    """
+    Map the labels of a breakdown to their amounts.
+
+    Args:
+        breakdown (list): The output of category_breakdown.
+
+    Returns:
+        dict: A dictionary mapping category labels to their total amounts.
+    """
+    return {label: amount for _, label, amount in breakdown}
+
+def format_breakdown(breakdown):
+    """
+    Format a breakdown for display: each amount and its share of the breakdown's total.
+
+    Args:
+        breakdown (list): The output of category_breakdown.
+
+    Returns:
+        dict: A dictionary mapping category labels to (formatted amount, percentage) tuples.
+    """
+    amounts = breakdown_amounts(breakdown)
+    total = sum(amounts.values())
+
+    formatted = {}
+    for label, amount in amounts.items():
+        percentage = (amount / total) * 100 if total else 0
+        formatted[label] = (format_money(amount), "{:.2f}".format(percentage))
+
+    return formatted
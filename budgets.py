@@ -0,0 +1,106 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import bindparam, extract, func, select
+from models import db, Budget, BudgetExpense, DailyRollup
+from ledger import EXPENSE, register_delta_listener
+from money import Money
+from counters import increment_counters
+
+@register_delta_listener
+def apply_budget_deltas(connection, deltas):
+    """
+    Add the expense deltas of a unit of work to the spent amount of the matching budget expenses.
+
+    Deltas are summed per (user, month, expense) first, so each budget expense gets a single
+    UPDATE ... SET spent_amount = spent_amount + delta however many transactions touched it. It runs
+    in the transaction that wrote the ledger rows and commits with them.
+
+    Args:
+        connection (Connection): The connection of the transaction that wrote the ledger rows.
+        deltas (list): LedgerDelta instances.
+    """
+    spent = {}
+    for delta in deltas:
+        if delta.kind != EXPENSE:
+            continue
+        key = (delta.user_id, delta.day.year, delta.day.month, delta.category_id)
+        spent[key] = spent.get(key, Decimal('0.00')) + delta.amount
+
+    budgets = Budget.__table__
+    budget_expenses = BudgetExpense.__table__
+    for (user_id, year, month, expense_id), amount in spent.items():
+        if not amount:
+            continue
+
+        budget_id = select(budgets.c.id).where(
+            budgets.c.user_id == user_id,
+            budgets.c.year == year,
+            budgets.c.month == month
+        ).scalar_subquery()
+
+        increment_counters(
+            connection,
+            budget_expenses,
+            (budget_expenses.c.budget_id == budget_id) & (budget_expenses.c.expense_id == expense_id),
+            {'spent_amount': amount}
+        )
+
+def month_spending(user_id, year, month, expense_id):
+    """
+    Sum a user's spending on an expense category during a month, from the daily rollups.
+
+    Args:
+        user_id (int): The user's ID.
+        year (int): The year.
+        month (int): The month.
+        expense_id (int): The expense category ID.
+
+    Returns:
+        Decimal: The amount spent.
+    """
+    start_date = date(year, month, 1)
+    end_date = date(year + month // 12, month % 12 + 1, 1)
+
+    total = db.session.query(func.sum(DailyRollup.amount)).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == EXPENSE,
+        DailyRollup.category_id == expense_id,
+        DailyRollup.day >= start_date,
+        DailyRollup.day < end_date
+    ).scalar()
+
+    return total if total is not None else Decimal('0.00')
+
+def rebuild_budget_spend():
+    """
+    Recompute the spent amount of every budget expense from the daily rollups and fix the ones that drifted.
+
+    Returns:
+        int: The number of budget expenses corrected.
+    """
+    year, month = extract('year', DailyRollup.day), extract('month', DailyRollup.day)
+    spending = {
+        (user_id, int(year), int(month), expense_id): total
+        for user_id, year, month, expense_id, total in db.session.query(
+            DailyRollup.user_id, year, month, DailyRollup.category_id, func.sum(DailyRollup.amount)
+        ).filter(DailyRollup.kind == EXPENSE).group_by(DailyRollup.user_id, year, month, DailyRollup.category_id)
+    }
+
+    corrections = []
+    rows = db.session.query(
+        BudgetExpense.id, Budget.user_id, Budget.year, Budget.month, BudgetExpense.expense_id, BudgetExpense.spent_amount
+    ).join(Budget, Budget.id == BudgetExpense.budget_id)
+
+    for budget_expense_id, user_id, year, month, expense_id, spent_amount in rows:
+        actual = spending.get((user_id, year, month, expense_id), Decimal('0.00'))
+        if spent_amount != actual:
+            corrections.append({'budget_expense_id': budget_expense_id, 'new_spent_amount': actual})
+
+    if corrections:
+        table = BudgetExpense.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('budget_expense_id')).values(spent_amount=bindparam('new_spent_amount', type_=Money)),
+            corrections
+        )
+    db.session.commit()
+    return len(corrections)
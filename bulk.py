@@ -0,0 +1,364 @@
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select
+from models import db, Income, Expense, CashIn, CashOut, Debt, Credit, CreditorPayment, DebtorPayment
+from ledger import INCOME, EXPENSE, LedgerDelta, publish_deltas
+from money import parse_amount
+from categories import category_directory
+from counters import increment_counters
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per kind: ledger model, category model, category column, settlement column, settled model,
+# payment model, payment foreign key and the settled model's paid-amount column
+BULK_KINDS = {
+    INCOME: (CashIn, Income, 'income_id', 'settled_credit_id', Credit, DebtorPayment, 'credit_id', 'amount_paid'),
+    EXPENSE: (CashOut, Expense, 'expense_id', 'settled_debt_id', Debt, CreditorPayment, 'debt_id', 'amount_payed'),
+}
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _parse_id(value):
+    # int() would truncate 1.9 to 1 and accept True as 1
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+def _parse_category_id(value):
+    try:
+        return _parse_id(value)
+    except (TypeError, ValueError):
+        raise ValueError('Category not found.')
+
+def _parse_description(value):
+    if value is not None and not isinstance(value, str):
+        raise ValueError('Description must be text.')
+    if value and len(value) > 100:
+        raise ValueError('Description should not exceed 100 characters.')
+    return value
+
+def _parse_settled_id(value):
+    return None if value is None else _parse_id(value)
+
+def validate_bulk_rows(user_id, kind, rows):
+    """
+    Validate and normalize transaction rows in memory, categories coming from the category directory.
+
+    Each row is a dictionary with 'amount', 'date' (date or 'yyyy-mm-dd'), 'category_id', and
+    optionally 'description' and 'settled_id' (the Credit settled by an income row or the Debt paid
+    by an expense row).
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        rows (list): The rows to validate.
+
+    Returns:
+        tuple: (valid, errors) where valid is a list of (index, values) with the values ready to
+            insert and errors is a list of {'index': ..., 'error': ...} dictionaries.
+    """
+    _, _, category_column, settled_column, settled_model, _, _, paid_column = BULK_KINDS[kind]
+
+    # The user's categories and the system ones, from the category directory
+    category_ids = category_directory.get(user_id).by_id[kind]
+
+    # Malformed rows and settlement IDs are left out here and reported in the loop below
+    settled_ids = set()
+    for row in rows:
+        if isinstance(row, dict):
+            try:
+                settled_id = _parse_settled_id(row.get('settled_id'))
+            except (TypeError, ValueError):
+                continue
+            if settled_id is not None:
+                settled_ids.add(settled_id)
+
+    remaining = {}
+    if settled_ids:
+        for settled in settled_model.query.filter(settled_model.id.in_(settled_ids), settled_model.user_id == user_id):
+            if not settled.is_paid:
+                remaining[settled.id] = settled.amount - (getattr(settled, paid_column) or 0)
+
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError('Each transaction must be an object.')
+
+            amount = parse_amount(row.get('amount'))
+            if amount < 0:
+                raise ValueError('Please enter a non-negative amount.')
+
+            try:
+                transaction_date = _parse_date(row.get('date'))
+            except (TypeError, ValueError):
+                raise ValueError('Invalid date format. Please use YYYY-MM-DD format.')
+            if transaction_date > date.today():
+                raise ValueError('Please select a date that is not in the future.')
+
+            category_id = _parse_category_id(row.get('category_id'))
+            if category_id not in category_ids:
+                raise ValueError('Category not found.')
+
+            description = _parse_description(row.get('description'))
+
+            try:
+                settled_id = _parse_settled_id(row.get('settled_id'))
+            except (TypeError, ValueError):
+                raise ValueError('Invalid {} ID.'.format(settled_model.__name__.lower()))
+            if settled_id is not None:
+                if settled_id not in remaining:
+                    raise ValueError('No outstanding {} with ID {}.'.format(settled_model.__name__.lower(), settled_id))
+                if amount > remaining[settled_id]:
+                    raise ValueError('Paid amount exceeds the {} amount.'.format(settled_model.__name__.lower()))
+                remaining[settled_id] -= amount
+
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+
+        valid.append((index, {
+            'user_id': user_id,
+            'amount': amount,
+            'date': transaction_date,
+            category_column: category_id,
+            'description': description,
+            settled_column: settled_id,
+        }))
+
+    return valid, errors
+
+def _apply_settlements(connection, kind, values):
+    """
+    Record the payments of a chunk of settlement rows and update the settled credits or debts once each.
+    """
+    _, _, _, settled_column, settled_model, payment_model, payment_column, paid_column = BULK_KINDS[kind]
+
+    settlements = [row for row in values if row[settled_column] is not None]
+    if not settlements:
+        return
+
+    connection.execute(payment_model.__table__.insert(), [
+        {payment_column: row[settled_column], 'amount': row['amount'], 'date': row['date']}
+        for row in settlements
+    ])
+
+    paid = {}
+    for row in settlements:
+        paid[row[settled_column]] = paid.get(row[settled_column], Decimal('0.00')) + row['amount']
+
+    # The guard makes each update atomic against concurrent settlements: a credit or debt paid in
+    # the meantime matches no row and the chunk is rolled back instead of over-paying it
+    table = settled_model.__table__
+    for settled_id, amount in paid.items():
+        updated = increment_counters(
+            connection,
+            table,
+            table.c.id == settled_id,
+            {paid_column: amount},
+            derived=lambda new: {'is_paid': new[paid_column] >= table.c.amount},
+            guard=lambda new: new[paid_column] <= table.c.amount
+        )
+        if updated == 0:
+            raise ValueError('Paid amount exceeds the {} amount.'.format(settled_model.__name__.lower()))
+
+def bulk_add_transactions(user_id, kind, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert many CashIn or CashOut transactions of a user, one transaction per chunk.
+
+    Rows are validated in memory first; invalid rows are reported and skipped without aborting the
+    batch. Each chunk is inserted with executemany, its ledger deltas are published (which also
+    updates the budgets, see budgets.py) and its settlements are applied once, then it is committed.
+    A chunk that fails to write is rolled back and all its rows are reported.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        rows (list): The rows, see validate_bulk_rows.
+        chunk_size (int, optional): The number of rows per transaction. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: {'inserted': number of rows written, 'errors': list of {'index': ..., 'error': ...}}.
+    """
+    if kind not in BULK_KINDS:
+        raise ValueError("Unknown transaction kind '{}'".format(kind))
+
+    model, _, category_column = BULK_KINDS[kind][:3]
+    valid, errors = validate_bulk_rows(user_id, kind, rows)
+    inserted = 0
+
+    for offset in range(0, len(valid), chunk_size):
+        chunk = valid[offset:offset + chunk_size]
+        values = [row for _, row in chunk]
+
+        try:
+            connection = db.session.connection()
+            connection.execute(model.__table__.insert(), values)
+
+            publish_deltas(connection, [
+                LedgerDelta(user_id, kind, row[category_column], row['date'], row['amount'], 1)
+                for row in values
+            ])
+
+            _apply_settlements(connection, kind, values)
+
+            db.session.commit()
+            inserted += len(values)
+
+        except Exception as e:
+            db.session.rollback()
+            errors.extend({'index': index, 'error': str(e)} for index, _ in chunk)
+
+    errors.sort(key=lambda error: error['index'])
+    return {'inserted': inserted, 'errors': errors}
+
+def _validate_patch(user_id, kind, patch):
+    """
+    Validate the changes of a bulk edit and map them to the columns of the ledger model.
+    """
+    _, _, category_column = BULK_KINDS[kind][:3]
+
+    unknown = set(patch) - {'category_id', 'date', 'amount', 'description'}
+    if unknown:
+        raise ValueError('Cannot change {}.'.format(', '.join(sorted(unknown))))
+    if not patch:
+        raise ValueError('Nothing to change.')
+
+    values = {}
+    if 'category_id' in patch:
+        category_id = _parse_category_id(patch['category_id'])
+        if category_id not in category_directory.get(user_id).by_id[kind]:
+            raise ValueError('Category not found.')
+        values[category_column] = category_id
+
+    if 'date' in patch:
+        try:
+            values['date'] = _parse_date(patch['date'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid date format. Please use YYYY-MM-DD format.')
+        if values['date'] > date.today():
+            raise ValueError('Please select a date that is not in the future.')
+
+    if 'amount' in patch:
+        values['amount'] = parse_amount(patch['amount'])
+        if values['amount'] < 0:
+            raise ValueError('Please enter a non-negative amount.')
+
+    if 'description' in patch:
+        values['description'] = _parse_description(patch['description'])
+
+    return values
+
+def _bulk_change(user_id, kind, ids, values, chunk_size):
+    """
+    Update (values is a dict) or delete (values is None) a user's transactions with one statement
+    per chunk of IDs, publishing the ledger deltas of the old and new rows, all in one commit.
+
+    Returns:
+        tuple: (number of transactions changed, IDs that are not the user's transactions).
+    """
+    if kind not in BULK_KINDS:
+        raise ValueError("Unknown transaction kind '{}'".format(kind))
+
+    try:
+        ids = sorted({_parse_id(transaction_id) for transaction_id in ids})
+    except (TypeError, ValueError):
+        raise ValueError('Transaction IDs must be integers.')
+
+    model, _, category_column = BULK_KINDS[kind][:3]
+    table = model.__table__
+    changed = set()
+
+    try:
+        connection = db.session.connection()
+        for offset in range(0, len(ids), chunk_size):
+            chunk = ids[offset:offset + chunk_size]
+            owned = table.c.id.in_(chunk), table.c.user_id == user_id
+
+            rows = connection.execute(
+                select(table.c.id, table.c[category_column], table.c.date, table.c.amount).where(*owned)
+            ).all()
+            if not rows:
+                continue
+
+            deltas = []
+            for transaction_id, category_id, transaction_date, amount in rows:
+                deltas.append(LedgerDelta(user_id, kind, category_id, transaction_date, -amount, -1))
+                if values is not None:
+                    deltas.append(LedgerDelta(
+                        user_id,
+                        kind,
+                        values.get(category_column, category_id),
+                        values.get('date', transaction_date),
+                        values.get('amount', amount),
+                        1
+                    ))
+
+            if values is None:
+                connection.execute(table.delete().where(*owned))
+            else:
+                connection.execute(table.update().where(*owned).values(values))
+
+            # Budgets, rollups and totals take the summed corrections of the whole chunk at once
+            publish_deltas(connection, deltas)
+            changed.update(row[0] for row in rows)
+
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(changed), [transaction_id for transaction_id in ids if transaction_id not in changed]
+
+def bulk_update_transactions(user_id, kind, ids, patch, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply the same changes to many CashIn or CashOut transactions of a user.
+
+    The changes are validated once, then written with a single UPDATE per chunk of IDs. The budget,
+    rollup and total corrections of all the rows are summed before being applied, and everything
+    is committed together.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        ids (list): The IDs of the transactions to change.
+        patch (dict): The new values, any of 'category_id', 'date', 'amount' and 'description'.
+        chunk_size (int, optional): The number of IDs per statement. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: {'updated': number of transactions changed, 'missing': IDs that are not the user's transactions}.
+
+    Raises:
+        ValueError: If the kind, the IDs or the changes are invalid.
+    """
+    if kind not in BULK_KINDS:
+        raise ValueError("Unknown transaction kind '{}'".format(kind))
+
+    values = _validate_patch(user_id, kind, patch)
+    updated, missing = _bulk_change(user_id, kind, ids, values, chunk_size)
+    return {'updated': updated, 'missing': missing}
+
+def bulk_delete_transactions(user_id, kind, ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Delete many CashIn or CashOut transactions of a user with a single DELETE per chunk of IDs.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        ids (list): The IDs of the transactions to delete.
+        chunk_size (int, optional): The number of IDs per statement. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: {'deleted': number of transactions deleted, 'missing': IDs that are not the user's transactions}.
+
+    Raises:
+        ValueError: If the kind or the IDs are invalid.
+    """
+    deleted, missing = _bulk_change(user_id, kind, ids, None, chunk_size)
+    return {'deleted': deleted, 'missing': missing}
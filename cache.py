@@ -0,0 +1,223 @@
+import copy
+import functools
+import inspect as pyinspect
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from models import db, CashIn, CashOut, Debt, Credit, Budget, BudgetExpense
+from ledger import LEDGER_MODELS, register_delta_listener
+from versions import bump_versions, current_versions
+
+# Writes to these models change the results of the cached calculations of their user
+INVALIDATING_MODELS = (CashIn, CashOut, Debt, Credit, BudgetExpense)
+
+class ResultCache:
+    """
+    A size-bounded LRU cache of calculation results, keyed by (user_id, function, start_date, end_date,
+    ..., cache versions).
+
+    Results are deep-copied in and out, so callers can mutate what they get back.
+
+    Attributes:
+        maxsize (int): The maximum number of results kept.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to be calculated.
+        evictions (int): The number of results dropped to stay within maxsize.
+        invalidations (int): The number of results dropped because their user wrote.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Look up a result and mark it as recently used.
+
+        Returns:
+            tuple: (found, result).
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(self._entries[key])
+
+    def put(self, key, result):
+        """
+        Store a result, evicting the least recently used ones beyond maxsize.
+        """
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """
+        Drop every result of a user.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """
+        Drop every result. The counters are kept.
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: The size, maxsize, hits, misses, evictions and invalidations.
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+result_cache = ResultCache(maxsize=int(os.getenv('RESULT_CACHE_SIZE', 512)))
+
+def cached_calculation(function):
+    """
+    Memoize a calculation taking a user_id and optional start_date/end_date (or as_of) arguments.
+
+    Missing dates are resolved the way the calculations resolve them (start of the current month,
+    today) before building the key, so a cached result never outlives the day it was computed for.
+    The key ends with the user's cache versions, so a result never outlives a write committed by
+    another process either.
+
+    Args:
+        function (callable): The calculation to memoize.
+
+    Returns:
+        callable: The memoized calculation.
+    """
+    signature = pyinspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        arguments = arguments.arguments
+
+        today = date.today()
+        start_date = arguments.get('start_date')
+        end_date = arguments.get('end_date', arguments.get('as_of'))
+        if 'start_date' in arguments and start_date is None:
+            start_date = date(today.year, today.month, 1)
+        if ('end_date' in arguments or 'as_of' in arguments) and end_date is None:
+            end_date = today
+
+        # Any other argument, such as `detail`, is part of the key as well
+        options = tuple(value for name, value in arguments.items() if name not in ('user_id', 'start_date', 'end_date', 'as_of'))
+        key = (arguments['user_id'], function.__qualname__, start_date, end_date) + options + (current_versions(arguments['user_id']),)
+        found, result = result_cache.get(key)
+        if found:
+            return result
+
+        result = function(*args, **kwargs)
+        result_cache.put(key, result)
+        return result
+
+    wrapper.uncached = function
+    return wrapper
+
+def _owners(session, obj):
+    """
+    Return the IDs of the users whose results a pending write to `obj` affects.
+    """
+    if isinstance(obj, BudgetExpense):
+        budget = obj.__dict__.get('budget')
+        if budget is not None:
+            return {budget.user_id}
+        if obj.budget_id is None:
+            return {None}
+        return {session.connection().execute(select(Budget.user_id).where(Budget.id == obj.budget_id)).scalar()}
+
+    # Both the old and the new owner of a row moved between users
+    history = inspect(obj).attrs.user_id.history
+    return set(history.added) | set(history.deleted) | set(history.unchanged)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed_users(session, flush_context):
+    """
+    Drop the cached results of every user whose rows were written by the flush.
+
+    The versions of the users of ledger rows are bumped by invalidate_ledger_users, which sees the
+    same writes as deltas.
+    """
+    users = session.info.setdefault('result_cache_users', set())
+    unversioned = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, INVALIDATING_MODELS):
+            owners = _owners(session, obj)
+            users |= owners
+            if type(obj) not in LEDGER_MODELS:
+                unversioned |= owners
+
+    if unversioned:
+        bump_versions(session.connection(), unversioned)
+    _invalidate(users)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_finished_users(session):
+    """
+    Drop the results again once the transaction ends, in case they were read between flush and commit.
+    """
+    _invalidate(session.info.pop('result_cache_users', set()))
+
+@register_delta_listener
+def invalidate_ledger_users(connection, deltas):
+    """
+    Drop the cached results of the users of written ledger rows.
+    """
+    invalidate_users(connection, {delta.user_id for delta in deltas})
+
+def invalidate_users(connection, users):
+    """
+    Drop the cached results of some users, in this process now and in every other one once the
+    transaction of `connection` commits.
+
+    Args:
+        connection (Connection): The connection of the writing transaction.
+        users (set): The user IDs; None stands for every user.
+    """
+    bump_versions(connection, users)
+    _invalidate(users)
+
+@event.listens_for(db.metadata, 'after_create')
+@event.listens_for(db.metadata, 'after_drop')
+def _clear_on_schema_change(target, connection, **kwargs):
+    result_cache.clear()
+
+def _invalidate(users):
+    if None in users:
+        result_cache.clear()
+        return
+    for user_id in users:
+        result_cache.invalidate_user(user_id)
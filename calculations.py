@@ -1,102 +1,75 @@
-from datetime import datetime, date, timedelta
-from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, date
+from cache import cached_calculation
 
-def calculate_total_income_between_dates(user_id, start_date=None, end_date=None):
+@cached_calculation
+def calculate_total_income_between_dates(user_id, start_date=None, end_date=None, detail=False):
     """
     Calculate the total income for a user between specified dates.
 
+    Archived transactions are included: as monthly totals per category, or one by one with `detail`.
+
     Args:
         user_id (int): The user's ID.
         start_date (date, optional): The start date of the range.
         end_date (date, optional): The end date of the range.
+        detail (bool, optional): List archived transactions individually. Defaults to False.
 
     Returns:
         tuple: A tuple containing total income amount and a list of individual income transactions.
                 Each individual transaction is represented as a dictionary with keys: 'amount', 'date', 'name', 'income_type'.
 
     """
-    from models import CashIn, Income, IncomeType, db
+    from ledger import INCOME
+    from archive import range_ledger_rows
+    from money import from_cents
 
     if start_date is None:
         start_date = date(datetime.now().year, datetime.now().month, 1)
     if end_date is None:
         end_date = date.today()
 
-    cash_incomes = CashIn.query.filter(
-        CashIn.user_id == user_id,
-        CashIn.date >= start_date,
-        CashIn.date <= end_date
-    ).all()
+    # Fetch the transactions together with their category and income type names, and their total in cents
+    total_cents, individual_incomes = range_ledger_rows(user_id, INCOME, start_date, end_date, detail)
 
-    total_income = 0
-    individual_incomes = []
-
-    for cash_in in cash_incomes:
-        income = db.session.get(Income, cash_in.income_id)
-        income_type = db.session.get(IncomeType, income.income_type_id)
-        total_income += cash_in.amount
-        individual_incomes.append({
-            'amount': cash_in.amount,
-            'date': cash_in.date,
-            'name': income.name,
-            'description': cash_in.description,
-            'id': cash_in.id,
-            'income_type': income_type.name,
-            'type': 'Income',
-            'income_category_id': cash_in.income_id
-        })
-    
-    total_income = Decimal(total_income).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    total_income = from_cents(total_cents)
 
     return total_income, individual_incomes
 
-def calculate_total_expenses_between_dates(user_id, start_date=None, end_date=None):
+@cached_calculation
+def calculate_total_expenses_between_dates(user_id, start_date=None, end_date=None, detail=False):
     """
     Calculate the total expenses for a user between specified dates.
 
+    Archived transactions are included: as monthly totals per category, or one by one with `detail`.
+
     Args:
         user_id (int): The user's ID.
         start_date (date, optional): The start date of the range.
         end_date (date, optional): The end date of the range.
+        detail (bool, optional): List archived transactions individually. Defaults to False.
 
     Returns:
         tuple: A tuple containing total expenses amount and a list of individual expense transactions.
                 Each individual transaction is represented as a dictionary with keys: 'amount', 'date', 'name'.
 
     """
-    from models import CashOut, Expense, db
+    from ledger import EXPENSE
+    from archive import range_ledger_rows
+    from money import from_cents
 
     if start_date is None:
         start_date = date(datetime.now().year, datetime.now().month, 1)
     if end_date is None:
         end_date = date.today()
 
-    cash_outflows = CashOut.query.filter(
-        CashOut.user_id == user_id,
-        CashOut.date >= start_date,
-        CashOut.date <= end_date
-    ).all()
+    # Fetch the transactions together with their category names, and their total in cents
+    total_cents, individual_expenses = range_ledger_rows(user_id, EXPENSE, start_date, end_date, detail)
 
-    total_expenses = 0
-    individual_expenses = []
-
-    for cash_out in cash_outflows:
-        expense = db.session.get(Expense, cash_out.expense_id)
-        total_expenses += cash_out.amount
-        individual_expenses.append({
-            'amount': cash_out.amount,
-            'date': cash_out.date,
-            'name': expense.name,
-            'description': cash_out.description,
-            'id': cash_out.id, 
-            'type': 'Expense',
-            'expense_category_id': cash_out.expense_id
-        })
+    total_expenses = from_cents(total_cents)
 
-    total_expenses = Decimal(total_expenses).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    
     return total_expenses, individual_expenses
 
+@cached_calculation
 def calculate_total_income(user_id):
     """
     Calculate the total income for a user.
@@ -108,12 +81,13 @@ def calculate_total_income(user_id):
         float: The total income amount for the user.
 
     """
-    from models import CashIn
+    from totals import lifetime_totals
 
-    incomes = CashIn.query.filter_by(user_id=user_id).all()
-    total_income = sum(income.amount for income in incomes)
+    # Read from the lifetime counters kept up to date on every write
+    total_income, _ = lifetime_totals(user_id)
     return total_income
 
+@cached_calculation
 def calculate_total_expenses(user_id):
     """
     Calculate the total expenses for a user.
@@ -125,12 +99,13 @@ def calculate_total_expenses(user_id):
         float: The total expenses amount for the user.
 
     """
-    from models import CashOut
+    from totals import lifetime_totals
 
-    expenses = CashOut.query.filter_by(user_id=user_id).all()
-    total_expenses = sum(expense.amount for expense in expenses)
+    # Read from the lifetime counters kept up to date on every write
+    _, total_expenses = lifetime_totals(user_id)
     return total_expenses
 
+@cached_calculation
 def calculate_savings_between_dates(user_id, start_date=None, end_date=None):
     """
     Calculate a user's savings within a specified date range.
@@ -145,8 +120,15 @@ def calculate_savings_between_dates(user_id, start_date=None, end_date=None):
         float: The percentage of savings as compared to total income.
 
     """
-    total_income, _ = calculate_total_income_between_dates(user_id, start_date, end_date)
-    total_expenses, _ = calculate_total_expenses_between_dates(user_id, start_date, end_date)
+    from balance_index import index_range_totals
+
+    if start_date is None:
+        start_date = date(datetime.now().year, datetime.now().month, 1)
+    if end_date is None:
+        end_date = date.today()
+
+    # Two balance index lookups and a subtraction
+    total_income, total_expenses = index_range_totals(user_id, start_date, end_date)
 
     savings = (total_income) - (total_expenses)
     savings_percent_of_income = (savings / total_income) * 100 if total_income != 0 else 0
@@ -155,32 +137,36 @@ def calculate_savings_between_dates(user_id, start_date=None, end_date=None):
 
     return savings, savings_percent_of_income
 
+@cached_calculation
 def calculate_expense_percentage_of_income(user_id, start_date=None, end_date=None):
-    from models import Expense, CashOut, db
+    from models import Expense, DailyRollup, db
     from sqlalchemy import func
+    from ledger import EXPENSE
+    from balance_index import index_range_totals
 
     if start_date is None:
         start_date = date(datetime.now().year, datetime.now().month, 1)
     if end_date is None:
         end_date = date.today()
 
-    # Step 1: Calculate total income
-    total_income, _ = calculate_total_income_between_dates(user_id, start_date, end_date)
+    # Step 1: Calculate total income from the balance index
+    total_income, _ = index_range_totals(user_id, start_date, end_date)
     
-    # Step 2: Join CashOut and Expense models
-    cash_out_expense_join = db.session.query(CashOut, Expense).join(
-        Expense, CashOut.expense_id == Expense.id
+    # Step 2: Join the daily expense rollups and Expense models
+    rollup_expense_join = db.session.query(DailyRollup, Expense).join(
+        Expense, DailyRollup.category_id == Expense.id
     )
     
-    # Step 3: Group cash out transactions by expense_id and calculate the sum of amount
-    expense_sums = cash_out_expense_join.filter(
-        CashOut.user_id == user_id,
-        CashOut.date >= start_date,
-        CashOut.date <= end_date
-    ).group_by(Expense.id).with_entities(
+    # Step 3: Group the daily rollups by expense_id and calculate the sum of amount
+    expense_sums = rollup_expense_join.filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == EXPENSE,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    ).group_by(Expense.id).order_by(Expense.id).with_entities(
         Expense.id,
         Expense.name,
-        func.sum(CashOut.amount).label('total_amount')
+        func.sum(DailyRollup.amount).label('total_amount')
     ).all()
     
     # Step 4 and 5: Calculate percentage of each expense category's total to total income
@@ -200,5 +186,22 @@ def calculate_expense_percentage_of_income(user_id, start_date=None, end_date=No
     
     return expense_percentages
 
+@cached_calculation
+def calculate_balance_as_of(user_id, as_of=None):
+    """
+    Calculate a user's balance (all income minus all expenses) at the end of a given date.
+
+    Args:
+        user_id (int): The user's ID.
+        as_of (date, optional): The date to calculate the balance at. Defaults to today.
+
+    Returns:
+        Decimal: The balance at the end of the given date.
+    """
+    from balance_index import cumulative_as_of
 
+    if as_of is None:
+        as_of = date.today()
 
+    _, _, balance = cumulative_as_of(user_id, as_of)
+    return balance
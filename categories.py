@@ -0,0 +1,224 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event, inspect, null, or_
+from sqlalchemy.orm import Session
+from models import db, Income, Expense
+from ledger import INCOME, EXPENSE
+from breakdown import SYSTEM_CATEGORIES
+from versions import bump_versions, current_versions
+
+# An income or expense category as kept in the directory; income_type_id is None for expenses
+Category = namedtuple('Category', ['id', 'name', 'user_id', 'income_type_id', 'system'])
+
+CATEGORY_MODELS = {
+    INCOME: Income,
+    EXPENSE: Expense,
+}
+
+class UserCategories:
+    """
+    The income and expense categories visible to one user: their own and the shared system ones.
+
+    Attributes:
+        by_id (dict): Per kind, category ID to Category, system categories included.
+        by_name (dict): Per kind, name to the user's own Category.
+        system_by_name (dict): Per kind, name to the system Category.
+    """
+
+    def __init__(self, user_id):
+        self.by_id = {}
+        self.by_name = {}
+        self.system_by_name = {}
+
+        for kind, model in CATEGORY_MODELS.items():
+            system_ids = list(SYSTEM_CATEGORIES[kind])
+            income_type = model.income_type_id if model is Income else null()
+            rows = db.session.query(model.id, model.name, model.user_id, income_type).filter(
+                or_(model.user_id == user_id, model.id.in_(system_ids))
+            ).order_by(model.id)
+
+            self.by_id[kind], self.by_name[kind], self.system_by_name[kind] = {}, {}, {}
+            for category_id, name, owner_id, income_type_id in rows:
+                system = category_id in system_ids and owner_id != user_id
+                category = Category(category_id, name, owner_id, income_type_id, system)
+                self.by_id[kind][category_id] = category
+                if system:
+                    self.system_by_name[kind][name] = category
+                else:
+                    self.by_name[kind].setdefault(name, category)
+
+class CategoryDirectory:
+    """
+    A size-bounded LRU cache of UserCategories, loaded on first use and dropped when a category changes.
+
+    Each entry remembers the cache versions it was loaded at and is loaded again once they move on,
+    so categories created by another process, e.g. the importer's worker, are seen too.
+
+    Attributes:
+        maxsize (int): The maximum number of users kept.
+        loads (int): The number of times a user's categories were loaded from the database.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, user_id):
+        """
+        Return a user's categories, loading them on a miss.
+
+        Returns:
+            UserCategories: The user's categories.
+        """
+        versions = current_versions(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        categories = UserCategories(user_id)
+
+        with self._lock:
+            self.loads += 1
+            self._entries[user_id] = (versions, categories)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return categories
+
+    def invalidate_user(self, user_id):
+        """
+        Drop a user's categories.
+        """
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """
+        Drop every user's categories.
+        """
+        with self._lock:
+            self._entries.clear()
+
+category_directory = CategoryDirectory(maxsize=int(os.getenv('CATEGORY_CACHE_SIZE', 1024)))
+
+def get_category(user_id, kind, category_id):
+    """
+    Look up a category by ID.
+
+    Categories of the user and the system ones come from the directory; any other ID falls back to
+    the database.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        category_id (int): The category ID.
+
+    Returns:
+        Category: The category, or None if it does not exist.
+    """
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        return None
+
+    category = category_directory.get(user_id).by_id[kind].get(category_id)
+    if category is not None:
+        return category
+
+    model = CATEGORY_MODELS[kind]
+    row = db.session.get(model, category_id)
+    if row is None:
+        return None
+    return Category(row.id, row.name, row.user_id, getattr(row, 'income_type_id', None), False)
+
+def get_category_name(user_id, kind, category_id):
+    """
+    Look up the name of a category by ID.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        category_id (int): The category ID.
+
+    Returns:
+        str: The category name, or None if it does not exist.
+    """
+    category = get_category(user_id, kind, category_id)
+    return category.name if category else None
+
+def find_category(user_id, kind, name, include_system=False):
+    """
+    Look up one of a user's categories by name.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        name (str): The exact category name.
+        include_system (bool, optional): Also match the shared system categories, which take
+            precedence over the user's own. Defaults to False.
+
+    Returns:
+        Category: The category, or None if there is none with that name.
+    """
+    categories = category_directory.get(user_id)
+    if include_system and name in categories.system_by_name[kind]:
+        return categories.system_by_name[kind][name]
+    return categories.by_name[kind].get(name)
+
+def user_categories(user_id, kind):
+    """
+    List a user's own categories by ID.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+
+    Returns:
+        list: The user's Category tuples.
+    """
+    return [category for category in category_directory.get(user_id).by_id[kind].values() if not category.system]
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed_categories(session, flush_context):
+    """
+    Drop the directory of every user whose categories were created, renamed or deleted by the flush.
+    """
+    users = session.info.setdefault('category_directory_users', set())
+    flushed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Income, Expense)):
+            # A change to a system category is seen by every user
+            if obj.id in SYSTEM_CATEGORIES[INCOME if isinstance(obj, Income) else EXPENSE]:
+                flushed.add(None)
+            history = inspect(obj).attrs.user_id.history
+            flushed |= set(history.added) | set(history.deleted) | set(history.unchanged)
+
+    if flushed:
+        bump_versions(session.connection(), flushed)
+    users |= flushed
+    _invalidate(users)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_finished_categories(session):
+    """
+    Drop the directories again once the transaction ends, in case they were loaded between flush and commit.
+    """
+    _invalidate(session.info.pop('category_directory_users', set()))
+
+@event.listens_for(db.metadata, 'after_create')
+@event.listens_for(db.metadata, 'after_drop')
+def _clear_on_schema_change(target, connection, **kwargs):
+    category_directory.clear()
+
+def _invalidate(users):
+    if None in users:
+        category_directory.clear()
+        return
+    for user_id in users:
+        category_directory.invalidate_user(user_id)
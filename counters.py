@@ -0,0 +1,61 @@
+from sqlalchemy import bindparam, func, select
+
+def counter_increments(table, deltas):
+    """
+    Build the new-value expressions `coalesce(column, 0) + :delta` for a set of counter columns.
+
+    Args:
+        table (Table): The table holding the counters.
+        deltas (dict): Maps column names to the amount to add; negative amounts subtract.
+
+    Returns:
+        dict: Maps the column names to their new-value expressions.
+    """
+    return {
+        column: func.coalesce(table.c[column], 0) + bindparam(None, delta, type_=table.c[column].type)
+        for column, delta in deltas.items()
+    }
+
+def increment_counters(connection, table, where, deltas, derived=None, guard=None, returning=()):
+    """
+    Add to counter columns with a single `UPDATE ... SET column = column + :delta` statement.
+
+    The addition happens in the database, so concurrent increments of the same row are never lost
+    and no SELECT is needed first. A guard turns the update into a compare-and-set: rows where it
+    does not hold are left alone, e.g. to refuse a payment that would take a paid amount past the
+    amount owed.
+
+    Args:
+        connection (Connection): The connection of the transaction to update in.
+        table (Table): The table holding the counters.
+        where (ClauseElement): Selects the rows to update, e.g. `table.c.id == record_id`.
+        deltas (dict): Maps column names to the amount to add.
+        derived (callable, optional): Called with the new-value expressions; returns more columns
+            to set from them, e.g. {'is_paid': new['amount_paid'] >= table.c.amount}.
+        guard (callable, optional): Called with the new-value expressions; returns a condition the
+            updated rows must meet.
+        returning (tuple, optional): Columns to return from the updated rows, with their new values.
+            Uses RETURNING where the database supports it, and otherwise a SELECT of the rows matching
+            `where` in the same transaction.
+
+    Returns:
+        int or list: The number of rows updated, or the returned rows when `returning` is given.
+    """
+    new = counter_increments(table, deltas)
+
+    statement = table.update().where(where).values(new)
+    if derived is not None:
+        statement = statement.values(derived(new))
+    if guard is not None:
+        statement = statement.where(guard(new))
+
+    if not returning:
+        return connection.execute(statement).rowcount
+
+    if connection.dialect.update_returning:
+        return connection.execute(statement.returning(*returning)).all()
+
+    # The updated rows stay locked until the transaction ends, so this reads what was just written
+    if connection.execute(statement).rowcount == 0:
+        return []
+    return connection.execute(select(*returning).where(where)).all()
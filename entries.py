@@ -0,0 +1,227 @@
+from sqlalchemy import and_, event, func, inspect, literal, select
+from models import db, CashIn, CashOut, Income, IncomeType, Expense, LedgerEntry
+from ledger import INCOME, EXPENSE
+
+# Per kind: ledger model, the sign of its amounts, its category column and its settlement columns
+# (settled credit, settled debt) as SQL expressions over a row
+ENTRY_SOURCES = {
+    INCOME: (CashIn, '', 'income_id', ('{row}.settled_credit_id', 'NULL')),
+    EXPENSE: (CashOut, '-', 'expense_id', ('NULL', '{row}.settled_debt_id')),
+}
+
+ENTRY_COLUMNS = ('kind', 'source_id', 'user_id', 'category_id', 'amount', 'date', 'description', 'settled_credit_id', 'settled_debt_id')
+
+def _entry_values(kind, row):
+    """
+    Return the SQL expressions of an entry's ENTRY_COLUMNS for the CashIn or CashOut `row` ('NEW' or 'OLD').
+    """
+    _, sign, category_column, settlements = ENTRY_SOURCES[kind]
+    return (
+        "'{}'".format(kind),
+        '{}.id'.format(row),
+        '{}.user_id'.format(row),
+        '{}.{}'.format(row, category_column),
+        '{}{}.amount'.format(sign, row),
+        '{}.date'.format(row),
+        '{}.description'.format(row),
+    ) + tuple(settlement.format(row=row) for settlement in settlements)
+
+def ledger_triggers(kind):
+    """
+    Build the statements creating the triggers that copy a ledger table's writes into LedgerEntry.
+
+    The statements are valid on SQLite and MySQL.
+
+    Args:
+        kind (str): INCOME for the CashIn table or EXPENSE for the CashOut table.
+
+    Returns:
+        dict: Maps the trigger names to their CREATE TRIGGER statements.
+    """
+    table = ENTRY_SOURCES[kind][0].__tablename__
+    values = _entry_values(kind, 'NEW')
+    source = "kind = '{}' AND source_id = OLD.id".format(kind)
+
+    bodies = {
+        'INSERT': 'INSERT INTO ledger_entry ({}) VALUES ({});'.format(', '.join(ENTRY_COLUMNS), ', '.join(values)),
+        'UPDATE': 'UPDATE ledger_entry SET {} WHERE {};'.format(
+            ', '.join('{} = {}'.format(column, value) for column, value in zip(ENTRY_COLUMNS[1:], values[1:])), source
+        ),
+        'DELETE': 'DELETE FROM ledger_entry WHERE {};'.format(source),
+    }
+
+    return {
+        'ledger_entry_{}_{}'.format(table, operation.lower()):
+            'CREATE TRIGGER ledger_entry_{table}_{name} AFTER {operation} ON {table} FOR EACH ROW BEGIN {body} END'.format(
+                table=table, name=operation.lower(), operation=operation, body=body
+            )
+        for operation, body in bodies.items()
+    }
+
+def install_ledger_triggers(connection, kinds=(INCOME, EXPENSE)):
+    """
+    Create, or re-create, the triggers keeping LedgerEntry in step with the CashIn and CashOut tables.
+
+    Args:
+        connection (Connection): The connection to install the triggers on, inside a transaction.
+        kinds (tuple, optional): The kinds whose tables get the triggers. Defaults to both.
+
+    Returns:
+        list: The names of the triggers created.
+    """
+    created = []
+    for kind in kinds:
+        for name, statement in ledger_triggers(kind).items():
+            connection.exec_driver_sql('DROP TRIGGER IF EXISTS {}'.format(name))
+            connection.exec_driver_sql(statement)
+            created.append(name)
+    return created
+
+def _trigger_names(connection):
+    """
+    Return the names of the triggers defined in the database.
+    """
+    if connection.dialect.name == 'sqlite':
+        statement = "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    else:
+        statement = 'SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()'
+    return {row[0] for row in connection.exec_driver_sql(statement)}
+
+def _entry_rows(kind, user_id=None):
+    """
+    Select the ENTRY_COLUMNS of a kind's CashIn or CashOut rows.
+    """
+    model, sign, category_column, _ = ENTRY_SOURCES[kind]
+    rows = select(
+        literal(kind),
+        model.id,
+        model.user_id,
+        getattr(model, category_column),
+        -model.amount if sign else model.amount,
+        model.date,
+        model.description,
+        model.settled_credit_id if kind == INCOME else literal(None),
+        model.settled_debt_id if kind == EXPENSE else literal(None)
+    )
+    if user_id is not None:
+        rows = rows.where(model.user_id == user_id)
+    return rows
+
+def install_missing_ledger_triggers(connection):
+    """
+    Install the ledger entry triggers on the transaction tables that lack them and copy those tables' rows.
+
+    A database created before LedgerEntry gets an empty table from create_all and no triggers, since
+    its CashIn and CashOut tables are not created again. Tables that already have their triggers are
+    left alone, so this can be run on every start.
+
+    Args:
+        connection (Connection): The connection to migrate, inside a transaction.
+
+    Returns:
+        list: The kinds whose triggers were installed.
+    """
+    tables = set(inspect(connection).get_table_names())
+    if LedgerEntry.__tablename__ not in tables:
+        return []
+
+    existing = _trigger_names(connection)
+    kinds = [
+        kind for kind, (model, *_) in ENTRY_SOURCES.items()
+        if model.__tablename__ in tables and not set(ledger_triggers(kind)) <= existing
+    ]
+    if not kinds:
+        return []
+
+    install_ledger_triggers(connection, kinds)
+
+    table = LedgerEntry.__table__
+    for kind in kinds:
+        connection.execute(table.delete().where(table.c.kind == kind))
+        connection.execute(table.insert().from_select(ENTRY_COLUMNS, _entry_rows(kind)))
+    return kinds
+
+# Tables created by create_all get their triggers right away, and a ledger_entry table created next
+# to existing transaction tables gets their triggers and entries
+for _kind, (_model, *_) in ENTRY_SOURCES.items():
+    event.listen(_model.__table__, 'after_create', lambda table, connection, kind=_kind, **kw: install_ledger_triggers(connection, (kind,)))
+event.listen(LedgerEntry.__table__, 'after_create', lambda table, connection, **kw: install_missing_ledger_triggers(connection))
+
+def rebuild_ledger_entries(user_id=None):
+    """
+    Recompute LedgerEntry from the CashIn and CashOut rows, e.g. after a bulk write that bypassed the triggers.
+
+    Args:
+        user_id (int, optional): Only rebuild this user's entries. Defaults to every user.
+
+    Returns:
+        int: The number of entries written.
+    """
+    table = LedgerEntry.__table__
+
+    delete = table.delete()
+    if user_id is not None:
+        delete = delete.where(table.c.user_id == user_id)
+    db.session.execute(delete)
+
+    written = 0
+    for kind in ENTRY_SOURCES:
+        written += db.session.execute(table.insert().from_select(ENTRY_COLUMNS, _entry_rows(kind, user_id))).rowcount
+
+    db.session.commit()
+    return written
+
+def query_ledger_entries(user_id, start_date, end_date):
+    """
+    Fetch a user's income and expense transactions between two dates, oldest first, in one query.
+
+    The entries are read with one range scan of the (user_id, date) index, which also gives their
+    order, and joined to their Income (and IncomeType) or Expense category.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+
+    Returns:
+        list: A list of dictionaries with keys: 'amount' (positive), 'signed_amount', 'date', 'name',
+              'description', 'id' (of the CashIn or CashOut transaction), 'type' ('Income' or 'Expense')
+              and 'category_id'; income rows also have 'income_type'.
+    """
+    rows = db.session.query(
+        LedgerEntry.kind,
+        LedgerEntry.source_id,
+        LedgerEntry.amount,
+        LedgerEntry.date,
+        LedgerEntry.description,
+        LedgerEntry.category_id,
+        func.coalesce(Income.name, Expense.name),
+        IncomeType.name
+    ).outerjoin(
+        Income, and_(LedgerEntry.kind == INCOME, LedgerEntry.category_id == Income.id)
+    ).outerjoin(
+        IncomeType, Income.income_type_id == IncomeType.id
+    ).outerjoin(
+        Expense, and_(LedgerEntry.kind == EXPENSE, LedgerEntry.category_id == Expense.id)
+    ).filter(
+        LedgerEntry.user_id == user_id,
+        LedgerEntry.date >= start_date,
+        LedgerEntry.date <= end_date
+    ).order_by(LedgerEntry.date, LedgerEntry.id).all()
+
+    entries = []
+    for kind, source_id, amount, entry_date, description, category_id, name, income_type in rows:
+        entry = {
+            'amount': abs(amount),
+            'signed_amount': amount,
+            'date': entry_date,
+            'name': name,
+            'description': description,
+            'id': source_id,
+            'type': 'Income' if kind == INCOME else 'Expense',
+            'category_id': category_id
+        }
+        if kind == INCOME:
+            entry['income_type'] = income_type
+        entries.append(entry)
+    return entries
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField, DateField, FloatField
+from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField, DateField, DecimalField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, Regexp
 
 class RegistrationForm(FlaskForm):
@@ -61,14 +61,14 @@ class IncomeTransactionForm(FlaskForm):
 
     Attributes:
         incomeCategory (SelectField): Dropdown for choosing a category.
-        amount (FloatField): Field for entering the transaction amount.
+        amount (DecimalField): Field for entering the transaction amount.
         date (DateField): Field for entering the transaction date.
         debtor (SelectField): Dropdown for choosing a debtor (optional).
         description (TextAreaField): Field for entering a transaction description (optional).
     """
     
     incomeCategory = SelectField('Choose Category', coerce=int)
-    amount = FloatField('Amount', validators=[DataRequired()])
+    amount = DecimalField('Amount', places=2, validators=[DataRequired()])
     date = DateField('Date', validators=[DataRequired()])
     debtor = SelectField('Debtor (optional)')
     description = TextAreaField('Description (optional)')
@@ -0,0 +1,209 @@
+import csv
+import re
+import time
+from datetime import datetime
+from models import db, Income, IncomeType, Expense
+from ledger import INCOME, EXPENSE
+from money import parse_amount
+from bulk import DEFAULT_CHUNK_SIZE, bulk_add_transactions
+from categories import find_category
+
+# The CSV column read for each transaction field
+DEFAULT_CSV_COLUMNS = {
+    'date': 'date',
+    'amount': 'amount',
+    'description': 'description',
+    'category': 'category',
+}
+
+DEFAULT_DATE_FORMAT = '%Y-%m-%d'
+
+# Category given to imported rows without one
+UNCATEGORIZED = 'Uncategorized'
+
+# The income type of income categories created by an import
+DEFAULT_INCOME_TYPE = 'Earned Income'
+
+# At most this many row errors are kept in a report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+def read_csv_statement(stream, columns=None, date_format=DEFAULT_DATE_FORMAT):
+    """
+    Read a CSV bank statement one row at a time.
+
+    Args:
+        stream (file): A text stream over the CSV file, with a header row.
+        columns (dict, optional): The header of the column holding each field ('date', 'amount',
+            'description' and 'category'). Defaults to DEFAULT_CSV_COLUMNS.
+        date_format (str, optional): The strptime format of the dates. Defaults to DEFAULT_DATE_FORMAT.
+
+    Yields:
+        tuple: (line, entry, error) where entry is a dictionary with 'date', 'amount' (signed Decimal),
+            'description' and 'category', or None with an error message when the row can't be read.
+    """
+    columns = dict(DEFAULT_CSV_COLUMNS, **(columns or {}))
+    reader = csv.DictReader(stream)
+
+    for row in reader:
+        line = reader.line_num
+        try:
+            yield line, {
+                'date': datetime.strptime((row.get(columns['date']) or '').strip(), date_format).date(),
+                'amount': parse_amount(row.get(columns['amount'])),
+                'description': (row.get(columns['description']) or '').strip() or None,
+                'category': (row.get(columns['category']) or '').strip() or None,
+            }, None
+        except (TypeError, ValueError):
+            yield line, None, 'Invalid date or amount.'
+
+def read_ofx_statement(stream):
+    """
+    Read the transactions of an OFX bank statement (SGML or XML) one at a time.
+
+    Args:
+        stream (file): A text stream over the OFX file.
+
+    Yields:
+        tuple: (line, entry, error) as for read_csv_statement, line being where the transaction starts.
+            The category is the transaction's <TRNTYPE>.
+    """
+    fields, start = None, None
+
+    for line, text in enumerate(stream, 1):
+        for closing, tag, value in OFX_TAG.findall(text):
+            if tag == 'STMTTRN':
+                if not closing:
+                    fields, start = {}, line
+                    continue
+                if fields is None:
+                    continue
+
+                try:
+                    entry = {
+                        'date': datetime.strptime(fields.get('DTPOSTED', '')[:8], '%Y%m%d').date(),
+                        'amount': parse_amount(fields.get('TRNAMT')),
+                        'description': (fields.get('NAME') or fields.get('MEMO') or '').strip() or None,
+                        'category': (fields.get('TRNTYPE') or '').strip() or None,
+                    }
+                except (TypeError, ValueError):
+                    yield start, None, 'Invalid date or amount.'
+                else:
+                    yield start, entry, None
+                fields = None
+
+            elif fields is not None and not closing:
+                fields[tag] = value.strip()
+
+def resolve_category(user_id, kind, name):
+    """
+    Look up the ID of a user's category by name through the category directory, creating it on first use.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        name (str): The category name, UNCATEGORIZED when empty.
+
+    Returns:
+        int: The category ID.
+    """
+    name = (name or UNCATEGORIZED).strip().title()
+    category = find_category(user_id, kind, name)
+    if category is not None:
+        return category.id
+
+    if kind == INCOME:
+        income_type = IncomeType.query.filter_by(name=DEFAULT_INCOME_TYPE).first() or IncomeType.query.first()
+        if income_type is None:
+            raise ValueError('No income type to create the income category with.')
+        category = Income(user_id=user_id, name=name, income_type_id=income_type.id)
+    else:
+        category = Expense(user_id=user_id, name=name)
+
+    db.session.add(category)
+    db.session.commit()
+    return category.id
+
+def import_statement(user_id, stream, statement_format='csv', columns=None, date_format=DEFAULT_DATE_FORMAT, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import a bank statement as CashIn and CashOut transactions of a user.
+
+    The statement is streamed: at most one chunk of rows per kind is held in memory, and each full
+    chunk is written with bulk_add_transactions. Positive amounts are imported as income and negative
+    ones as expenses; categories are resolved by name through the category directory and created
+    when missing.
+
+    Args:
+        user_id (int): The user's ID.
+        stream (file): A text stream over the statement.
+        statement_format (str, optional): 'csv' or 'ofx'. Defaults to 'csv'.
+        columns (dict, optional): The CSV column mapping, see read_csv_statement.
+        date_format (str, optional): The CSV date format. Defaults to DEFAULT_DATE_FORMAT.
+        chunk_size (int, optional): The number of rows written per transaction. Defaults to DEFAULT_CHUNK_SIZE.
+        progress (callable, optional): Called with the number of rows read after each chunk is written.
+
+    Returns:
+        dict: 'rows' read, 'inserted' transactions, 'error_count', 'errors' (the first
+            MAX_REPORTED_ERRORS as {'line': ..., 'error': ...}), 'seconds' and 'rows_per_second'.
+    """
+    if statement_format == 'csv':
+        entries = read_csv_statement(stream, columns, date_format)
+    elif statement_format == 'ofx':
+        entries = read_ofx_statement(stream)
+    else:
+        raise ValueError("Unknown statement format '{}'".format(statement_format))
+
+    started = time.perf_counter()
+    pending = {INCOME: ([], []), EXPENSE: ([], [])}
+    report = {'rows': 0, 'inserted': 0, 'error_count': 0, 'errors': []}
+
+    def add_error(line, error):
+        report['error_count'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'error': error})
+
+    def flush(kind):
+        lines, rows = pending[kind]
+        if not rows:
+            return
+        result = bulk_add_transactions(user_id, kind, rows, chunk_size=chunk_size)
+        report['inserted'] += result['inserted']
+        for error in result['errors']:
+            add_error(lines[error['index']], error['error'])
+        del lines[:], rows[:]
+        if progress is not None:
+            progress(report['rows'])
+
+    for line, entry, error in entries:
+        report['rows'] += 1
+        if error:
+            add_error(line, error)
+            continue
+
+        kind = EXPENSE if entry['amount'] < 0 else INCOME
+        try:
+            category_id = resolve_category(user_id, kind, entry['category'])
+        except ValueError as e:
+            add_error(line, str(e))
+            continue
+
+        lines, rows = pending[kind]
+        lines.append(line)
+        rows.append({
+            'amount': abs(entry['amount']),
+            'date': entry['date'],
+            'category_id': category_id,
+            'description': entry['description'],
+        })
+
+        if len(rows) >= chunk_size:
+            flush(kind)
+
+    flush(INCOME)
+    flush(EXPENSE)
+
+    report['errors'].sort(key=lambda error: error['line'])
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['rows'] / report['seconds']) if report['seconds'] else report['rows']
+    return report
@@ -0,0 +1,64 @@
+import re
+from sqlalchemy import inspect
+
+def create_missing_indexes(connection, metadata):
+    """
+    Create the indexes declared on the models that an existing database does not have yet.
+
+    Indexes that already exist, and tables that don't, are left alone, so this can be run more than once.
+
+    Args:
+        connection (Connection): The connection to migrate, inside a transaction.
+        metadata (MetaData): The metadata declaring the indexes.
+
+    Returns:
+        list: The (table name, index name) pairs that were created.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    created = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing_indexes:
+                index.create(connection)
+                created.append((table.name, index.name))
+
+    return created
+
+# A SQLite plan step reading a whole table, e.g. "SCAN cash_in" but not "SCAN cash_in USING INDEX ..."
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+def full_table_scans(connection, statement, parameters=None):
+    """
+    Ask the database how it would run a statement and list the tables it would read in full.
+
+    Uses EXPLAIN QUERY PLAN on SQLite and EXPLAIN on MySQL; scans that walk an index (including
+    covering indexes) are not counted.
+
+    Args:
+        connection (Connection): A connection to the database.
+        statement (str): The SQL statement, as sent to the driver.
+        parameters (tuple or dict, optional): The statement's parameters, as sent to the driver.
+
+    Returns:
+        list: The names of the tables read with a full scan.
+
+    Raises:
+        NotImplementedError: For databases other than SQLite and MySQL.
+    """
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters or ()).all()
+        return [match.group(1) for match in (_SQLITE_SCAN.match(row[-1]) for row in plan) if match]
+
+    if dialect == 'mysql':
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters or ()).mappings().all()
+        return [row['table'] for row in plan if row['type'] == 'ALL']
+
+    raise NotImplementedError("Query plans are not supported on '{}'".format(dialect))
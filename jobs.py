@@ -0,0 +1,330 @@
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Job
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Delay before the n-th retry: RETRY_DELAY, then twice that, four times, ...
+RETRY_DELAY = timedelta(seconds=30)
+
+# A running job whose heartbeat is older than this is assumed to have lost its worker
+STALE_JOB_TIMEOUT = timedelta(hours=1)
+
+# How often the worker refreshes the heartbeat of the job it is running, progress reported or not
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Maps task names to (function, default max attempts)
+_tasks = {}
+
+def job_task(name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Register a function as a task that jobs can run.
+
+    Tasks are called as `task(progress, **payload)`, where `progress(done, total=None)` records how
+    far the task has got. Reporting progress commits the session, so call it between units of work.
+    The return value must be JSON serializable (decimals and dates are stored as strings).
+
+    Args:
+        name (str): The name jobs refer to the task by.
+        max_attempts (int, optional): How many times a job of this task may be started before it is
+            failed. Use 1 for tasks that must not be run twice. Defaults to DEFAULT_MAX_ATTEMPTS.
+
+    Returns:
+        callable: A decorator registering the task.
+    """
+    def register(function):
+        _tasks[name] = (function, max_attempts)
+        return function
+    return register
+
+def enqueue_job(name, payload=None, user_id=None, max_attempts=None):
+    """
+    Queue a job and return immediately.
+
+    Args:
+        name (str): The name of a registered task.
+        payload (dict, optional): The task's keyword arguments; must be JSON serializable.
+        user_id (int, optional): The user the job belongs to; only they can see its status.
+        max_attempts (int, optional): Overrides the task's default number of attempts.
+
+    Returns:
+        Job: The queued job.
+
+    Raises:
+        ValueError: If no task is registered under the name.
+    """
+    if name not in _tasks:
+        raise ValueError("Unknown job '{}'".format(name))
+
+    now = datetime.utcnow()
+    job = Job(
+        name=name,
+        user_id=user_id,
+        payload=json.dumps(payload or {}),
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or _tasks[name][1],
+        run_after=now,
+        progress_done=0,
+        created_at=now
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def report_progress(job_id, done, total=None):
+    """
+    Record the progress of a running job and commit.
+
+    Args:
+        job_id (int): The job's ID.
+        done (int): The units of work done so far.
+        total (int, optional): The total units of work, if known.
+    """
+    db.session.execute(Job.__table__.update().where(Job.id == job_id).values(
+        progress_done=done,
+        progress_total=total,
+        heartbeat_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+def _beat(engine, job_id, stop, interval):
+    """
+    Refresh a running job's heartbeat every `interval` seconds until `stop` is set.
+
+    Runs in a thread of the worker on its own connection, so tasks that never report progress are
+    not taken for dead while their worker is alive.
+    """
+    table = Job.__table__
+    while not stop.wait(interval):
+        try:
+            with engine.begin() as connection:
+                connection.execute(table.update().where(table.c.id == job_id, table.c.status == RUNNING).values(
+                    heartbeat_at=datetime.utcnow()
+                ))
+        except SQLAlchemyError:
+            # E.g. the database is locked by the task's own writes; the next beat is soon enough
+            pass
+
+def claim_job(worker):
+    """
+    Take the oldest job that is due and mark it as running for a worker.
+
+    The claim is a compare-and-set UPDATE on the job's status, so when several workers race for the
+    same job exactly one of them gets it and the others move on to the next one.
+
+    Args:
+        worker (str): The name of the claiming worker.
+
+    Returns:
+        Job: The claimed job, or None if no job is due.
+    """
+    table = Job.__table__
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.execute(
+            select(table.c.id).where(table.c.status == QUEUED, table.c.run_after <= now)
+            .order_by(table.c.run_after, table.c.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        claimed = db.session.execute(table.update().where(table.c.id == job_id, table.c.status == QUEUED).values(
+            status=RUNNING,
+            attempts=table.c.attempts + 1,
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            error=None
+        ))
+        db.session.commit()
+
+        if claimed.rowcount == 1:
+            return db.session.get(Job, job_id)
+
+def run_job(job):
+    """
+    Run a claimed job and record its result, or queue a retry or fail it if the task raises.
+
+    The job's heartbeat is refreshed every HEARTBEAT_INTERVAL while the task runs.
+
+    Args:
+        job (Job): A job returned by claim_job.
+
+    Returns:
+        str: The job's new status.
+    """
+    job_id = job.id
+    task = _tasks.get(job.name)
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_beat, args=(db.engine, job_id, stop, HEARTBEAT_INTERVAL.total_seconds()), daemon=True
+    )
+    heartbeat.start()
+
+    try:
+        if task is None:
+            raise LookupError("Unknown job '{}'".format(job.name))
+        try:
+            result = task[0](partial(report_progress, job_id), **json.loads(job.payload))
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.error = '{}: {}'.format(type(e).__name__, e)
+
+        if task is not None and job.attempts < job.max_attempts:
+            job.status = QUEUED
+            job.run_after = datetime.utcnow() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.status = FAILED
+            job.finished_at = datetime.utcnow()
+
+        db.session.commit()
+        return job.status
+
+    job = db.session.get(Job, job_id)
+    job.status = DONE
+    job.result = json.dumps(result, default=str)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return DONE
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """
+    Put running jobs whose worker stopped responding back in the queue, or fail them if out of attempts.
+
+    Args:
+        timeout (timedelta, optional): How long a running job may go without a heartbeat.
+            Defaults to STALE_JOB_TIMEOUT.
+
+    Returns:
+        int: The number of jobs requeued or failed.
+    """
+    table = Job.__table__
+    now = datetime.utcnow()
+    stale = (table.c.status == RUNNING) & (table.c.heartbeat_at < now - timeout)
+
+    requeued = db.session.execute(table.update().where(stale, table.c.attempts < table.c.max_attempts).values(
+        status=QUEUED, run_after=now, error='Worker stopped responding.'
+    )).rowcount
+    failed = db.session.execute(table.update().where(stale).values(
+        status=FAILED, finished_at=now, error='Worker stopped responding.'
+    )).rowcount
+    db.session.commit()
+    return requeued + failed
+
+def worker_name():
+    """
+    Name the current worker after its host and process.
+    """
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+def work(worker=None, poll_interval=DEFAULT_POLL_INTERVAL, stop_when_idle=False):
+    """
+    Run jobs one after the other, polling the queue when it is empty.
+
+    Args:
+        worker (str, optional): The worker's name. Defaults to worker_name().
+        poll_interval (float, optional): Seconds to wait before polling an empty queue again.
+        stop_when_idle (bool, optional): Return as soon as no job is due instead of polling.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    worker = worker or worker_name()
+    ran = 0
+    while True:
+        requeue_stale_jobs()
+        job = claim_job(worker)
+        if job is None:
+            if stop_when_idle:
+                return ran
+            time.sleep(poll_interval)
+            continue
+
+        run_job(job)
+        ran += 1
+
+def run_pending_jobs():
+    """
+    Run every job that is due in the current process and return the number of jobs run.
+    """
+    return work(stop_when_idle=True)
+
+def _worker_process(poll_interval):
+    from app import app
+
+    with app.app_context():
+        # Connections inherited from the parent process must not be shared
+        db.engine.dispose(close=False)
+        try:
+            work(poll_interval=poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+def run_worker_pool(processes=2, poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Start a pool of worker processes and wait for them until interrupted.
+
+    Args:
+        processes (int, optional): The number of worker processes. Defaults to 2.
+        poll_interval (float, optional): Seconds each worker waits before polling an empty queue again.
+    """
+    workers = [multiprocessing.Process(target=_worker_process, args=(poll_interval,)) for _ in range(processes)]
+    for process in workers:
+        process.start()
+
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+def job_status(job):
+    """
+    Describe a job for its status endpoint.
+
+    Args:
+        job (Job): The job.
+
+    Returns:
+        dict: The keys 'id', 'name', 'status', 'attempts', 'progress' ({'done': ..., 'total': ...}),
+            'result', 'error', 'created_at', 'started_at' and 'finished_at'.
+    """
+    timestamp = lambda value: value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'progress': {'done': job.progress_done, 'total': job.progress_total},
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_at': timestamp(job.created_at),
+        'started_at': timestamp(job.started_at),
+        'finished_at': timestamp(job.finished_at),
+    }
@@ -0,0 +1,306 @@
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+from models import db, CashIn, CashOut, ArchivedCashIn, ArchivedCashOut, Income, IncomeType, Expense
+from money import parse_amount, from_cents, stored_cents
+
+INCOME = 'income'
+EXPENSE = 'expense'
+
+# A change to the ledger: `amount` and `count` are added to the (user_id, kind, category_id, day) bucket
+LedgerDelta = namedtuple('LedgerDelta', ['user_id', 'kind', 'category_id', 'day', 'amount', 'count'])
+
+# Maps each ledger model to its kind and the attribute holding its category
+LEDGER_MODELS = {
+    CashIn: (INCOME, 'income_id'),
+    CashOut: (EXPENSE, 'expense_id'),
+}
+
+_delta_listeners = []
+
+def _ledger_source(model, archive_model, category_column, user_id, start_date, end_date, archived_ranges):
+    """
+    Select a user's rows of a ledger model between two dates, and of its archive model over some
+    ranges, as one subquery with the columns 'id', 'amount', 'date', 'description', 'category_id'
+    and 'archived'.
+    """
+    sources = [(model, False, start_date, end_date)]
+    sources.extend((archive_model, True, range_start, range_end) for range_start, range_end in archived_ranges)
+
+    return union_all(*(
+        select(
+            source.id.label('id'),
+            source.amount.label('amount'),
+            source.date.label('date'),
+            source.description.label('description'),
+            getattr(source, category_column).label('category_id'),
+            literal(archived).label('archived')
+        ).where(
+            source.user_id == user_id,
+            source.date >= range_start,
+            source.date <= range_end
+        )
+        for source, archived, range_start, range_end in sources
+    )).subquery()
+
+def query_income_rows(user_id, start_date, end_date, archived_ranges=()):
+    """
+    Fetch a user's income transactions between two dates in a single joined query.
+
+    The CashIn rows are joined to their Income category and IncomeType so that callers
+    never have to resolve category or income type names row by row.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+        archived_ranges (list, optional): (start_date, end_date) ranges of archived transactions
+            (see archive.py) to list in the same query, after the CashIn rows.
+
+    Returns:
+        list: A list of dictionaries with keys: 'amount', 'date', 'name', 'description', 'id',
+              'income_type', 'type' and 'income_category_id'. Archived transactions also have
+              'archived' set to True.
+    """
+    return query_income_ledger(user_id, start_date, end_date, archived_ranges)[1]
+
+def query_income_ledger(user_id, start_date, end_date, archived_ranges=()):
+    """
+    Fetch a user's income transactions between two dates, like query_income_rows, and their total.
+
+    The amounts are read as the integer cents they are stored as and summed as ints.
+
+    Returns:
+        tuple: (the total in cents, the rows of query_income_rows).
+    """
+    rows = _ledger_source(CashIn, ArchivedCashIn, 'income_id', user_id, start_date, end_date, archived_ranges)
+
+    rows = db.session.query(
+        rows.c.id,
+        stored_cents(rows.c.amount),
+        rows.c.date,
+        rows.c.description,
+        rows.c.category_id,
+        Income.name,
+        IncomeType.name,
+        rows.c.archived
+    ).outerjoin(
+        Income, rows.c.category_id == Income.id
+    ).outerjoin(
+        IncomeType, Income.income_type_id == IncomeType.id
+    ).order_by(rows.c.archived, rows.c.id).all()
+
+    total_cents = 0
+    incomes = []
+    for cash_in_id, cents, cash_in_date, description, income_id, income_name, income_type_name, archived in rows:
+        total_cents += cents
+        income = {
+            'amount': from_cents(cents),
+            'date': cash_in_date,
+            'name': income_name,
+            'description': description,
+            'id': cash_in_id,
+            'income_type': income_type_name,
+            'type': 'Income',
+            'income_category_id': income_id
+        }
+        if archived:
+            income['archived'] = True
+        incomes.append(income)
+    return total_cents, incomes
+
+def query_expense_rows(user_id, start_date, end_date, archived_ranges=()):
+    """
+    Fetch a user's expense transactions between two dates in a single joined query.
+
+    The CashOut rows are joined to their Expense category so that callers never have to
+    resolve category names row by row.
+
+    Args:
+        user_id (int): The user's ID.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+        archived_ranges (list, optional): (start_date, end_date) ranges of archived transactions
+            (see archive.py) to list in the same query, after the CashOut rows.
+
+    Returns:
+        list: A list of dictionaries with keys: 'amount', 'date', 'name', 'description', 'id',
+              'type' and 'expense_category_id'. Archived transactions also have 'archived' set to True.
+    """
+    return query_expense_ledger(user_id, start_date, end_date, archived_ranges)[1]
+
+def query_expense_ledger(user_id, start_date, end_date, archived_ranges=()):
+    """
+    Fetch a user's expense transactions between two dates, like query_expense_rows, and their total.
+
+    The amounts are read as the integer cents they are stored as and summed as ints.
+
+    Returns:
+        tuple: (the total in cents, the rows of query_expense_rows).
+    """
+    rows = _ledger_source(CashOut, ArchivedCashOut, 'expense_id', user_id, start_date, end_date, archived_ranges)
+
+    rows = db.session.query(
+        rows.c.id,
+        stored_cents(rows.c.amount),
+        rows.c.date,
+        rows.c.description,
+        rows.c.category_id,
+        Expense.name,
+        rows.c.archived
+    ).outerjoin(
+        Expense, rows.c.category_id == Expense.id
+    ).order_by(rows.c.archived, rows.c.id).all()
+
+    total_cents = 0
+    expenses = []
+    for cash_out_id, cents, cash_out_date, description, expense_id, expense_name, archived in rows:
+        total_cents += cents
+        expense = {
+            'amount': from_cents(cents),
+            'date': cash_out_date,
+            'name': expense_name,
+            'description': description,
+            'id': cash_out_id,
+            'type': 'Expense',
+            'expense_category_id': expense_id
+        }
+        if archived:
+            expense['archived'] = True
+        expenses.append(expense)
+    return total_cents, expenses
+
+def register_delta_listener(listener):
+    """
+    Register a function to be called with every batch of ledger deltas.
+
+    Listeners are called as `listener(connection, deltas)` inside the transaction that wrote the
+    CashIn/CashOut rows, so anything they write commits or rolls back together with the ledger.
+
+    Args:
+        listener (callable): The function to register.
+
+    Returns:
+        callable: The listener, so this can be used as a decorator.
+    """
+    _delta_listeners.append(listener)
+    return listener
+
+def merge_deltas(deltas):
+    """
+    Combine deltas that touch the same bucket and drop the ones that cancel out.
+
+    Args:
+        deltas (iterable): LedgerDelta instances.
+
+    Returns:
+        list: The merged LedgerDelta instances.
+    """
+    merged = {}
+    for delta in deltas:
+        key = (delta.user_id, delta.kind, delta.category_id, delta.day)
+        amount, count = merged.get(key, (Decimal('0.00'), 0))
+        merged[key] = (amount + delta.amount, count + delta.count)
+
+    return [
+        LedgerDelta(user_id, kind, category_id, day, amount, count)
+        for (user_id, kind, category_id, day), (amount, count) in merged.items()
+        if amount != 0 or count != 0
+    ]
+
+def publish_deltas(connection, deltas):
+    """
+    Hand a batch of ledger deltas to every registered listener.
+
+    Write paths that bypass the ORM unit of work (bulk inserts, set-based updates) must call this
+    themselves with the deltas of the rows they touched.
+
+    Args:
+        connection (Connection): The connection of the transaction that wrote the rows.
+        deltas (iterable): LedgerDelta instances.
+    """
+    deltas = merge_deltas(deltas)
+    if not deltas:
+        return
+
+    for listener in _delta_listeners:
+        listener(connection, deltas)
+
+def to_amount(value):
+    """
+    Convert an amount as stored on a ledger row (float, int, str or Decimal) to a 2-place Decimal.
+    """
+    if value is None:
+        return Decimal('0.00')
+    return parse_amount(value)
+
+def _row_delta(obj, sign, previous=False):
+    """
+    Build the delta that adds (sign=1) or removes (sign=-1) a ledger row.
+
+    When `previous` is True the values the row had before its pending changes are used.
+    """
+    kind, category_attribute = LEDGER_MODELS[type(obj)]
+    state = inspect(obj)
+
+    values = {}
+    for key in ('user_id', category_attribute, 'date', 'amount'):
+        history = state.attrs[key].history
+        if previous and history.deleted:
+            values[key] = history.deleted[0]
+        else:
+            values[key] = getattr(obj, key)
+
+    if values['user_id'] is None or values['date'] is None:
+        return None
+
+    # Rows are bucketed by day even when a datetime was assigned
+    day = values['date'].date() if isinstance(values['date'], datetime) else values['date']
+
+    return LedgerDelta(
+        values['user_id'],
+        kind,
+        values[category_attribute],
+        day,
+        sign * to_amount(values['amount']),
+        sign
+    )
+
+@event.listens_for(Session, 'before_flush')
+def _collect_ledger_deltas(session, flush_context, instances):
+    """
+    Record the deltas of the CashIn/CashOut rows about to be inserted, updated or deleted.
+    """
+    deltas = []
+    session.info['ledger_deltas'] = deltas
+
+    for obj in session.new:
+        if type(obj) in LEDGER_MODELS:
+            deltas.append(_row_delta(obj, 1))
+
+    for obj in session.dirty:
+        if type(obj) in LEDGER_MODELS and session.is_modified(obj):
+            deltas.append(_row_delta(obj, -1, previous=True))
+            deltas.append(_row_delta(obj, 1))
+
+    for obj in session.deleted:
+        if type(obj) in LEDGER_MODELS:
+            deltas.append(_row_delta(obj, -1, previous=True))
+
+@event.listens_for(Session, 'after_flush')
+def _publish_ledger_deltas(session, flush_context):
+    """
+    Publish the deltas recorded for the flush that just succeeded, on the same connection.
+    """
+    deltas = [delta for delta in session.info.pop('ledger_deltas', []) if delta is not None]
+    if deltas:
+        publish_deltas(session.connection(), deltas)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_ledger_deltas(session):
+    """
+    Forget the deltas of a flush that failed.
+    """
+    session.info.pop('ledger_deltas', None)
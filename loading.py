@@ -0,0 +1,36 @@
+import os
+from sqlalchemy.orm import joinedload, selectinload
+
+# How eager() loads relationships: 'selectin' runs one SELECT ... WHERE id IN (...) per relationship
+# in the chain, 'joined' adds a LEFT OUTER JOIN to the query itself. Either way the number of queries
+# does not grow with the number of rows
+EAGER_LOADING = os.getenv('EAGER_LOADING', 'selectin')
+
+LOADERS = {
+    'selectin': selectinload,
+    'joined': joinedload,
+}
+
+def eager(*path, strategy=None):
+    """
+    Build a loader option that loads a chain of relationships together with the queried rows.
+
+    Args:
+        *path: The relationship attributes, e.g. (Budget.expenses, BudgetExpense.expense).
+        strategy (str, optional): 'selectin' or 'joined'. Defaults to EAGER_LOADING.
+
+    Returns:
+        Load: The option, to pass to Query.options().
+
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+    strategy = strategy or EAGER_LOADING
+    if strategy not in LOADERS:
+        raise ValueError("Unknown loading strategy '{}'".format(strategy))
+
+    loader = LOADERS[strategy]
+    option = loader(path[0])
+    for attribute in path[1:]:
+        option = getattr(option, loader.__name__)(attribute)
+    return option
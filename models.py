@@ -1,5 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm.attributes import set_committed_value
+from money import Money, parse_amount
+from counters import increment_counters
 
 db = SQLAlchemy()
 
@@ -50,13 +53,16 @@ class Income(db.Model):
         name (str): The name of the income.
         user_id (int): The foreign key referencing the associated User.
         income_type_id (int): The foreign key referencing the associated IncomeType.
+        income_type (relationship): Many-to-one relationship with IncomeType.
     """
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     income_type_id = db.Column(db.Integer, db.ForeignKey('income_type.id'), nullable=False)
 
+    income_type = db.relationship('IncomeType')
+
     def __repr__(self):
         return f"<Income {self.name}>"
 
@@ -72,7 +78,7 @@ class Expense(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
 
     budget_expenses = db.relationship('BudgetExpense', back_populates='expense', cascade='all, delete-orphan')
 
@@ -91,19 +97,31 @@ class CashIn(db.Model):
         date (date): The date of the cash inflow transaction.
         description: Details of the transaction
         settled_credit_id (int): The foreign key referencing the associated Credit (optional).
+        income (relationship): Many-to-one relationship with Income.
         settled_credit (relationship): Many-to-one relationship with Credit.
     """
 
+    # The ledger columns keep their previous value when replaced so that edits can be
+    # rolled up as deltas (see ledger.py)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    income_id = db.Column(db.Integer, db.ForeignKey('income.id'), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
-    date = db.Column(db.Date, nullable=False)
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False), active_history=True)
+    income_id = db.column_property(db.Column(db.Integer, db.ForeignKey('income.id'), nullable=False), active_history=True)
+    amount = db.column_property(db.Column(Money, nullable=False), active_history=True)
+    date = db.column_property(db.Column(db.Date, nullable=False), active_history=True)
     description = db.Column(db.String(100), nullable=True)
     settled_credit_id = db.Column(db.Integer, db.ForeignKey('credit.id'), nullable=True)
 
+    income = db.relationship('Income')
     settled_credit = db.relationship('Credit', back_populates='cash_in_transactions')
 
+    # (user_id, date) ranges read date, amount and category from the index alone; the second index
+    # serves a category's transactions and the third the transactions settling a credit
+    __table_args__ = (
+        db.Index('ix_cash_in_user_date', 'user_id', 'date', 'amount', 'income_id'),
+        db.Index('ix_cash_in_user_income_date', 'user_id', 'income_id', 'date'),
+        db.Index('ix_cash_in_settled_credit', 'settled_credit_id'),
+    )
+
     def update_transaction(self, new_description, new_amount, new_date, new_income_id):
         # Update the transaction attributes
         self.description = new_description
@@ -132,19 +150,31 @@ class CashOut(db.Model):
         expense_id (int): The foreign key referencing the associated Expense.
         description: Details of the transaction
         settled_debt_id (int): The foreign key referencing the associated Debt (optional).
+        expense (relationship): Many-to-one relationship with Expense.
         settled_debt (relationship): Many-to-one relationship with Debt.
     """
 
+    # The ledger columns keep their previous value when replaced so that edits can be
+    # rolled up as deltas (see ledger.py)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
-    date = db.Column(db.Date, nullable=False)
-    expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'), nullable=False)
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False), active_history=True)
+    amount = db.column_property(db.Column(Money, nullable=False), active_history=True)
+    date = db.column_property(db.Column(db.Date, nullable=False), active_history=True)
+    expense_id = db.column_property(db.Column(db.Integer, db.ForeignKey('expense.id'), nullable=False), active_history=True)
     description = db.Column(db.String(100), nullable=True)
     settled_debt_id = db.Column(db.Integer, db.ForeignKey('debt.id'), nullable=True)
 
+    expense = db.relationship('Expense')
     settled_debt = db.relationship('Debt', back_populates='cash_out_transactions')
 
+    # (user_id, date) ranges read date, amount and category from the index alone; the second index
+    # serves a category's transactions and the third the transactions paying a debt
+    __table_args__ = (
+        db.Index('ix_cash_out_user_date', 'user_id', 'date', 'amount', 'expense_id'),
+        db.Index('ix_cash_out_user_expense_date', 'user_id', 'expense_id', 'date'),
+        db.Index('ix_cash_out_settled_debt', 'settled_debt_id'),
+    )
+
     def update_transaction(self, new_description, new_amount, new_date, new_expense_id):
         # Update the transaction attributes
         self.description = new_description
@@ -161,6 +191,93 @@ class CashOut(db.Model):
     def __repr__(self):
         return f"<CashOut {self.amount} on {self.date}>"
 
+class DailyRollup(db.Model):
+    """
+    Represents the total of a user's transactions in one category on one day.
+
+    Rows are maintained in the same unit of work as the CashIn/CashOut writes they summarize
+    (see rollups.py), so reports can sum days and categories instead of transactions.
+
+    Attributes:
+        id (int): The unique identifier for the rollup row.
+        user_id (int): The foreign key referencing the associated User.
+        kind (str): 'income' for CashIn rows or 'expense' for CashOut rows.
+        category_id (int): The Income or Expense the transactions belong to.
+        day (date): The day being summarized.
+        amount (float): The sum of the transaction amounts.
+        count (int): The number of transactions.
+
+    Constraints:
+        Unique constraint on user_id, kind, category_id and day.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    amount = db.Column(Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'kind', 'category_id', 'day', name='_daily_rollup_uc'),)
+
+    def __repr__(self):
+        return f"<DailyRollup {self.kind} {self.category_id} on {self.day}: {self.amount}>"
+
+class BalanceIndex(db.Model):
+    """
+    Represents a user's running totals as of the end of a day with activity.
+
+    Every row holds the cumulative income and expense of all transactions dated on or before `day`,
+    so the total of any date range is the difference of two rows (see balance_index.py).
+
+    Attributes:
+        id (int): The unique identifier for the index row.
+        user_id (int): The foreign key referencing the associated User.
+        day (date): The day the running totals are taken at.
+        cumulative_income (float): The income of all transactions up to and including `day`.
+        cumulative_expense (float): The expenses of all transactions up to and including `day`.
+        balance (float): cumulative_income minus cumulative_expense.
+
+    Constraints:
+        Unique constraint on user_id and day.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    cumulative_income = db.Column(Money, nullable=False, default=0)
+    cumulative_expense = db.Column(Money, nullable=False, default=0)
+    balance = db.Column(Money, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'day', name='_balance_index_uc'),)
+
+    def __repr__(self):
+        return f"<BalanceIndex User {self.user_id} on {self.day}: {self.balance}>"
+
+class UserTotals(db.Model):
+    """
+    Represents a user's lifetime income and expense counters.
+
+    The counters are updated in the same transaction as every CashIn/CashOut write (see totals.py).
+
+    Attributes:
+        user_id (int): The foreign key referencing the associated User.
+        total_income (float): The sum of all the user's CashIn amounts.
+        total_expense (float): The sum of all the user's CashOut amounts.
+        income_count (int): The number of CashIn transactions.
+        expense_count (int): The number of CashOut transactions.
+    """
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    total_income = db.Column(Money, nullable=False, default=0)
+    total_expense = db.Column(Money, nullable=False, default=0)
+    income_count = db.Column(db.Integer, nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserTotals User {self.user_id}: {self.total_income} in, {self.total_expense} out>"
+
 class Budget(db.Model):
     """
     Represents a budget for a specific month and year with its associated expenses.
@@ -187,7 +304,7 @@ class Budget(db.Model):
     # Add a unique constraint on user_id and month
     __table_args__ = (db.UniqueConstraint('user_id', 'year', 'month', name='_user_month_uc'),)
 
-    expenses = db.relationship('BudgetExpense', back_populates='budget', cascade='all, delete-orphan')
+    expenses = db.relationship('BudgetExpense', back_populates='budget', cascade='all, delete-orphan', order_by='BudgetExpense.id')
 
     def __repr__(self):
         return f"<Budget {self.year}-{self.month} for User {self.user_id}>"
@@ -202,13 +319,15 @@ class BudgetExpense(db.Model):
         expense_id (int): The foreign key referencing the associated Expense.
         expected_amount (float): The expected amount to be spent on the expense in the budget.
         spent_amount (float): The amount that has been spent on the expense in the budget.
+        budget (relationship): Many-to-one relationship with Budget.
+        expense (relationship): Many-to-one relationship with Expense.
     """
     
     id = db.Column(db.Integer, primary_key=True)
     budget_id = db.Column(db.Integer, db.ForeignKey('budget.id'), nullable=False)
     expense_id = db.Column(db.Integer, db.ForeignKey('expense.id', ondelete='CASCADE'), nullable=False)
-    expected_amount = db.Column(db.Numeric(10, 2), nullable=False)
-    spent_amount = db.Column(db.Numeric(10, 2), default=0.0)
+    expected_amount = db.Column(Money, nullable=False)
+    spent_amount = db.Column(Money, default=0.0)
 
     budget = db.relationship('Budget', back_populates='expenses')
     expense = db.relationship('Expense', back_populates='budget_expenses')
@@ -217,13 +336,12 @@ class BudgetExpense(db.Model):
     __table_args__ = (db.UniqueConstraint('budget_id', 'expense_id'),)
 
     def update_spent_amount(self, amount):
-        # Update the transaction attributes
-        if self.spent_amount == 0:
-            self.spent_amount = amount
-        else:
-            self.spent_amount += amount
-        db.session.commit()
-        
+        # Added in the database so concurrent updates are not lost; committed with the caller's unit
+        # of work. Spending recorded as CashOut rows is added by the ledger (see budgets.py), not
+        # through this method
+        table = BudgetExpense.__table__
+        rows = increment_counters(db.session.connection(), table, table.c.id == self.id, {'spent_amount': parse_amount(amount)}, returning=(table.c.spent_amount,))
+        set_committed_value(self, 'spent_amount', rows[0].spent_amount)
 
     def __repr__(self):
         return f"<BudgetExpense budget_id={self.budget_id}, expense_id={self.expense_id}>"
@@ -248,15 +366,21 @@ class Debt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     creditor = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(Money, nullable=False)
     date_taken = db.Column(db.Date, nullable=False)
     description = db.Column(db.String(200), nullable=True)
     date_due = db.Column(db.Date, nullable=True)
     is_paid = db.Column(db.Boolean, default=False)
-    amount_payed = db.Column(db.Numeric(10, 2), default=0.0)
+    amount_payed = db.Column(Money, default=0.0)
 
     cash_out_transactions = db.relationship('CashOut', back_populates='settled_debt', cascade='all')
 
+    # Outstanding debts, and debts taken in a date range (summed from the index alone)
+    __table_args__ = (
+        db.Index('ix_debt_user_is_paid', 'user_id', 'is_paid'),
+        db.Index('ix_debt_user_date_taken', 'user_id', 'date_taken', 'amount'),
+    )
+
 
 
     def __repr__(self):
@@ -275,9 +399,12 @@ class CreditorPayment(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     debt_id = db.Column(db.Integer, db.ForeignKey('debt.id'), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(Money, nullable=False)
     date = db.Column(db.Date, nullable=False)
 
+    # A debt's payments are summed from the index alone (see settlements.reconcile_settlements)
+    __table_args__ = (db.Index('ix_creditor_payment_debt', 'debt_id', 'amount'),)
+
     def __repr__(self):
         return f"<CreditorPayment {self.amount} for debt {self.debt_id} on {self.date}>"
 
@@ -301,15 +428,21 @@ class Credit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     debtor = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(Money, nullable=False)
     date_taken = db.Column(db.Date, nullable=False)
     description = db.Column(db.String(200), nullable=True)
     date_due = db.Column(db.Date, nullable=True)
     is_paid = db.Column(db.Boolean, default=False)
-    amount_paid = db.Column(db.Numeric(10, 2), default=0.0)
+    amount_paid = db.Column(Money, default=0.0)
 
     cash_in_transactions = db.relationship('CashIn', back_populates='settled_credit', cascade='all')
 
+    # Outstanding credits, and credits listed or summed by date taken
+    __table_args__ = (
+        db.Index('ix_credit_user_is_paid', 'user_id', 'is_paid'),
+        db.Index('ix_credit_user_date_taken', 'user_id', 'date_taken', 'amount'),
+    )
+
     def __repr__(self):
         return f"<Credit {self.amount} from {self.debtor} on {self.date_taken}>"
     
@@ -326,15 +459,298 @@ class DebtorPayment(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     credit_id = db.Column(db.Integer, db.ForeignKey('credit.id'), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(Money, nullable=False)
     date = db.Column(db.Date, nullable=False)
 
+    # A credit's payments are summed from the index alone (see settlements.reconcile_settlements)
+    __table_args__ = (db.Index('ix_debtor_payment_credit', 'credit_id', 'amount'),)
+
     # Define a relationship with the Credit model to associate payments with a specific credit
     #credit = db.relationship('Credit', back_populates='payments')
 
     def __repr__(self):
         return f"<DebtorPayment {self.amount} for Credit {self.credit_id} on {self.date}>"
 
+class ReconciliationWatermark(db.Model):
+    """
+    Records how far a reconciliation has checked a table, so the next run only covers newer rows.
+
+    Attributes:
+        name (str): The reconciled table, e.g. 'credit' or 'debt'.
+        last_record_id (int): The highest record ID checked by the last run.
+        last_payment_id (int): The highest payment ID checked by the last run.
+        reconciled_at (datetime): When the last run finished.
+    """
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_record_id = db.Column(db.Integer, nullable=False, default=0)
+    last_payment_id = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ReconciliationWatermark {self.name}: record {self.last_record_id}, payment {self.last_payment_id}>"
+
+class RecurringTransaction(db.Model):
+    """
+    Represents a transaction that repeats on a schedule, such as rent, a salary or a subscription.
+
+    Due occurrences are written as CashIn or CashOut rows by the materializer (see recurring.py).
+
+    Attributes:
+        id (int): The unique identifier for the recurring transaction.
+        user_id (int): The foreign key referencing the associated User.
+        kind (str): 'income' for CashIn occurrences or 'expense' for CashOut occurrences.
+        category_id (int): The Income or Expense the occurrences are recorded under.
+        amount (float): The amount of each occurrence.
+        description (str): The description of each occurrence.
+        frequency (str): 'daily', 'weekly', 'monthly' or 'yearly'.
+        interval (int): The number of frequency units between occurrences.
+        start_date (date): The date of the first occurrence; monthly and yearly occurrences keep its day.
+        end_date (date): The last date an occurrence may fall on (optional).
+        next_date (date): The date of the next occurrence not yet materialized, None once finished.
+        is_active (bool): Indicates whether occurrences are still being materialized.
+        occurrences (relationship): One-to-many relationship with RecurringOccurrence.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column(Money, nullable=False)
+    description = db.Column(db.String(100), nullable=True)
+    frequency = db.Column(db.String(10), nullable=False)
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+    next_date = db.Column(db.Date, nullable=True, index=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+
+    occurrences = db.relationship('RecurringOccurrence', back_populates='recurring', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f"<RecurringTransaction {self.kind} {self.amount} {self.frequency} from {self.start_date}>"
+
+class RecurringOccurrence(db.Model):
+    """
+    Records that one occurrence of a recurring transaction has been materialized.
+
+    Attributes:
+        id (int): The unique identifier for the occurrence.
+        recurring_id (int): The foreign key referencing the associated RecurringTransaction.
+        date (date): The date of the occurrence.
+
+    Constraints:
+        Unique constraint on recurring_id and date, so an occurrence is never written twice.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    recurring_id = db.Column(db.Integer, db.ForeignKey('recurring_transaction.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+
+    recurring = db.relationship('RecurringTransaction', back_populates='occurrences')
+
+    __table_args__ = (db.UniqueConstraint('recurring_id', 'date', name='_recurring_occurrence_uc'),)
+
+    def __repr__(self):
+        return f"<RecurringOccurrence {self.recurring_id} on {self.date}>"
+
+class Job(db.Model):
+    """
+    Represents a unit of background work queued for the job workers (see jobs.py).
+
+    Attributes:
+        id (int): The unique identifier for the job.
+        name (str): The name of the registered task to run.
+        user_id (int): The foreign key referencing the User who queued the job (optional).
+        payload (str): The task's keyword arguments, as JSON.
+        status (str): 'queued', 'running', 'done' or 'failed'.
+        attempts (int): The number of times the job has been started.
+        max_attempts (int): The number of times the job may be started before it is failed.
+        run_after (datetime): The job is not started before this time (used to delay retries).
+        progress_done (int): The units of work done so far, as reported by the task.
+        progress_total (int): The total units of work, when the task knows it.
+        result (str): The task's return value, as JSON.
+        error (str): The error of the last failed attempt.
+        worker (str): The worker running, or that last ran, the job.
+        created_at (datetime): When the job was queued.
+        started_at (datetime): When the last attempt started.
+        heartbeat_at (datetime): When the running job last reported progress.
+        finished_at (datetime): When the job finished or failed for good.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    worker = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name}: {self.status}>"
+
+class LedgerEntry(db.Model):
+    """
+    Represents a CashIn or CashOut transaction in the unified, signed ledger (see entries.py).
+
+    Rows are written by database triggers on the CashIn and CashOut tables, which remain the models
+    transactions are written through, so income and expense can be read together in one range scan.
+
+    Attributes:
+        id (int): The unique identifier for the entry.
+        kind (str): 'income' for CashIn transactions or 'expense' for CashOut transactions.
+        source_id (int): The ID of the CashIn or CashOut transaction.
+        user_id (int): The foreign key referencing the associated User.
+        category_id (int): The Income or Expense the transaction is recorded under.
+        amount (float): The amount, positive for income and negative for expenses.
+        date (date): The date of the transaction.
+        description (str): Details of the transaction.
+        settled_credit_id (int): The Credit a CashIn transaction settled (optional).
+        settled_debt_id (int): The Debt a CashOut transaction settled (optional).
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    source_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(100), nullable=True)
+    settled_credit_id = db.Column(db.Integer, nullable=True)
+    settled_debt_id = db.Column(db.Integer, nullable=True)
+
+    # The unique constraint serves the triggers, the index a user's entries in date order
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'source_id', name='_ledger_entry_source_uc'),
+        db.Index('ix_ledger_entry_user_date', 'user_id', 'date'),
+    )
+
+    def __repr__(self):
+        return f"<LedgerEntry {self.kind} {self.amount} on {self.date}>"
+
+class ArchivedCashIn(db.Model):
+    """
+    Represents a CashIn transaction moved out of the hot table by the archiver (see archive.py).
+
+    Attributes:
+        id (int): The ID the transaction had in the CashIn table.
+        user_id (int): The foreign key referencing the associated User.
+        income_id (int): The foreign key referencing the associated Income.
+        amount (float): The amount of cash inflow.
+        date (date): The date of the cash inflow transaction.
+        description (str): Details of the transaction.
+        settled_credit_id (int): The ID of the Credit the transaction settled (optional).
+        archived_at (datetime): When the transaction was archived.
+    """
+
+    __tablename__ = 'cash_in_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    income_id = db.Column(db.Integer, db.ForeignKey('income.id'), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(100), nullable=True)
+    settled_credit_id = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index('ix_cash_in_archive_user_date', 'user_id', 'date', 'amount', 'income_id'),)
+
+    def __repr__(self):
+        return f"<ArchivedCashIn {self.amount} on {self.date}>"
+
+class ArchivedCashOut(db.Model):
+    """
+    Represents a CashOut transaction moved out of the hot table by the archiver (see archive.py).
+
+    Attributes:
+        id (int): The ID the transaction had in the CashOut table.
+        user_id (int): The foreign key referencing the associated User.
+        expense_id (int): The foreign key referencing the associated Expense.
+        amount (float): The amount of cash outflow.
+        date (date): The date of the cash outflow transaction.
+        description (str): Details of the transaction.
+        settled_debt_id (int): The ID of the Debt the transaction settled (optional).
+        archived_at (datetime): When the transaction was archived.
+    """
+
+    __tablename__ = 'cash_out_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(100), nullable=True)
+    settled_debt_id = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index('ix_cash_out_archive_user_date', 'user_id', 'date', 'amount', 'expense_id'),)
+
+    def __repr__(self):
+        return f"<ArchivedCashOut {self.amount} on {self.date}>"
+
+class ArchiveMonthlyTotal(db.Model):
+    """
+    Represents the archived transactions of one user, kind, category and month, summed.
+
+    Attributes:
+        id (int): The unique identifier for the total.
+        user_id (int): The foreign key referencing the associated User.
+        kind (str): 'income' for archived CashIn rows or 'expense' for archived CashOut rows.
+        category_id (int): The Income or Expense the transactions were recorded under.
+        month (date): The first day of the month.
+        amount (float): The sum of the archived transactions.
+        count (int): The number of archived transactions.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Date, nullable=False)
+    amount = db.Column(Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', 'category_id', 'month', name='_archive_monthly_total_uc'),
+        db.Index('ix_archive_monthly_total_user_kind_month', 'user_id', 'kind', 'month'),
+    )
+
+    def __repr__(self):
+        return f"<ArchiveMonthlyTotal {self.kind} {self.category_id} {self.month}: {self.amount}>"
+
+class CacheVersion(db.Model):
+    """
+    Counts the writes that invalidate one user's cached results and categories.
+
+    The counter is incremented in the writing transaction (see versions.py), and the in-process
+    caches key their entries by it, so a write committed by any process is seen by all of them.
+
+    Attributes:
+        user_id (int): The user's ID, or 0 for writes that affect every user.
+        version (int): The number of invalidating transactions so far.
+    """
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.user_id}: {self.version}>"
+
 def initialize_default_income_types():
     """
     Initialize default income types and global categories.
@@ -0,0 +1,167 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from sqlalchemy import BigInteger, Numeric, inspect, text, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+_CENT = Decimal('1')
+
+class Money(TypeDecorator):
+    """
+    An amount of money stored as an integer number of cents.
+
+    Python code reads and writes Decimal amounts with two decimal places (floats, ints and strings
+    are accepted on write), while the database stores and aggregates plain integers.
+
+    Python values are converted to cents when they are compared or combined directly with a Money
+    column; group them first in longer expressions, e.g. `column + (income - expense)`.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_cents(value)
+
+def to_cents(value):
+    """
+    Convert an amount (int, float, str or Decimal) to an integer number of cents, rounding half up.
+
+    Args:
+        value: The amount. Strings may contain thousands separators and the '/=' suffix.
+
+    Returns:
+        int: The amount in cents.
+
+    Raises:
+        ValueError: If the value is not a valid amount.
+    """
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        # repr gives the shortest string that round-trips, so 0.1 is parsed as 0.1 and not 0.1000000000000000055
+        value = repr(value)
+    if isinstance(value, str):
+        value = value.replace(',', '').replace('/=', '').strip()
+    try:
+        return int((Decimal(value) * 100).quantize(_CENT, rounding=ROUND_HALF_UP))
+    except (InvalidOperation, TypeError):
+        raise ValueError("Invalid amount '{}'".format(value))
+
+def from_cents(cents):
+    """
+    Convert an integer number of cents to a Decimal amount with two decimal places.
+
+    Args:
+        cents (int): The amount in cents.
+
+    Returns:
+        Decimal: The amount.
+    """
+    return Decimal(int(cents)).scaleb(-2)
+
+def stored_cents(column):
+    """
+    Read a Money column, or a sum of one, as the integer cents it is stored as instead of a Decimal.
+
+    Args:
+        column (ColumnElement): The Money column or expression.
+
+    Returns:
+        ColumnElement: The same expression typed as BIGINT.
+    """
+    return type_coerce(column, BigInteger)
+
+def parse_amount(value):
+    """
+    Parse an amount entered by a user into a Decimal with two decimal places.
+
+    Args:
+        value: The amount as submitted (str, int or float).
+
+    Returns:
+        Decimal: The amount.
+
+    Raises:
+        ValueError: If the value is not a valid amount.
+    """
+    return from_cents(to_cents(value))
+
+def format_money(value):
+    """
+    Format an amount the way the pages display it, e.g. 1,234.50/=.
+
+    Args:
+        value: The amount, as a Decimal or any value accepted by to_cents.
+
+    Returns:
+        str: The formatted amount.
+    """
+    cents = to_cents(value)
+    sign = '-' if cents < 0 else ''
+    units, cents = divmod(abs(cents), 100)
+    return '{}{:,}.{:02d}/='.format(sign, units, cents)
+
+def money_columns(metadata):
+    """
+    List every (table name, column name) of a metadata stored with the Money type.
+    """
+    return [
+        (table.name, column.name)
+        for table in metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, Money)
+    ]
+
+def migrate_amounts_to_cents(connection, metadata):
+    """
+    Convert amount columns still stored as decimals to integer cents.
+
+    Columns already stored as integers are left alone, so this can be run more than once. Each table
+    is widened first, so that multiplying by 100 cannot overflow, then its values are converted and the
+    columns are switched to BIGINT.
+
+    Args:
+        connection (Connection): The connection to migrate, inside a transaction.
+        metadata (MetaData): The metadata holding the Money columns.
+
+    Returns:
+        list: The (table name, column name) pairs that were converted.
+    """
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    pending = {}
+    for table_name, column_name in money_columns(metadata):
+        if table_name not in existing_tables:
+            continue
+        column_type = {column['name']: column['type'] for column in inspector.get_columns(table_name)}.get(column_name)
+        if isinstance(column_type, Numeric):
+            pending.setdefault(table_name, []).append(column_name)
+
+    operations = Operations(MigrationContext.configure(connection))
+    converted = []
+
+    for table_name, column_names in pending.items():
+        with operations.batch_alter_table(table_name) as batch:
+            for column_name in column_names:
+                batch.alter_column(column_name, type_=Numeric(20, 2))
+
+        assignments = ', '.join('{0} = ROUND({0} * 100)'.format(column_name) for column_name in column_names)
+        connection.execute(text('UPDATE {} SET {}'.format(table_name, assignments)))
+
+        with operations.batch_alter_table(table_name) as batch:
+            for column_name in column_names:
+                batch.alter_column(column_name, type_=BigInteger())
+
+        converted.extend((table_name, column_name) for column_name in column_names)
+
+    return converted
@@ -0,0 +1,98 @@
+from collections import namedtuple
+from sqlalchemy import select
+from models import db, CashIn, CashOut, Credit, Debt
+from ledger import INCOME, EXPENSE
+from money import format_money
+
+# Read-only rows for the list pages. Named tuples keep no per-instance __dict__, are not tracked by
+# the session's identity map and support the attribute access the templates use
+TransactionRow = namedtuple('TransactionRow', ['id', 'category_id', 'amount', 'date', 'description'])
+CreditRow = namedtuple('CreditRow', ['id', 'debtor', 'amount', 'amount_paid', 'date_taken', 'date_due', 'description', 'is_paid'])
+DebtRow = namedtuple('DebtRow', ['id', 'creditor', 'amount', 'amount_payed', 'date_taken', 'date_due', 'description', 'is_paid'])
+
+# Per kind: ledger model and its category column name
+PROJECTED_KINDS = {
+    INCOME: (CashIn, 'income_id'),
+    EXPENSE: (CashOut, 'expense_id'),
+}
+
+def project(row_type, statement):
+    """
+    Run a SELECT of exactly the fields of `row_type`, in order, and return its rows as `row_type` rows.
+
+    Args:
+        row_type (type): A named tuple type.
+        statement (Select): The query, selecting one column per field of `row_type`.
+
+    Returns:
+        list: The `row_type` rows.
+    """
+    return [row_type._make(row) for row in db.session.execute(statement)]
+
+def category_transactions(user_id, kind, category_id):
+    """
+    List a user's transactions of one Income or Expense category, in ID order.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        category_id (int): The Income or Expense ID.
+
+    Returns:
+        list: TransactionRow rows.
+    """
+    model, category_column = PROJECTED_KINDS[kind]
+    category = getattr(model, category_column)
+
+    return project(TransactionRow, select(
+        model.id, category, model.amount, model.date, model.description
+    ).where(model.user_id == user_id, category == category_id).order_by(model.id))
+
+def user_credits(user_id):
+    """
+    List a user's credits, the most recently taken first.
+
+    Args:
+        user_id (int): The user's ID.
+
+    Returns:
+        list: CreditRow rows.
+    """
+    return project(CreditRow, select(
+        Credit.id, Credit.debtor, Credit.amount, Credit.amount_paid, Credit.date_taken, Credit.date_due,
+        Credit.description, Credit.is_paid
+    ).where(Credit.user_id == user_id).order_by(Credit.date_taken.desc()))
+
+def user_debts(user_id):
+    """
+    List a user's debts, the most recently taken first.
+
+    Args:
+        user_id (int): The user's ID.
+
+    Returns:
+        list: DebtRow rows.
+    """
+    return project(DebtRow, select(
+        Debt.id, Debt.creditor, Debt.amount, Debt.amount_payed, Debt.date_taken, Debt.date_due,
+        Debt.description, Debt.is_paid
+    ).where(Debt.user_id == user_id).order_by(Debt.date_taken.desc()))
+
+def serialize_transaction(row, category_name):
+    """
+    Convert a TransactionRow to the JSON the category filters of the income and expense pages return.
+
+    Args:
+        row (TransactionRow): The transaction.
+        category_name (str): The name of its category.
+
+    Returns:
+        dict: The keys 'id', 'category', 'amount' (formatted), 'date' ('yyyy-mm-dd') and 'description'.
+    """
+    return {
+        'id': row.id,
+        'category': category_name,
+        'amount': format_money(row.amount),
+        'date': row.date.strftime('%Y-%m-%d'),
+        'description': row.description
+    }
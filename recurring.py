@@ -0,0 +1,332 @@
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
+from models import db, CashIn, CashOut, Income, Expense, RecurringTransaction, RecurringOccurrence
+from ledger import INCOME, EXPENSE, LedgerDelta, publish_deltas
+from money import parse_amount
+from categories import category_directory
+
+DEFAULT_BATCH_SIZE = 500
+
+# A new recurring transaction with more occurrences than this already due is caught up on by a job
+MAX_INLINE_OCCURRENCES = 100
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+# Per kind: ledger model, its category column and the category model
+RECURRING_KINDS = {
+    INCOME: (CashIn, 'income_id', Income),
+    EXPENSE: (CashOut, 'expense_id', Expense),
+}
+
+def occurrence_date(frequency, interval, start_date, index):
+    """
+    Compute the date of the index-th occurrence of a schedule (the first one has index 0).
+
+    Months and years are counted from the start date rather than from the previous occurrence, so a
+    schedule starting on the 31st falls on the last day of shorter months and back on the 31st after.
+
+    Args:
+        frequency (str): 'daily', 'weekly', 'monthly' or 'yearly'.
+        interval (int): The number of frequency units between occurrences.
+        start_date (date): The date of the first occurrence.
+        index (int): The occurrence number.
+
+    Returns:
+        date: The date of the occurrence.
+    """
+    step = index * interval
+    if frequency == 'daily':
+        return start_date + timedelta(days=step)
+    if frequency == 'weekly':
+        return start_date + timedelta(weeks=step)
+    if frequency == 'monthly':
+        return start_date + relativedelta(months=step)
+    return start_date + relativedelta(years=step)
+
+def _first_index_from(frequency, interval, start_date, day):
+    """
+    Find the number of the first occurrence falling on or after a day.
+    """
+    if day <= start_date:
+        return 0
+
+    if frequency in ('daily', 'weekly'):
+        unit = interval * (7 if frequency == 'weekly' else 1)
+        index = (day - start_date).days // unit
+    else:
+        months = (day.year - start_date.year) * 12 + day.month - start_date.month
+        index = months // (interval * (12 if frequency == 'yearly' else 1))
+
+    while occurrence_date(frequency, interval, start_date, index) < day:
+        index += 1
+    return index
+
+def due_dates(template, until):
+    """
+    List the occurrences of a recurring transaction due from its next date up to a day.
+
+    Args:
+        template: A RecurringTransaction or a row with the same columns.
+        until (date): The last day to materialize.
+
+    Returns:
+        tuple: (dates, next_date) where dates are the due occurrence dates and next_date is the
+            first occurrence after them, None once the schedule has ended.
+    """
+    last_date = until if template.end_date is None else min(until, template.end_date)
+    index = _first_index_from(template.frequency, template.interval, template.start_date, template.next_date)
+
+    dates = []
+    day = occurrence_date(template.frequency, template.interval, template.start_date, index)
+    while day <= last_date:
+        dates.append(day)
+        index += 1
+        day = occurrence_date(template.frequency, template.interval, template.start_date, index)
+
+    if template.end_date is not None and day > template.end_date:
+        day = None
+    return dates, day
+
+def due_count(template, until):
+    """
+    Count the occurrences of a recurring transaction due from its next date up to a day, without listing them.
+
+    Args:
+        template: A RecurringTransaction or a row with the same columns.
+        until (date): The last day to materialize.
+
+    Returns:
+        int: The number of due occurrences.
+    """
+    last_date = until if template.end_date is None else min(until, template.end_date)
+    if template.next_date > last_date:
+        return 0
+
+    first = _first_index_from(template.frequency, template.interval, template.start_date, template.next_date)
+    end = _first_index_from(template.frequency, template.interval, template.start_date, last_date + timedelta(days=1))
+    return end - first
+
+def create_recurring_transaction(user_id, kind, category_id, amount, frequency, start_date, interval=1, end_date=None, description=None):
+    """
+    Add a recurring transaction for a user.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        category_id (int): The Income or Expense category of the occurrences.
+        amount (Decimal): The amount of each occurrence.
+        frequency (str): 'daily', 'weekly', 'monthly' or 'yearly'.
+        start_date (date): The date of the first occurrence.
+        interval (int, optional): The number of frequency units between occurrences. Defaults to 1.
+        end_date (date, optional): The last date an occurrence may fall on.
+        description (str, optional): The description of each occurrence.
+
+    Returns:
+        RecurringTransaction: The new recurring transaction.
+
+    Raises:
+        ValueError: If any of the values is invalid.
+    """
+    if kind not in RECURRING_KINDS:
+        raise ValueError("Unknown transaction kind '{}'".format(kind))
+
+    if category_id not in category_directory.get(user_id).by_id[kind]:
+        raise ValueError('Category not found.')
+
+    amount = parse_amount(amount)
+    if amount <= 0:
+        raise ValueError('Please enter a positive amount.')
+
+    if frequency not in FREQUENCIES:
+        raise ValueError('Frequency must be one of {}.'.format(', '.join(FREQUENCIES)))
+
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError('Interval must be a positive whole number.')
+
+    if end_date is not None and end_date < start_date:
+        raise ValueError('End date cannot be before the start date.')
+
+    if description and len(description) > 100:
+        raise ValueError('Description should not exceed 100 characters.')
+
+    recurring = RecurringTransaction(
+        user_id=user_id,
+        kind=kind,
+        category_id=category_id,
+        amount=amount,
+        description=description,
+        frequency=frequency,
+        interval=interval,
+        start_date=start_date,
+        end_date=end_date,
+        next_date=start_date,
+        is_active=True
+    )
+    db.session.add(recurring)
+    db.session.commit()
+    return recurring
+
+def _existing_categories(connection, templates):
+    """
+    Find which of the categories used by a batch of templates still exist, one query per kind.
+    """
+    existing = {}
+    for kind, (_, _, category_model) in RECURRING_KINDS.items():
+        ids = {template.category_id for template in templates if template.kind == kind}
+        existing[kind] = set(connection.execute(
+            select(category_model.id).where(category_model.id.in_(ids))
+        ).scalars()) if ids else set()
+    return existing
+
+def _materialize_batch(connection, templates, until):
+    """
+    Write the due occurrences of a batch of templates and move their next dates, without committing.
+
+    Returns:
+        int: The number of transactions written.
+    """
+    categories = _existing_categories(connection, templates)
+
+    # Occurrences already written, e.g. by a run that moved next_date back or a concurrent one
+    occurrences = RecurringOccurrence.__table__
+    written = set(connection.execute(
+        select(occurrences.c.recurring_id, occurrences.c.date).where(
+            occurrences.c.recurring_id.in_([template.id for template in templates]),
+            occurrences.c.date >= min(template.next_date for template in templates)
+        )
+    ).tuples())
+
+    claimed, rows, deltas, updates = [], {kind: [] for kind in RECURRING_KINDS}, [], []
+    for template in templates:
+        if template.category_id not in categories.get(template.kind, ()):
+            # The category was deleted: stop the schedule rather than write orphaned transactions
+            updates.append({'template_id': template.id, 'new_next_date': template.next_date, 'new_is_active': False})
+            continue
+
+        dates, next_date = due_dates(template, until)
+        _, category_column, _ = RECURRING_KINDS[template.kind]
+        for day in dates:
+            if (template.id, day) in written:
+                continue
+            claimed.append({'recurring_id': template.id, 'date': day})
+            rows[template.kind].append({
+                'user_id': template.user_id,
+                category_column: template.category_id,
+                'amount': template.amount,
+                'date': day,
+                'description': template.description,
+            })
+            deltas.append(LedgerDelta(template.user_id, template.kind, template.category_id, day, template.amount, 1))
+
+        updates.append({'template_id': template.id, 'new_next_date': next_date, 'new_is_active': next_date is not None})
+
+    # The occurrence rows go first: their unique constraint stops two runs writing the same one
+    if claimed:
+        connection.execute(occurrences.insert(), claimed)
+
+    for kind, kind_rows in rows.items():
+        if kind_rows:
+            connection.execute(RECURRING_KINDS[kind][0].__table__.insert(), kind_rows)
+
+    publish_deltas(connection, deltas)
+
+    table = RecurringTransaction.__table__
+    connection.execute(
+        table.update().where(table.c.id == bindparam('template_id')).values(
+            next_date=bindparam('new_next_date'),
+            is_active=bindparam('new_is_active')
+        ),
+        updates
+    )
+
+    return len(claimed)
+
+def materialize_recurring(until=None, user_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write every due occurrence of the active recurring transactions as CashIn or CashOut rows.
+
+    Templates are read in batches of `batch_size` by ID. For each batch the occurrence rows, the
+    transactions, their ledger deltas and the templates' next dates are written with one statement
+    per table and committed together, so a run that is interrupted or repeated never writes an
+    occurrence twice, and a run after downtime catches up on everything missed.
+
+    Args:
+        until (date, optional): The last day to materialize. Defaults to today.
+        user_id (int, optional): Only materialize this user's recurring transactions.
+        batch_size (int, optional): The number of templates per transaction. Defaults to DEFAULT_BATCH_SIZE.
+
+    Returns:
+        dict: {'templates': templates processed, 'transactions': transactions written, 'batches': commits}.
+    """
+    until = until or date.today()
+    table = RecurringTransaction.__table__
+    report = {'templates': 0, 'transactions': 0, 'batches': 0}
+
+    last_id, retried = 0, False
+    while True:
+        query = select(table).where(
+            table.c.is_active.is_(True),
+            table.c.next_date <= until,
+            table.c.id > last_id
+        ).order_by(table.c.id).limit(batch_size)
+        if user_id is not None:
+            query = query.where(table.c.user_id == user_id)
+
+        try:
+            connection = db.session.connection()
+            templates = connection.execute(query).all()
+            if not templates:
+                db.session.commit()
+                break
+
+            written = _materialize_batch(connection, templates, until)
+            db.session.commit()
+
+        except IntegrityError:
+            # Another run wrote some of these occurrences first; read the batch again once
+            db.session.rollback()
+            if retried:
+                raise
+            retried = True
+            continue
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+        last_id, retried = templates[-1].id, False
+        report['templates'] += len(templates)
+        report['transactions'] += written
+        report['batches'] += 1
+
+    return report
+
+def user_recurring_transactions(user_id):
+    """
+    List a user's recurring transactions.
+
+    Args:
+        user_id (int): The user's ID.
+
+    Returns:
+        list: A list of dictionaries with keys: 'id', 'kind', 'category_id', 'amount', 'description',
+              'frequency', 'interval', 'start_date', 'end_date', 'next_date' and 'is_active'.
+    """
+    return [
+        {
+            'id': recurring.id,
+            'kind': recurring.kind,
+            'category_id': recurring.category_id,
+            'amount': recurring.amount,
+            'description': recurring.description,
+            'frequency': recurring.frequency,
+            'interval': recurring.interval,
+            'start_date': recurring.start_date,
+            'end_date': recurring.end_date,
+            'next_date': recurring.next_date,
+            'is_active': recurring.is_active,
+        }
+        for recurring in RecurringTransaction.query.filter_by(user_id=user_id).order_by(RecurringTransaction.id)
+    ]
@@ -0,0 +1,169 @@
+from decimal import Decimal
+from sqlalchemy import and_, case, func, literal, select
+from models import db, DailyRollup
+from ledger import INCOME, EXPENSE, register_delta_listener
+from archive import ledger_rows
+
+@register_delta_listener
+def apply_rollup_deltas(connection, deltas):
+    """
+    Fold a batch of ledger deltas into the DailyRollup table.
+
+    Each bucket is incremented in place; buckets that do not exist yet are inserted and buckets
+    left without transactions are removed.
+
+    Args:
+        connection (Connection): The connection of the transaction that wrote the ledger rows.
+        deltas (list): LedgerDelta instances.
+    """
+    table = DailyRollup.__table__
+
+    for delta in deltas:
+        bucket = and_(
+            table.c.user_id == delta.user_id,
+            table.c.kind == delta.kind,
+            table.c.category_id == delta.category_id,
+            table.c.day == delta.day
+        )
+
+        result = connection.execute(
+            table.update().where(bucket).values(
+                amount=table.c.amount + delta.amount,
+                count=table.c.count + delta.count
+            )
+        )
+
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                user_id=delta.user_id,
+                kind=delta.kind,
+                category_id=delta.category_id,
+                day=delta.day,
+                amount=delta.amount,
+                count=delta.count
+            ))
+        elif delta.count < 0:
+            connection.execute(table.delete().where(bucket, table.c.count <= 0))
+
+def rebuild_rollups(user_id=None):
+    """
+    Recompute the DailyRollup table from the CashIn and CashOut rows, archived ones included.
+
+    Args:
+        user_id (int, optional): Only rebuild this user's rollups. Defaults to every user.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    table = DailyRollup.__table__
+    columns = ['user_id', 'kind', 'category_id', 'day', 'amount', 'count']
+
+    delete = table.delete()
+    if user_id is not None:
+        delete = delete.where(table.c.user_id == user_id)
+    db.session.execute(delete)
+
+    written = 0
+    for kind in (INCOME, EXPENSE):
+        # Archived transactions are still part of the daily totals
+        rows = ledger_rows(kind, user_id)
+        grouped = select(
+            rows.c.user_id,
+            literal(kind),
+            rows.c.category_id,
+            rows.c.date,
+            func.sum(rows.c.amount),
+            func.count(rows.c.id)
+        ).group_by(rows.c.user_id, rows.c.category_id, rows.c.date)
+
+        written += db.session.execute(table.insert().from_select(columns, grouped)).rowcount
+
+    db.session.commit()
+    return written
+
+def rollup_category_totals(user_id, kind, start_date, end_date):
+    """
+    Sum a user's transactions per category between two dates.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+
+    Returns:
+        dict: A dictionary mapping category IDs to their total amounts (Decimal).
+    """
+    rows = db.session.query(
+        DailyRollup.category_id,
+        func.sum(DailyRollup.amount)
+    ).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == kind,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    ).group_by(DailyRollup.category_id).all()
+
+    return {category_id: total for category_id, total in rows}
+
+def rollup_total(user_id, kind, start_date, end_date):
+    """
+    Sum all of a user's transactions of one kind between two dates.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        start_date (date): The start date of the range (inclusive).
+        end_date (date): The end date of the range (inclusive).
+
+    Returns:
+        Decimal: The total amount, 0 when there are no transactions.
+    """
+    total = db.session.query(func.sum(DailyRollup.amount)).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == kind,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    ).scalar()
+
+    return total if total is not None else Decimal('0.00')
+
+def rollup_bucket_totals(user_id, kind, buckets):
+    """
+    Sum a user's transactions of one kind for several date ranges in one query.
+
+    Args:
+        user_id (int): The user's ID.
+        kind (str): INCOME or EXPENSE.
+        buckets (list): A list of (start_date, end_date) tuples, both inclusive.
+
+    Returns:
+        list: The total amount of each bucket, in the order given (0 for empty buckets).
+    """
+    if not buckets:
+        return []
+
+    bucket_index = case(
+        *[
+            (and_(DailyRollup.day >= start_date, DailyRollup.day <= end_date), index)
+            for index, (start_date, end_date) in enumerate(buckets)
+        ],
+        else_=None
+    ).label('bucket')
+
+    rows = db.session.query(
+        bucket_index,
+        func.sum(DailyRollup.amount)
+    ).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == kind,
+        DailyRollup.day >= min(start_date for start_date, _ in buckets),
+        DailyRollup.day <= max(end_date for _, end_date in buckets)
+    ).group_by(bucket_index).all()
+
+    totals = [0] * len(buckets)
+    for index, total in rows:
+        if index is not None:
+            totals[index] = total
+
+    return totals
@@ -0,0 +1,251 @@
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, func, or_, select
+from counters import increment_counters
+from models import db, CashIn, CashOut, Credit, Debt, CreditorPayment, DebtorPayment, ReconciliationWatermark
+from money import Money, parse_amount
+
+# The system categories settlement transactions are recorded under (see breakdown.py)
+SETTLED_CREDIT_INCOME_ID = 2
+SETTLED_DEBT_EXPENSE_ID = 2
+
+DEFAULT_RECONCILE_BATCH_SIZE = 1000
+
+# Per reconciled table: settled model, its paid-amount column, payment model and the payment's foreign key
+RECONCILED_TABLES = {
+    'credit': (Credit, 'amount_paid', DebtorPayment, 'credit_id'),
+    'debt': (Debt, 'amount_payed', CreditorPayment, 'debt_id'),
+}
+
+# The settled Credit or Debt's row after the payment, the payment recorded against it and the
+# CashIn or CashOut moving the money
+Settlement = namedtuple('Settlement', ['record', 'payment', 'transaction'])
+
+class SettlementNotFound(ValueError):
+    """
+    Raised when the credit or debt to settle does not exist or belongs to another user.
+    """
+
+def _refuse_settlement(connection, model, owned, amount):
+    """
+    Raise the reason a settlement's paid-amount update matched no row.
+    """
+    table = model.__table__
+    record = connection.execute(select(table.c.is_paid).where(owned)).first()
+    if record is None:
+        raise SettlementNotFound('{} not found or unauthorized'.format(model.__name__))
+
+    if record.is_paid:
+        raise ValueError('The {} is already paid.'.format(model.__name__.lower()))
+
+    if amount <= 0:
+        raise ValueError('Please enter a positive amount.')
+
+    raise ValueError('Paid amount exceeds the {} amount.'.format(model.__name__.lower()))
+
+def _settle(user_id, model, record_id, amount, paid_column, build):
+    amount = parse_amount(amount)
+    table = model.__table__
+    owned = (table.c.id == record_id) & (table.c.user_id == user_id)
+
+    try:
+        connection = db.session.connection()
+
+        # Adding the payment in the database and guarding on the result makes concurrent
+        # settlements of the same record queue up on its row instead of over-paying it
+        rows = increment_counters(
+            connection,
+            table,
+            owned,
+            {paid_column: amount},
+            derived=lambda new: {'is_paid': new[paid_column] >= table.c.amount},
+            guard=lambda new: table.c.is_paid.is_not(True) & (new[paid_column] <= table.c.amount),
+            returning=tuple(table.c)
+        ) if amount > 0 else []
+
+        if not rows:
+            _refuse_settlement(connection, model, owned, amount)
+
+        record = rows[0]
+        payment, transaction = build(record, amount)
+        db.session.add_all([payment, transaction])
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return Settlement(record, payment, transaction)
+
+def settle_credit_payment(user_id, credit_id, amount, date, income_id=SETTLED_CREDIT_INCOME_ID, description=None):
+    """
+    Record money received against a credit (someone who owes the user).
+
+    The paid amount is raised with a single guarded UPDATE, then the DebtorPayment and the CashIn
+    are written in the same commit, so concurrent settlements of the same credit can't over-pay it.
+
+    Args:
+        user_id (int): The user's ID.
+        credit_id (int): The ID of the credit being settled.
+        amount (Decimal): The amount received.
+        date (date): The date of the payment.
+        income_id (int, optional): The income category of the CashIn. Defaults to Settled Credit.
+        description (str, optional): The CashIn description. Defaults to "settling <debtor>'s credit".
+
+    Returns:
+        Settlement: The credit's row after the payment, the DebtorPayment and the CashIn.
+
+    Raises:
+        SettlementNotFound: If the credit does not exist or belongs to another user.
+        ValueError: If the credit is already paid or the amount is not positive or exceeds what is owed.
+    """
+    def build(credit, amount):
+        payment = DebtorPayment(credit_id=credit.id, amount=amount, date=date)
+        cash_in = CashIn(
+            user_id=user_id,
+            income_id=income_id,
+            amount=amount,
+            date=date,
+            description=description or "settling {}'s credit".format(credit.debtor),
+            settled_credit_id=credit.id
+        )
+        return payment, cash_in
+
+    return _settle(user_id, Credit, credit_id, amount, 'amount_paid', build)
+
+def settle_debt_payment(user_id, debt_id, amount, date, expense_id=SETTLED_DEBT_EXPENSE_ID, description=None):
+    """
+    Record money paid back against a debt (someone the user owes).
+
+    The paid amount is raised with a single guarded UPDATE, then the CreditorPayment and the CashOut
+    are written in the same commit, so concurrent settlements of the same debt can't over-pay it.
+
+    Args:
+        user_id (int): The user's ID.
+        debt_id (int): The ID of the debt being paid.
+        amount (Decimal): The amount paid.
+        date (date): The date of the payment.
+        expense_id (int, optional): The expense category of the CashOut. Defaults to Settled Debt.
+        description (str, optional): The CashOut description. Defaults to "settling <creditor>'s debt".
+
+    Returns:
+        Settlement: The debt's row after the payment, the CreditorPayment and the CashOut.
+
+    Raises:
+        SettlementNotFound: If the debt does not exist or belongs to another user.
+        ValueError: If the debt is already paid or the amount is not positive or exceeds what is owed.
+    """
+    def build(debt, amount):
+        payment = CreditorPayment(debt_id=debt.id, amount=amount, date=date)
+        cash_out = CashOut(
+            user_id=user_id,
+            expense_id=expense_id,
+            amount=amount,
+            date=date,
+            description=description or "settling {}'s debt".format(debt.creditor),
+            settled_debt_id=debt.id
+        )
+        return payment, cash_out
+
+    return _settle(user_id, Debt, debt_id, amount, 'amount_payed', build)
+
+def _reconcile_table(name, repair, full, batch_size):
+    """
+    Compare the paid amounts of one table with the sum of its payments, batch by batch.
+    """
+    model, paid_column, payment_model, payment_column = RECONCILED_TABLES[name]
+    records, payments = model.__table__, payment_model.__table__
+    paid = records.c[paid_column]
+
+    watermark = db.session.get(ReconciliationWatermark, name)
+
+    # Rows written while the run is in progress are left for the next one
+    last_record_id = db.session.execute(select(func.max(records.c.id))).scalar() or 0
+    last_payment_id = db.session.execute(select(func.max(payments.c.id))).scalar() or 0
+
+    scope = records.c.id <= last_record_id
+    if watermark is not None and not full:
+        # Only records created, or paid against, since the last run
+        scope = scope & or_(
+            records.c.id > watermark.last_record_id,
+            records.c.id.in_(select(payments.c[payment_column]).where(payments.c.id > watermark.last_payment_id))
+        )
+
+    total_paid = func.coalesce(func.sum(payments.c.amount), 0)
+    drift, after_id = [], 0
+    while True:
+        batch = db.session.execute(
+            select(records.c.id, records.c.user_id, records.c.amount, paid, records.c.is_paid, total_paid)
+            .select_from(records.outerjoin(payments, payments.c[payment_column] == records.c.id))
+            .where(scope, records.c.id > after_id)
+            .group_by(records.c.id)
+            .order_by(records.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        after_id = batch[-1].id
+
+        corrections = []
+        for record_id, user_id, amount, stored_paid, stored_is_paid, actual_paid in batch:
+            stored_paid = stored_paid if stored_paid is not None else Decimal('0.00')
+            actual_is_paid = actual_paid >= amount
+            mismatched = False
+
+            if stored_paid != actual_paid:
+                drift.append({'table': name, 'id': record_id, 'user_id': user_id, 'column': paid_column, 'stored': stored_paid, 'actual': actual_paid})
+                mismatched = True
+            if bool(stored_is_paid) != actual_is_paid:
+                drift.append({'table': name, 'id': record_id, 'user_id': user_id, 'column': 'is_paid', 'stored': bool(stored_is_paid), 'actual': actual_is_paid})
+                mismatched = True
+
+            if mismatched:
+                corrections.append({'record_id': record_id, 'stored_paid': stored_paid, 'actual_paid': actual_paid, 'actual_is_paid': actual_is_paid})
+
+        if repair and corrections:
+            # A settlement committed since the batch was read changed the paid amount; leave that record alone
+            db.session.execute(
+                records.update().where(
+                    records.c.id == bindparam('record_id'),
+                    func.coalesce(paid, 0) == bindparam('stored_paid', type_=Money)
+                ).values({paid_column: bindparam('actual_paid', type_=Money), 'is_paid': bindparam('actual_is_paid')}),
+                corrections
+            )
+        db.session.commit()
+
+    if repair:
+        if watermark is None:
+            watermark = ReconciliationWatermark(name=name)
+            db.session.add(watermark)
+        watermark.last_record_id = max(last_record_id, watermark.last_record_id or 0)
+        watermark.last_payment_id = max(last_payment_id, watermark.last_payment_id or 0)
+        watermark.reconciled_at = datetime.utcnow()
+        db.session.commit()
+
+    return drift
+
+def reconcile_settlements(repair=True, full=False, batch_size=DEFAULT_RECONCILE_BATCH_SIZE):
+    """
+    Recompute the paid amounts of credits and debts from their payments and report or repair the drift.
+
+    Each table is checked with one grouped query per batch of `batch_size` records, over all users.
+    After the first run only the records created or paid against since the previous run are
+    checked, using the highest record and payment IDs that run saw as a watermark.
+
+    Args:
+        repair (bool, optional): Overwrite the paid amounts and flags that drifted and move the
+            watermark. Defaults to True.
+        full (bool, optional): Check every record instead of the ones changed since the last run.
+            Defaults to False.
+        batch_size (int, optional): The number of records per query and commit. Defaults to
+            DEFAULT_RECONCILE_BATCH_SIZE.
+
+    Returns:
+        list: One dictionary per drifted value with the keys 'table', 'id', 'user_id', 'column',
+            'stored' and 'actual'.
+    """
+    drift = []
+    for name in RECONCILED_TABLES:
+        drift.extend(_reconcile_table(name, repair, full, batch_size))
+    return drift
@@ -214,16 +214,19 @@ document.addEventListener('DOMContentLoaded', function() {
                 data.individual_incomes.forEach((transaction) => {
                     // Format the date as 'yyyy-mm-dd'
                     const formattedDate = new Date(transaction.date).toISOString().split('T')[0];
+                    // Monthly totals of archived transactions have no id, and archived transactions can't be edited
+                    const reference = transaction.id == null ? 'Archived' : `CF${transaction.id.toString().padStart(3, '0')}INC`;
+                    const actions = transaction.archived ? '' : `
+                            <i class="fas fa-edit edit-transaction" data-transaction-id="${transaction.id}" data-description="${transaction.description}" data-amount="${transaction.amount}" data-date="${formattedDate}"></i>
+                            <i class="fas fa-trash-alt delete-transaction" data-transaction-id="${transaction.id}"></i>`;
                     const row = document.createElement('tr');
                     row.innerHTML = `
-                        <td>CF${transaction.id.toString().padStart(3, '0')}INC</td>
+                        <td>${reference}</td>
                         <td>${transaction.name}</td>
                         <td>${transaction.description}</td>
                         <td>${formattedDate}</td>
                         <td class="income_amount_cell">${transaction.amount}</td>
-                        <td class="actions">
-                            <i class="fas fa-edit edit-transaction" data-transaction-id="${transaction.id}" data-description="${transaction.description}" data-amount="${transaction.amount}" data-date="${formattedDate}"></i>
-                            <i class="fas fa-trash-alt delete-transaction" data-transaction-id="${transaction.id}"></i> 
+                        <td class="actions">${actions}
                         </td>
                     `;
                     tableBody.appendChild(row);
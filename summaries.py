@@ -0,0 +1,121 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import Date, Integer, and_, func, literal, select, union_all
+from models import db, DailyRollup
+from ledger import INCOME, EXPENSE
+
+PERIOD_UNITS = ('week', 'month', 'quarter')
+
+# The most periods one summary covers
+MAX_PERIODS = 120
+
+def last_periods(unit, count, today=None):
+    """
+    Return the last `count` calendar weeks, months or quarters, the current one included.
+
+    Weeks start on Monday.
+
+    Args:
+        unit (str): 'week', 'month' or 'quarter'.
+        count (int): The number of periods.
+        today (date, optional): The day the current period contains. Defaults to today.
+
+    Returns:
+        list: (label, start_date, end_date) tuples, oldest first.
+    """
+    if unit not in PERIOD_UNITS:
+        raise ValueError("Unknown period unit '{}'".format(unit))
+    if not 1 <= count <= MAX_PERIODS:
+        raise ValueError('The number of periods must be between 1 and {}'.format(MAX_PERIODS))
+
+    today = today or date.today()
+    periods = []
+
+    if unit == 'week':
+        start_of_week = today - timedelta(days=today.weekday())
+        for offset in range(count - 1, -1, -1):
+            start_date = start_of_week - timedelta(weeks=offset)
+            periods.append((start_date.isoformat(), start_date, start_date + timedelta(days=6)))
+        return periods
+
+    months = 3 if unit == 'quarter' else 1
+    first_month = today.year * 12 + (today.month - 1) // months * months
+    for offset in range(count - 1, -1, -1):
+        index = first_month - offset * months
+        year, month = divmod(index, 12)
+        start_date = date(year, month + 1, 1)
+        end_date = _last_day(index + months - 1)
+        if unit == 'quarter':
+            label = '{}-Q{}'.format(year, month // 3 + 1)
+        else:
+            label = '{}-{:02d}'.format(year, month + 1)
+        periods.append((label, start_date, end_date))
+
+    return periods
+
+def _last_day(month_index):
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+def period_summaries(user_id, periods):
+    """
+    Calculate income, expense, savings and savings percent for several periods in one grouped query.
+
+    The periods are joined to the rollups as a derived table of literal rows, so a day is counted
+    in every period that contains it and periods may overlap.
+
+    Args:
+        user_id (int): The user's ID.
+        periods (list): (label, start_date, end_date) tuples, dates inclusive.
+
+    Returns:
+        list: One dictionary per period, in the order given, with the keys 'label', 'start_date',
+            'end_date', 'income', 'expense', 'savings' and 'savings_percent'.
+
+    Raises:
+        ValueError: If there are more than MAX_PERIODS periods.
+    """
+    if not periods:
+        return []
+    if len(periods) > MAX_PERIODS:
+        raise ValueError('The number of periods must be at most {}'.format(MAX_PERIODS))
+
+    period_table = union_all(*[
+        select(
+            literal(index, Integer).label('period'),
+            literal(start_date, Date).label('start_date'),
+            literal(end_date, Date).label('end_date')
+        )
+        for index, (_, start_date, end_date) in enumerate(periods)
+    ]).subquery('periods')
+
+    rows = db.session.query(
+        period_table.c.period,
+        DailyRollup.kind,
+        func.sum(DailyRollup.amount)
+    ).select_from(period_table).join(DailyRollup, and_(
+        DailyRollup.user_id == user_id,
+        DailyRollup.day >= period_table.c.start_date,
+        DailyRollup.day <= period_table.c.end_date
+    )).group_by(period_table.c.period, DailyRollup.kind).all()
+
+    totals = [{INCOME: Decimal('0.00'), EXPENSE: Decimal('0.00')} for _ in periods]
+    for index, kind, amount in rows:
+        totals[index][kind] += amount
+
+    summaries = []
+    for (label, start_date, end_date), period_totals in zip(periods, totals):
+        income, expense = period_totals[INCOME], period_totals[EXPENSE]
+        savings = income - expense
+        summaries.append({
+            'label': label,
+            'start_date': start_date,
+            'end_date': end_date,
+            'income': income,
+            'expense': expense,
+            'savings': savings,
+            'savings_percent': round((savings / income) * 100, 2) if income != 0 else 0
+        })
+
+    return summaries
@@ -0,0 +1,116 @@
+# tests/test_analytics.py
+"""
+Unit tests for the vectorized analytics engine.
+
+This module contains unit tests that check the totals, category shares and weekly buckets
+computed from the ledger arrays match the per-row calculations to the cent.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestAnalytics: A class containing unit tests for the analytics engine.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date, timedelta
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, CashOut
+from ledger import EXPENSE
+from rollups import rollup_bucket_totals
+from analytics import dashboard_analytics, expense_shares, top_expense_chart, income_category_totals
+from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates, calculate_expense_percentage_of_income
+from transactions import calculate_income_totals
+
+class TestAnalytics(unittest.TestCase):
+    """
+    A class containing unit tests for the analytics engine.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_matches_per_row_calculations(self):
+        """
+        Test that the engine agrees with the existing calculations on the same data.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            incomes = [Income(user_id=user.id, name='Income {}'.format(i), income_type_id=income_type.id) for i in range(3)]
+            expenses = [Expense(user_id=user.id, name='Expense {}'.format(i)) for i in range(9)]
+            db.session.add_all(incomes + expenses)
+            db.session.commit()
+
+            today = date.today()
+            start_of_month = date(today.year, today.month, 1)
+
+            transactions = []
+            for i in range(60):
+                day = start_of_month + timedelta(days=i % (today.day))
+                transactions.append(CashIn(user_id=user.id, income_id=incomes[i % 3].id, amount=Decimal('1234.57') + i, date=day))
+                transactions.append(CashOut(user_id=user.id, expense_id=expenses[i % 9].id, amount=Decimal('10.01') * (i % 7 + 1), date=day))
+
+            # Outside the range
+            transactions.append(CashOut(user_id=user.id, expense_id=expenses[0].id, amount=99.99, date=start_of_month - timedelta(days=1)))
+            db.session.add_all(transactions)
+            db.session.commit()
+
+            weeks = [(start_of_month + timedelta(days=7 * week), start_of_month + timedelta(days=7 * week + 6)) for week in range(4)]
+            analytics = dashboard_analytics(user.id, start_of_month, today, weeks)
+
+            self.assertEqual(analytics['total_income'], calculate_total_income_between_dates(user.id)[0])
+            self.assertEqual(analytics['total_expense'], calculate_total_expenses_between_dates(user.id)[0])
+            self.assertEqual(analytics['balance'], analytics['total_income'] - analytics['total_expense'])
+            self.assertEqual(analytics['expense_buckets'], [Decimal(total) for total in rollup_bucket_totals(user.id, EXPENSE, weeks)])
+            self.assertEqual(income_category_totals(user.id, analytics['income_by_category']), calculate_income_totals(user.id))
+
+            expected = calculate_expense_percentage_of_income(user.id)
+            expected.sort(key=lambda x: x['percentage'], reverse=True)
+            shares = expense_shares(analytics['expense_by_category'], analytics['total_income'])
+            self.assertEqual(shares, expected)
+
+            labels, values = top_expense_chart(shares)
+            self.assertEqual(len(labels), 7)
+            self.assertEqual(labels[-1], 'Others')
+            self.assertEqual(values[-1], sum(share['percentage'] for share in expected[6:]))
+
+    def test_empty_ledger(self):
+        """
+        Test the engine on a user without transactions.
+        """
+        with app.app_context():
+            today = date.today()
+            analytics = dashboard_analytics(1, today, today, [(today, today)])
+
+            self.assertEqual(analytics['total_income'], Decimal('0.00'))
+            self.assertEqual(analytics['expense_by_category'], {})
+            self.assertEqual(analytics['expense_buckets'], [Decimal('0.00')])
+            self.assertEqual(top_expense_chart(expense_shares({}, analytics['total_income'])), (['Others'], [0]))
+
+if __name__ == '__main__':
+    unittest.main()
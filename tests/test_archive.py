@@ -0,0 +1,147 @@
+# tests/test_archive.py
+"""
+Unit tests for hot/cold archival of old transactions.
+
+This module contains unit tests that check old transactions are moved into the archive tables and
+their monthly totals, that range calculations, searches and rebuilds still include them, and that
+recent transactions stay in the hot tables.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestArchive: A class containing unit tests for the archiver.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, ArchivedCashIn, ArchivedCashOut, ArchiveMonthlyTotal
+from ledger import INCOME
+from archive import archive_cutoff, archive_transactions
+from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates, calculate_balance_as_of
+from rollups import rebuild_rollups, rollup_total
+from balance_index import rebuild_balance_index
+from totals import lifetime_totals, reconcile_user_totals
+from analytics import load_ledger_frame
+
+class TestArchive(unittest.TestCase):
+    """
+    A class containing unit tests for the archiver.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_archive_transactions(self):
+        """
+        Test archiving old transactions without changing any total, listing or rebuild.
+        """
+        cutoff = archive_cutoff(2)
+        # Two whole archived months, the month after them stays hot
+        first_month = cutoff - relativedelta(months=2)
+        second_month = cutoff - relativedelta(months=1)
+
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([salary, rent])
+            db.session.commit()
+            user_id = user.id
+
+            db.session.add_all([
+                CashIn(user_id=user_id, income_id=salary.id, amount=1000, date=first_month),
+                CashIn(user_id=user_id, income_id=salary.id, amount=200, date=first_month + timedelta(days=20)),
+                CashIn(user_id=user_id, income_id=salary.id, amount=1000, date=second_month + timedelta(days=9)),
+                CashIn(user_id=user_id, income_id=salary.id, amount=1000, date=cutoff),
+                CashOut(user_id=user_id, expense_id=rent.id, amount=500, date=first_month + timedelta(days=4)),
+                CashOut(user_id=user_id, expense_id=rent.id, amount=500, date=cutoff + timedelta(days=4)),
+            ])
+            db.session.commit()
+
+            # A range with a partial month at each end
+            start_date, end_date = first_month + timedelta(days=10), cutoff + timedelta(days=10)
+            income_before, _ = calculate_total_income_between_dates(user_id, start_date, end_date)
+            whole_range = (first_month, cutoff + timedelta(days=10))
+            expenses_before, _ = calculate_total_expenses_between_dates(user_id, *whole_range)
+            balance_before = calculate_balance_as_of(user_id, end_date)
+            frame_cents = load_ledger_frame(user_id, *whole_range)['cents'].sum()
+            self.assertEqual(income_before, Decimal('2200.00'))
+
+            report = archive_transactions(horizon_months=2, batch_size=2)
+            self.assertEqual((report['cutoff'], report['income'], report['expense']), (cutoff, 3, 1))
+            self.assertEqual(CashIn.query.filter_by(user_id=user_id).count(), 1)
+            self.assertEqual(CashOut.query.filter_by(user_id=user_id).count(), 1)
+            self.assertEqual(ArchivedCashIn.query.count(), 3)
+            self.assertEqual(ArchivedCashOut.query.count(), 1)
+            monthly = ArchiveMonthlyTotal.query.filter_by(kind=INCOME, month=first_month).one()
+            self.assertEqual((monthly.amount, monthly.count), (Decimal('1200.00'), 2))
+
+            # Nothing is left to archive
+            report = archive_transactions(horizon_months=2)
+            self.assertEqual((report['income'], report['expense']), (0, 0))
+
+            # The cached result was dropped; the partial first month comes from the archived rows
+            total_income, incomes = calculate_total_income_between_dates(user_id, start_date, end_date)
+            self.assertEqual(total_income, income_before)
+            self.assertEqual([(row['amount'], row['id'] is None) for row in incomes if row.get('archived')], [
+                (Decimal('200.00'), False), (Decimal('1000.00'), True)
+            ])
+            summary = [row for row in incomes if row['id'] is None][0]
+            self.assertEqual((summary['name'], summary['count'], summary['date']), ('Salary', 1, second_month))
+
+            total_income, incomes = calculate_total_income_between_dates(user_id, start_date, end_date, detail=True)
+            self.assertEqual(total_income, income_before)
+            self.assertTrue(all(row['id'] is not None for row in incomes))
+            self.assertEqual(len(incomes), 3)
+
+            total_expenses, expenses = calculate_total_expenses_between_dates(user_id, *whole_range)
+            self.assertEqual(total_expenses, expenses_before)
+            self.assertEqual(expenses[-1]['description'], '1 archived transactions')
+            self.assertEqual(load_ledger_frame(user_id, *whole_range)['cents'].sum(), frame_cents)
+
+            # Lifetime totals and rebuilds still count the archived transactions
+            self.assertEqual(lifetime_totals(user_id), (Decimal('3200.00'), Decimal('1000.00')))
+            self.assertEqual(reconcile_user_totals(), [])
+            rebuild_rollups()
+            rebuild_balance_index()
+            self.assertEqual(rollup_total(user_id, INCOME, first_month, end_date), Decimal('3200.00'))
+            self.assertEqual(calculate_balance_as_of.uncached(user_id, end_date), balance_before)
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        url = '/search_income_transactions?from={}&to={}'.format(start_date, end_date)
+        self.assertEqual(len(self.app.get(url).json['individual_incomes']), 3)
+        response = self.app.get(url + '&detail=1').json
+        self.assertEqual(response['total_income'], '2200.00')
+        self.assertEqual(len(response['individual_incomes']), 3)
+
+if __name__ == '__main__':
+    unittest.main()
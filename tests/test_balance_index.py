@@ -0,0 +1,112 @@
+# tests/test_balance_index.py
+"""
+Unit tests for the running balance index.
+
+This module contains unit tests that check the BalanceIndex rows are kept in step with
+CashIn/CashOut inserts, edits and deletes, and that range totals and balances read from them.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestBalanceIndex: A class containing unit tests for the balance index.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date, timedelta
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, CashOut, BalanceIndex
+from balance_index import rebuild_balance_index, index_range_totals
+from calculations import calculate_balance_as_of, calculate_savings_between_dates
+
+class TestBalanceIndex(unittest.TestCase):
+    """
+    A class containing unit tests for the balance index.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def index_rows(self):
+        return [
+            (row.user_id, row.day, row.cumulative_income, row.cumulative_expense, row.balance)
+            for row in BalanceIndex.query.order_by(BalanceIndex.user_id, BalanceIndex.day).all()
+        ]
+
+    def test_index_follows_writes(self):
+        """
+        Test that inserts, back-dated inserts, edits and deletes keep the running totals right.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, rent])
+            db.session.commit()
+
+            today = date.today()
+            day1, day2, day3 = today - timedelta(days=10), today - timedelta(days=5), today
+
+            db.session.add_all([
+                CashIn(user_id=user.id, income_id=income.id, amount=1000.00, date=day1),
+                CashOut(user_id=user.id, expense_id=rent.id, amount=300.00, date=day3),
+            ])
+            db.session.commit()
+
+            # A back-dated insert between two indexed days shifts every later day
+            cash_out = CashOut(user_id=user.id, expense_id=rent.id, amount=50.00, date=day2)
+            db.session.add(cash_out)
+            db.session.commit()
+
+            self.assertEqual(calculate_balance_as_of(user.id, day1 - timedelta(days=1)), Decimal('0.00'))
+            self.assertEqual(calculate_balance_as_of(user.id, day1), Decimal('1000.00'))
+            self.assertEqual(calculate_balance_as_of(user.id, day2 + timedelta(days=1)), Decimal('950.00'))
+            self.assertEqual(calculate_balance_as_of(user.id), Decimal('650.00'))
+
+            self.assertEqual(index_range_totals(user.id, day2, day3), (Decimal('0.00'), Decimal('350.00')))
+            self.assertEqual(index_range_totals(user.id, day3, day1), (Decimal('0.00'), Decimal('0.00')))
+            self.assertEqual(calculate_savings_between_dates(user.id, day1, day3)[0], Decimal('650.00'))
+
+            # Edit the amount and move the transaction to another day
+            cash_out = db.session.get(CashOut, cash_out.id)
+            cash_out.update_transaction('moved', 80.00, day1, rent.id)
+            self.assertEqual(index_range_totals(user.id, day1, day1), (Decimal('1000.00'), Decimal('80.00')))
+            self.assertEqual(calculate_balance_as_of(user.id), Decimal('620.00'))
+
+            # Delete
+            cash_out.delete_transaction()
+            self.assertEqual(calculate_balance_as_of(user.id), Decimal('700.00'))
+
+            # Rebuilding from the ledger gives the same balances
+            balances = [(row[1], row[4]) for row in self.index_rows()]
+            rebuild_balance_index()
+            for day, balance in balances:
+                self.assertEqual(calculate_balance_as_of(user.id, day), balance)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# tests/test_breakdown.py
+"""
+Unit tests for the category breakdown engine.
+
+This module contains unit tests that check every category, zero-activity and system ones included,
+is returned from a single query and formatted once.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestBreakdown: A class containing unit tests for the category breakdown.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut
+from ledger import INCOME, EXPENSE
+from breakdown import category_breakdown, format_breakdown
+from transactions import calculate_expense_totals_formatted_credit, calculate_income_totals_formatted_debt
+
+class TestBreakdown(unittest.TestCase):
+    """
+    A class containing unit tests for the category breakdown.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_breakdown_in_one_query(self):
+        """
+        Test the breakdown of user and system categories and its formatting.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+
+            income_type = IncomeType.query.first()
+            salary = Income(user_id=user.id, name='Salary', income_type_id=income_type.id)
+            rent = Expense(user_id=user.id, name='Rent')
+            food = Expense(user_id=user.id, name='Food')
+            db.session.add_all([salary, rent, food])
+            db.session.commit()
+
+            today = date.today()
+            db.session.add_all([
+                CashIn(user_id=user.id, income_id=salary.id, amount=900.00, date=today),
+                CashIn(user_id=user.id, income_id=1, amount=100.00, date=today),
+                CashOut(user_id=user.id, expense_id=rent.id, amount=300.00, date=today),
+                CashOut(user_id=user.id, expense_id=1, amount=100.00, date=today),
+            ])
+            db.session.commit()
+            user_id, rent_id, food_id = user.id, rent.id, food.id
+
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                breakdown = category_breakdown(user_id, EXPENSE, today, today)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(breakdown, [
+                (rent_id, 'Rent', Decimal('300.00')),
+                (food_id, 'Food', Decimal('0.00')),
+                (2, 'Settled Debt', Decimal('0.00')),
+                (1, 'Credit', Decimal('100.00')),
+            ])
+            self.assertEqual(format_breakdown(breakdown)['Rent'], ('300.00/=', '75.00'))
+            self.assertEqual(calculate_expense_totals_formatted_credit(user_id)['Food'], ('0.00/=', '0.00'))
+
+            self.assertEqual(calculate_income_totals_formatted_debt(user_id), {
+                'Salary': ('900.00/=', '90.00'),
+                'Settled Credit': ('0.00/=', '0.00'),
+                'Debt': ('100.00/=', '10.00'),
+            })
+
+            # Another user's categories are not included
+            self.assertEqual([row[1] for row in category_breakdown(user_id, INCOME, today, today, include_system=False)], ['Salary'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# tests/test_budgets.py
+"""
+Unit tests for ledger-driven budget spending.
+
+This module contains unit tests that check expense transactions update the spent amount of their
+month's budget expense in the same commit, with one UPDATE per budget expense, and that the spent
+amounts can be rebuilt from the ledger.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestBudgets: A class containing unit tests for budget spending.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import event
+from app import app, db
+from models import User, Expense, CashOut, Budget, BudgetExpense
+from budgets import rebuild_budget_spend
+
+class TestBudgets(unittest.TestCase):
+    """
+    A class containing unit tests for budget spending.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def spent(self, budget_expense_id):
+        with app.app_context():
+            return db.session.get(BudgetExpense, budget_expense_id).spent_amount
+
+    def test_spending_follows_transactions(self):
+        """
+        Test create, edit and delete of expense transactions through the routes.
+        """
+        today = date.today()
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+
+            rent = Expense(user_id=user.id, name='Rent')
+            food = Expense(user_id=user.id, name='Food')
+            budget = Budget(user_id=user.id, year=today.year, month=today.month)
+            db.session.add_all([rent, food, budget])
+            db.session.commit()
+            user_id, rent_id, food_id, budget_id = user.id, rent.id, food.id, budget.id
+
+            # Spending recorded before the budget expense existed is picked up when it is created
+            db.session.add(CashOut(user_id=user_id, expense_id=rent_id, amount=100, date=today))
+            db.session.commit()
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        response = self.app.post('/create_budget_expense', json={'expense_id': rent_id, 'expected_amount': 1000, 'budgetId': budget_id})
+        self.assertEqual(response.json['actual_amount'], '100.00/=')
+        rent_budget_id = response.json['budget_expense_id']
+        food_budget_id = self.app.post('/create_budget_expense', json={'expense_id': food_id, 'expected_amount': 500, 'budgetId': budget_id}).json['budget_expense_id']
+
+        response = self.app.post('/create_expense_transaction', data={
+            'expenseCategory': rent_id, 'amount': '250.50', 'date': today.strftime('%Y-%m-%d')
+        })
+        self.assertEqual(response.status_code, 201)
+        transaction_id = response.json['transaction_id']
+        self.assertEqual(self.spent(rent_budget_id), Decimal('350.50'))
+
+        # Moving the transaction to another category moves its spending
+        response = self.app.post('/edit_expense_transaction', json={
+            'transaction_id': transaction_id, 'new_date': today.strftime('%Y-%m-%d'), 'new_amount': 200,
+            'new_description': 'Groceries', 'expense_id': food_id
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.spent(rent_budget_id), Decimal('100.00'))
+        self.assertEqual(self.spent(food_budget_id), Decimal('200.00'))
+
+        self.assertEqual(self.app.post('/delete_expense_transaction', json={'transaction_id': transaction_id}).status_code, 200)
+        self.assertEqual(self.spent(food_budget_id), Decimal('0.00'))
+
+        # Several transactions in one unit of work update each budget expense once
+        with app.app_context():
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                db.session.add_all([CashOut(user_id=user_id, expense_id=food_id, amount=10, date=today) for _ in range(5)])
+                db.session.commit()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            self.assertEqual(len([statement for statement in statements if statement.startswith('UPDATE budget_expense')]), 1)
+            self.assertEqual(db.session.get(BudgetExpense, food_budget_id).spent_amount, Decimal('50.00'))
+
+            # Drift is repaired from the ledger
+            db.session.get(BudgetExpense, rent_budget_id).spent_amount = 0
+            db.session.commit()
+            self.assertEqual(rebuild_budget_spend(), 1)
+            self.assertEqual(db.session.get(BudgetExpense, rent_budget_id).spent_amount, Decimal('100.00'))
+            self.assertEqual(rebuild_budget_spend(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+# tests/test_bulk.py
+"""
+Unit tests for bulk transaction ingestion.
+
+This module contains unit tests that check rows are validated in memory, written in chunked
+transactions with their budget and settlement side effects, and that invalid rows are reported
+without aborting the batch.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestBulk: A class containing unit tests for bulk ingestion.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, Budget, BudgetExpense, Debt, Credit, CreditorPayment, DebtorPayment
+from ledger import INCOME, EXPENSE
+from bulk import bulk_add_transactions
+from calculations import calculate_total_income, calculate_total_expenses
+from totals import lifetime_totals
+
+class TestBulk(unittest.TestCase):
+    """
+    A class containing unit tests for bulk ingestion.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user(self):
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def test_bulk_expenses(self):
+        """
+        Test chunked expense ingestion with per-row errors, budget spending and debt settlement.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = self.create_user()
+
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add(rent)
+            db.session.commit()
+
+            budget = Budget(user_id=user.id, year=2024, month=3)
+            db.session.add(budget)
+            db.session.commit()
+            budget_expense = BudgetExpense(budget_id=budget.id, expense_id=rent.id, expected_amount=1000, spent_amount=0)
+            debt = Debt(user_id=user.id, creditor='Bank', amount=500, date_taken=date(2024, 1, 1))
+            db.session.add_all([budget_expense, debt])
+            db.session.commit()
+            user_id, rent_id, budget_expense_id, debt_id = user.id, rent.id, budget_expense.id, debt.id
+
+            rows = [{'amount': '10.10', 'date': '2024-03-{:02d}'.format(day % 28 + 1), 'category_id': rent_id} for day in range(50)]
+            rows += [
+                {'amount': -1, 'date': '2024-03-01', 'category_id': rent_id},
+                {'amount': 5, 'date': '03/01/2024', 'category_id': rent_id},
+                {'amount': 5, 'date': '2024-03-01', 'category_id': 999},
+                {'amount': 300, 'date': '2024-03-05', 'category_id': 2, 'settled_id': debt_id},
+                {'amount': 200, 'date': '2024-03-06', 'category_id': 2, 'settled_id': debt_id},
+                {'amount': 1, 'date': '2024-03-07', 'category_id': 2, 'settled_id': debt_id},
+                {'amount': 5, 'date': (date.today() + timedelta(days=1)).isoformat(), 'category_id': rent_id},
+            ]
+
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                result = bulk_add_transactions(user_id, EXPENSE, rows, chunk_size=20)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            self.assertEqual(result['inserted'], 52)
+            self.assertEqual([error['index'] for error in result['errors']], [50, 51, 52, 55, 56])
+            self.assertEqual(result['errors'][3]['error'], 'Paid amount exceeds the debt amount.')
+            self.assertEqual(result['errors'][4]['error'], 'Please select a date that is not in the future.')
+
+            # One multi-row insert per chunk rather than one per row
+            self.assertEqual(len([statement for statement in statements if statement.startswith('INSERT INTO cash_out')]), 3)
+
+            self.assertEqual(CashOut.query.filter_by(user_id=user_id).count(), 52)
+            self.assertEqual(calculate_total_expenses(user_id), Decimal('1005.00'))
+            self.assertEqual(lifetime_totals(user_id)[1], Decimal('1005.00'))
+            self.assertEqual(db.session.get(BudgetExpense, budget_expense_id).spent_amount, Decimal('505.00'))
+
+            debt = db.session.get(Debt, debt_id)
+            self.assertEqual(debt.amount_payed, Decimal('500.00'))
+            self.assertTrue(debt.is_paid)
+            self.assertEqual(CreditorPayment.query.filter_by(debt_id=debt_id).count(), 2)
+
+    def test_bulk_rows_of_wrong_types(self):
+        """
+        Test that rows and fields of the wrong type are reported as row errors instead of failing the batch.
+        """
+        with app.app_context():
+            user = self.create_user()
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add(rent)
+            db.session.commit()
+            user_id, rent_id = user.id, rent.id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        row = {'amount': 5, 'date': '2024-03-01', 'category_id': rent_id}
+        response = self.app.post('/bulk_transactions', json={'kind': EXPENSE, 'transactions': [
+            'not a row',
+            [row],
+            dict(row, category_id=[rent_id]),
+            dict(row, category_id={'id': rent_id}),
+            dict(row, description=5),
+            dict(row, settled_id=[1]),
+            dict(row, settled_id={'id': 1}),
+            dict(row, category_id=str(rent_id)),
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['inserted'], 1)
+        self.assertEqual(response.json['errors'], [
+            {'index': 0, 'error': 'Each transaction must be an object.'},
+            {'index': 1, 'error': 'Each transaction must be an object.'},
+            {'index': 2, 'error': 'Category not found.'},
+            {'index': 3, 'error': 'Category not found.'},
+            {'index': 4, 'error': 'Description must be text.'},
+            {'index': 5, 'error': 'Invalid debt ID.'},
+            {'index': 6, 'error': 'Invalid debt ID.'},
+        ])
+
+    def test_bulk_income_endpoint(self):
+        """
+        Test the bulk endpoint with income rows settling a credit.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = self.create_user()
+
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            credit = Credit(user_id=user.id, debtor='Friend', amount=100, date_taken=date(2024, 1, 1))
+            db.session.add_all([salary, credit])
+            db.session.commit()
+            user_id, salary_id, credit_id = user.id, salary.id, credit.id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        response = self.app.post('/bulk_transactions', json={'kind': INCOME, 'transactions': [
+            {'amount': 1500, 'date': '2024-03-01', 'category_id': salary_id, 'description': 'March'},
+            {'amount': 40, 'date': '2024-03-02', 'category_id': 2, 'settled_id': credit_id},
+            {'amount': 10, 'date': '2024-03-02', 'category_id': salary_id, 'description': 'x' * 101},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['inserted'], 2)
+        self.assertEqual(response.json['errors'], [{'index': 2, 'error': 'Description should not exceed 100 characters.'}])
+
+        self.assertEqual(self.app.post('/bulk_transactions', json={'kind': 'transfer', 'transactions': []}).status_code, 400)
+
+        with app.app_context():
+            self.assertEqual(calculate_total_income(user_id), Decimal('1540.00'))
+            credit = db.session.get(Credit, credit_id)
+            self.assertEqual(credit.amount_paid, Decimal('40.00'))
+            self.assertFalse(credit.is_paid)
+            self.assertEqual(DebtorPayment.query.filter_by(credit_id=credit_id).count(), 1)
+            self.assertEqual(CashIn.query.filter_by(settled_credit_id=credit_id).count(), 1)
+
+    def test_bulk_edit_and_delete(self):
+        """
+        Test the bulk edit and delete endpoints, with one statement each and one budget update per budget expense.
+        """
+        today = date.today()
+        with app.app_context():
+            user = self.create_user()
+            other = User(first_name='other', last_name='other', password='test_password', email='other@example.com')
+            rent = Expense(user_id=user.id, name='Rent')
+            food = Expense(user_id=user.id, name='Food')
+            budget = Budget(user_id=user.id, year=today.year, month=today.month)
+            db.session.add_all([other, rent, food, budget])
+            db.session.commit()
+
+            rent_budget = BudgetExpense(budget_id=budget.id, expense_id=rent.id, expected_amount=1000, spent_amount=0)
+            food_budget = BudgetExpense(budget_id=budget.id, expense_id=food.id, expected_amount=1000, spent_amount=0)
+            db.session.add_all([rent_budget, food_budget])
+            db.session.commit()
+
+            transactions = [CashOut(user_id=user.id, expense_id=rent.id, amount=100, date=today) for _ in range(5)]
+            others = CashOut(user_id=other.id, expense_id=rent.id, amount=100, date=today)
+            db.session.add_all(transactions + [others])
+            db.session.commit()
+            user_id, food_id = user.id, food.id
+            rent_budget_id, food_budget_id = rent_budget.id, food_budget.id
+            ids, other_id = [transaction.id for transaction in transactions], others.id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.app.post('/bulk_edit_transactions', json={
+                'kind': EXPENSE, 'ids': ids[:3] + [other_id], 'patch': {'category_id': food_id, 'amount': '20.00'}
+            })
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+        self.assertEqual(response.json, {'updated': 3, 'missing': [other_id]})
+        self.assertEqual(len([statement for statement in statements if statement.startswith('UPDATE cash_out')]), 1)
+        self.assertEqual(len([statement for statement in statements if statement.startswith('UPDATE budget_expense')]), 2)
+
+        self.assertEqual(self.app.post('/bulk_edit_transactions', json={'kind': EXPENSE, 'ids': ids, 'patch': {'user_id': 2}}).status_code, 400)
+        for patch, error in (
+            ({'category_id': [food_id]}, 'Category not found.'),
+            ({'category_id': {'id': food_id}}, 'Category not found.'),
+            ({'description': ['x']}, 'Description must be text.'),
+        ):
+            response = self.app.post('/bulk_edit_transactions', json={'kind': EXPENSE, 'ids': ids, 'patch': patch})
+            self.assertEqual((response.status_code, response.json['error']), (400, error))
+        # Non-integral IDs are rejected rather than truncated to another transaction's ID
+        response = self.app.post('/bulk_delete_transactions', json={'kind': EXPENSE, 'ids': [ids[0] + 0.9]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Transaction IDs must be integers.')
+
+        with app.app_context():
+            self.assertEqual(db.session.get(BudgetExpense, rent_budget_id).spent_amount, Decimal('200.00'))
+            self.assertEqual(db.session.get(BudgetExpense, food_budget_id).spent_amount, Decimal('60.00'))
+
+        response = self.app.post('/bulk_delete_transactions', json={'kind': EXPENSE, 'ids': ids[2:]})
+        self.assertEqual(response.json, {'deleted': 3, 'missing': []})
+
+        with app.app_context():
+            self.assertEqual(db.session.get(BudgetExpense, rent_budget_id).spent_amount, Decimal('0.00'))
+            self.assertEqual(db.session.get(BudgetExpense, food_budget_id).spent_amount, Decimal('40.00'))
+            self.assertEqual(lifetime_totals(user_id)[1], Decimal('40.00'))
+            self.assertEqual(CashOut.query.filter_by(user_id=user_id).count(), 2)
+            self.assertIsNotNone(db.session.get(CashOut, other_id))
+
+if __name__ == '__main__':
+    unittest.main()
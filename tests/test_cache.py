@@ -0,0 +1,165 @@
+# tests/test_cache.py
+"""
+Unit tests for the calculation result cache.
+
+This module contains unit tests for the LRU bound, the hit/miss/eviction counters and the
+per-user invalidation on writes, in this process and in others.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestCache: A class containing unit tests for the result cache.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, Budget, BudgetExpense
+from cache import ResultCache, result_cache
+from calculations import calculate_total_income_between_dates, calculate_total_expenses
+from categories import find_category
+from ledger import EXPENSE
+from versions import bump_versions
+
+class TestCache(unittest.TestCase):
+    """
+    A class containing unit tests for the result cache.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used result is evicted and counted.
+        """
+        cache = ResultCache(maxsize=2)
+        cache.put((1, 'f', None, None), 'a')
+        cache.put((1, 'g', None, None), 'b')
+        cache.get((1, 'f', None, None))
+        cache.put((2, 'f', None, None), 'c')
+
+        self.assertEqual(cache.get((1, 'g', None, None)), (False, None))
+        self.assertEqual(cache.get((1, 'f', None, None)), (True, 'a'))
+        self.assertEqual(cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1, 'evictions': 1, 'invalidations': 0})
+
+    def test_writes_invalidate_their_user_only(self):
+        """
+        Test that a write drops the cached results of its user and keeps the other users' results.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            other = User(first_name='other_user', last_name='other_user', password='test_password', email='other@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, other, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, rent])
+            db.session.commit()
+
+            today = date.today()
+            db.session.add(CashIn(user_id=user.id, income_id=income.id, amount=100.00, date=today))
+            db.session.commit()
+
+            total, rows = calculate_total_income_between_dates(user.id)
+            self.assertEqual(total, Decimal('100.00'))
+            calculate_total_expenses(other.id)
+
+            # Cached results are copies
+            rows.clear()
+            hits = result_cache.stats()['hits']
+            self.assertEqual(len(calculate_total_income_between_dates(user.id, date(today.year, today.month, 1), today)[1]), 1)
+            self.assertEqual(result_cache.stats()['hits'], hits + 1)
+
+            db.session.add(CashIn(user_id=user.id, income_id=income.id, amount=50.00, date=today))
+            db.session.commit()
+            self.assertEqual(calculate_total_income_between_dates(user.id)[0], Decimal('150.00'))
+
+            # The other user's result survived
+            hits = result_cache.stats()['hits']
+            calculate_total_expenses(other.id)
+            self.assertEqual(result_cache.stats()['hits'], hits + 1)
+
+            # A budget expense invalidates the user owning its budget
+            calculate_total_expenses(user.id)
+            budget = Budget(user_id=user.id, year=today.year, month=today.month)
+            db.session.add(budget)
+            db.session.commit()
+            calculate_total_expenses(user.id)
+            db.session.add(BudgetExpense(budget_id=budget.id, expense_id=rent.id, expected_amount=10.00))
+            db.session.commit()
+
+            misses = result_cache.stats()['misses']
+            calculate_total_expenses(user.id)
+            self.assertEqual(result_cache.stats()['misses'], misses + 1)
+
+    def test_stats_require_login(self):
+        """
+        Test that the cache counters are only reported to a logged-in user.
+        """
+        self.assertEqual(self.app.get('/cache_stats').status_code, 401)
+
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        self.assertEqual(self.app.get('/cache_stats').json['maxsize'], result_cache.maxsize)
+
+    def test_writes_of_other_processes(self):
+        """
+        Test that rows committed with a version bump but without touching this process's caches are seen.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            db.session.add(income)
+            db.session.commit()
+            user_id, income_id = user.id, income.id
+
+            self.assertEqual(calculate_total_income_between_dates(user_id)[0], Decimal('0.00'))
+            self.assertIsNone(find_category(user_id, EXPENSE, 'Imported'))
+            db.session.commit()
+
+            # What a worker process commits: the rows and the version bump, nothing in this process
+            with db.engine.begin() as connection:
+                connection.execute(CashIn.__table__.insert().values(user_id=user_id, income_id=income_id, amount=75, date=date.today()))
+                connection.execute(Expense.__table__.insert().values(user_id=user_id, name='Imported'))
+                bump_versions(connection, {user_id})
+
+            self.assertEqual(calculate_total_income_between_dates(user_id)[0], Decimal('75.00'))
+            self.assertIsNotNone(find_category(user_id, EXPENSE, 'Imported'))
+
+if __name__ == '__main__':
+    unittest.main()
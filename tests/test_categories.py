@@ -0,0 +1,119 @@
+# tests/test_categories.py
+"""
+Unit tests for the per-user category directory.
+
+This module contains unit tests that check categories are resolved from memory once loaded and
+that the directory follows category creation, renaming and deletion.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestCategories: A class containing unit tests for the category directory.
+"""
+
+import unittest
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense
+from ledger import INCOME, EXPENSE
+from categories import category_directory, find_category, get_category, get_category_name, user_categories
+from transactions import add_expense
+
+class TestCategories(unittest.TestCase):
+    """
+    A class containing unit tests for the category directory.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def count_queries(self, function):
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            result = function()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        return result, len(statements)
+
+    def test_directory(self):
+        """
+        Test resolving categories without queries and keeping the directory coherent with writes.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([salary, rent])
+            db.session.commit()
+            user_id, salary_id, rent_id = user.id, salary.id, rent.id
+
+            self.assertEqual(find_category(user_id, EXPENSE, 'Rent').id, rent_id)
+
+            def lookups():
+                return (
+                    find_category(user_id, EXPENSE, 'Rent').id,
+                    find_category(user_id, INCOME, 'Debt', include_system=True).id,
+                    find_category(user_id, EXPENSE, 'Credit'),
+                    get_category_name(user_id, INCOME, salary_id),
+                    get_category_name(user_id, EXPENSE, 2),
+                    get_category(user_id, INCOME, salary_id).income_type_id is not None,
+                    [category.name for category in user_categories(user_id, EXPENSE)],
+                )
+
+            result, queries = self.count_queries(lookups)
+            self.assertEqual(queries, 0)
+            self.assertEqual(result, (rent_id, 1, None, 'Salary', 'Settled Debt', True, ['Rent']))
+
+            # Creating a category through add_expense is seen by the next lookup, duplicates are refused
+            food = add_expense(user_id, 'food')
+            self.assertEqual(find_category(user_id, EXPENSE, 'Food').id, food.id)
+            self.assertEqual(add_expense(user_id, 'Food'), 'Expense transaction already exists.')
+
+            # Renames and deletes too
+            rent = db.session.get(Expense, rent_id)
+            rent.name = 'Housing'
+            db.session.commit()
+            self.assertIsNone(find_category(user_id, EXPENSE, 'Rent'))
+            self.assertEqual(get_category_name(user_id, EXPENSE, rent_id), 'Housing')
+
+            db.session.delete(db.session.get(Expense, food.id))
+            db.session.commit()
+
+            # The directory is loaded again once, with one query per kind after the cache versions
+            loads = category_directory.loads
+            result, queries = self.count_queries(lambda: find_category(user_id, EXPENSE, 'Food'))
+            self.assertIsNone(result)
+            self.assertEqual((queries, category_directory.loads), (3, loads + 1))
+            _, queries = self.count_queries(lambda: get_category_name(user_id, EXPENSE, rent_id))
+            self.assertEqual(queries, 0)
+
+if __name__ == '__main__':
+    unittest.main()
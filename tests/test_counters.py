@@ -0,0 +1,160 @@
+# tests/test_counters.py
+"""
+Unit tests for SQL-side counter increments.
+
+This module contains unit tests that check counters are incremented in the database without losing
+updates under concurrent writers, that guards cap them, and that settlements update a paid amount
+with a single statement.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestCounters: A class containing unit tests for counter increments.
+"""
+
+import re
+import threading
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, Expense, Budget, BudgetExpense, Credit
+from counters import increment_counters
+from settlements import settle_credit_payment
+
+class TestCounters(unittest.TestCase):
+    """
+    A class containing unit tests for counter increments.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user(self):
+        initialize_default_income_types()
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    def run_threads(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_no_lost_updates(self):
+        """
+        Test that concurrent increments of one counter all land and each sees its own running total.
+        """
+        with app.app_context():
+            user_id = self.create_user()
+            expense = Expense(user_id=user_id, name='Rent')
+            budget = Budget(user_id=user_id, year=2024, month=1)
+            db.session.add_all([expense, budget])
+            db.session.commit()
+            budget_expense = BudgetExpense(budget_id=budget.id, expense_id=expense.id, expected_amount=1000, spent_amount=None)
+            db.session.add(budget_expense)
+            db.session.commit()
+            budget_expense_id = budget_expense.id
+
+        table = BudgetExpense.__table__
+        totals = []
+        lock = threading.Lock()
+
+        def add_many():
+            with app.app_context():
+                for _ in range(50):
+                    rows = increment_counters(db.session.connection(), table, table.c.id == budget_expense_id, {'spent_amount': Decimal('1.25')}, returning=(table.c.spent_amount,))
+                    db.session.commit()
+                    with lock:
+                        totals.append(rows[0].spent_amount)
+                db.session.remove()
+
+        self.run_threads(add_many)
+
+        self.assertEqual(len(totals), 400)
+        self.assertEqual(len(set(totals)), 400)
+        self.assertEqual(max(totals), Decimal('500.00'))
+        with app.app_context():
+            self.assertEqual(db.session.get(BudgetExpense, budget_expense_id).spent_amount, Decimal('500.00'))
+
+            # Without RETURNING support the new values are read back in the same transaction
+            connection = db.session.connection()
+            update_returning = connection.dialect.update_returning
+            connection.dialect.update_returning = False
+            try:
+                rows = increment_counters(connection, table, table.c.id == budget_expense_id, {'spent_amount': -500}, returning=(table.c.spent_amount,))
+            finally:
+                connection.dialect.update_returning = update_returning
+            db.session.commit()
+            self.assertEqual(rows[0].spent_amount, Decimal('0.00'))
+
+    def test_guarded_settlements(self):
+        """
+        Test that guarded settlements never over-pay a credit and take a single statement each.
+        """
+        with app.app_context():
+            user_id = self.create_user()
+            credit = Credit(user_id=user_id, debtor='Friend', amount=100, date_taken=date(2024, 1, 1))
+            db.session.add(credit)
+            db.session.commit()
+            credit_id = credit.id
+
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                settlement = settle_credit_payment(user_id, credit_id, 10, date(2024, 2, 1))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            self.assertEqual(settlement.record.amount_paid, Decimal('10.00'))
+            # One UPDATE ... RETURNING and no SELECT of the credit
+            credit_statements = [statement.split()[0] for statement in statements if re.search(r'\b(FROM|UPDATE) credit\b', statement)]
+            self.assertEqual(credit_statements, ['UPDATE'])
+
+        outcomes = []
+
+        def settle_many():
+            with app.app_context():
+                for _ in range(5):
+                    try:
+                        settle_credit_payment(user_id, credit_id, 7, date(2024, 2, 1))
+                        outcomes.append(True)
+                    except ValueError:
+                        outcomes.append(False)
+                db.session.remove()
+
+        self.run_threads(settle_many)
+
+        # 90 left to pay: 12 payments of 7 fit, the other 28 are refused
+        self.assertEqual(outcomes.count(True), 12)
+        with app.app_context():
+            self.assertEqual(db.session.get(Credit, credit_id).amount_paid, Decimal('94.00'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+# tests/test_entries.py
+"""
+Unit tests for the unified, signed ledger.
+
+This module contains unit tests that check every write to the CashIn and CashOut tables, through
+the ORM or in bulk, is mirrored in LedgerEntry, that a rebuild gives the same entries, and that
+income and expense are listed together in date order with a single query.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestEntries: A class containing unit tests for the unified ledger.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import event, select
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, LedgerEntry
+from ledger import EXPENSE
+from bulk import bulk_add_transactions
+from entries import install_ledger_triggers, install_missing_ledger_triggers, rebuild_ledger_entries, query_ledger_entries
+
+class TestEntries(unittest.TestCase):
+    """
+    A class containing unit tests for the unified ledger.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def entries(self):
+        table = LedgerEntry.__table__
+        columns = [column for column in table.c if column.name != 'id']
+        return db.session.execute(select(*columns).order_by(table.c.kind, table.c.source_id)).all()
+
+    def test_entries_follow_writes(self):
+        """
+        Test that ORM and bulk writes are mirrored with signed amounts and listed in date order.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([salary, rent])
+            db.session.commit()
+            user_id, rent_id = user.id, rent.id
+
+            cash_in = CashIn(user_id=user_id, income_id=salary.id, amount=1000, date=date(2024, 1, 20))
+            cash_out = CashOut(user_id=user_id, expense_id=rent_id, amount=500, date=date(2024, 1, 5), description='January rent')
+            deleted = CashOut(user_id=user_id, expense_id=rent_id, amount=1, date=date(2024, 1, 6))
+            db.session.add_all([cash_in, cash_out, deleted])
+            db.session.commit()
+
+            cash_in.update_transaction('Salary', 1200, date(2024, 1, 10), salary.id)
+            deleted.delete_transaction()
+            bulk_add_transactions(user_id, EXPENSE, [{'amount': '20.50', 'date': '2024-01-15', 'category_id': rent_id}])
+
+            self.assertEqual(LedgerEntry.query.count(), 3)
+            entry = LedgerEntry.query.filter_by(kind='income', source_id=cash_in.id).one()
+            self.assertEqual((entry.amount, entry.date), (Decimal('1200.00'), date(2024, 1, 10)))
+            entry = LedgerEntry.query.filter_by(kind='expense', source_id=cash_out.id).one()
+            self.assertEqual((entry.amount, entry.description), (Decimal('-500.00'), 'January rent'))
+
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                transactions = query_ledger_entries(user_id, date(2024, 1, 1), date(2024, 1, 31))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(
+                [(row['date'].day, row['type'], row['name'], row['amount'], row['signed_amount']) for row in transactions],
+                [
+                    (5, 'Expense', 'Rent', Decimal('500.00'), Decimal('-500.00')),
+                    (10, 'Income', 'Salary', Decimal('1200.00'), Decimal('1200.00')),
+                    (15, 'Expense', 'Rent', Decimal('20.50'), Decimal('-20.50')),
+                ]
+            )
+            self.assertEqual(transactions[1]['income_type'], IncomeType.query.first().name)
+
+            # A rebuild, or installing the triggers again, gives the same entries
+            entries = self.entries()
+            self.assertEqual(rebuild_ledger_entries(), 3)
+            self.assertEqual(self.entries(), entries)
+            with db.engine.begin() as connection:
+                self.assertEqual(len(install_ledger_triggers(connection)), 6)
+            db.session.add(CashIn(user_id=user_id, income_id=salary.id, amount=1, date=date(2024, 1, 1)))
+            db.session.commit()
+            self.assertEqual(LedgerEntry.query.count(), 4)
+
+            today = date.today()
+            db.session.add_all([
+                CashIn(user_id=user_id, income_id=salary.id, amount=300, date=today),
+                CashOut(user_id=user_id, expense_id=rent_id, amount='120.25', date=today),
+            ])
+            db.session.commit()
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        # The month's totals come from the same read of the ledger as its transactions
+        statements = []
+        count = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.app.get('/dashboard')
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([statement for statement in statements if 'ledger_entry' in statement or 'cash_' in statement]), 1)
+        for total in ('300.00', '120.25', '179.75'):
+            self.assertIn(total, response.get_data(as_text=True))
+
+    def test_existing_database_gets_triggers(self):
+        """
+        Test that a database created before the ledger_entry table gets its triggers and entries.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add(rent)
+            db.session.commit()
+            user_id, rent_id = user.id, rent.id
+
+            # A database from before the table: transactions but no ledger_entry table or triggers
+            with db.engine.begin() as connection:
+                for name in install_ledger_triggers(connection):
+                    connection.exec_driver_sql('DROP TRIGGER {}'.format(name))
+                LedgerEntry.__table__.drop(connection)
+            db.session.add(CashOut(user_id=user_id, expense_id=rent_id, amount=500, date=date(2024, 1, 5)))
+            db.session.commit()
+
+            db.create_all()
+            self.assertEqual([entry.amount for entry in LedgerEntry.query.all()], [Decimal('-500.00')])
+
+            db.session.add(CashOut(user_id=user_id, expense_id=rent_id, amount=20, date=date(2024, 1, 6)))
+            db.session.commit()
+            self.assertEqual(LedgerEntry.query.count(), 2)
+
+            # A table that lost its triggers gets them back with its entries, other tables are left alone
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('DROP TRIGGER ledger_entry_cash_out_insert')
+            db.session.add(CashOut(user_id=user_id, expense_id=rent_id, amount=1, date=date(2024, 1, 7)))
+            db.session.commit()
+            self.assertEqual(LedgerEntry.query.count(), 2)
+
+            with db.engine.begin() as connection:
+                self.assertEqual(install_missing_ledger_triggers(connection), [EXPENSE])
+                self.assertEqual(install_missing_ledger_triggers(connection), [])
+            self.assertEqual(LedgerEntry.query.count(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# tests/test_importer.py
+"""
+Unit tests for the bank-statement importer.
+
+This module contains unit tests for streaming CSV and OFX statements into CashIn and CashOut
+transactions, resolving and creating categories by name, and reporting bad lines.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestImporter: A class containing unit tests for the importer.
+"""
+
+import io
+import unittest
+from decimal import Decimal
+from datetime import date
+from app import app, db
+from models import initialize_default_income_types, User, Income, Expense, CashIn, CashOut
+from importer import import_statement, read_ofx_statement
+from jobs import run_pending_jobs
+from calculations import calculate_total_income, calculate_total_expenses
+
+OFX_STATEMENT = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240301120000[-5:EST]
+<TRNAMT>2500.00
+<NAME>ACME PAYROLL
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>POS
+<DTPOSTED>20240302
+<TRNAMT>-42.10
+<NAME>Grocer
+<MEMO>Card purchase
+</STMTTRN>
+<STMTTRN><TRNTYPE>POS<DTPOSTED>2024-03-03<TRNAMT>-1.00</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+class TestImporter(unittest.TestCase):
+    """
+    A class containing unit tests for the importer.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user(self):
+        initialize_default_income_types()
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def test_import_csv(self):
+        """
+        Test a chunked CSV import with a custom column mapping, category creation and bad lines.
+        """
+        with app.app_context():
+            user = self.create_user()
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add(rent)
+            db.session.commit()
+            user_id, rent_id = user.id, rent.id
+
+            lines = ['Posted,Value,Payee,Category']
+            lines += ['01/03/2024,-10.00,Landlord,rent'] * 25
+            lines += [
+                '02/03/2024,"1,500.00",Employer,Salary',
+                '03/03/2024,abc,Broken,',
+                '2024-03-04,-5.00,Wrong date,',
+                '05/03/2024,-7.50,Kiosk,',
+            ]
+            statement = io.StringIO('\n'.join(lines) + '\n')
+
+            report = import_statement(
+                user_id, statement,
+                columns={'date': 'Posted', 'amount': 'Value', 'description': 'Payee', 'category': 'Category'},
+                date_format='%d/%m/%Y',
+                chunk_size=10
+            )
+
+            self.assertEqual(report['rows'], 29)
+            self.assertEqual(report['inserted'], 27)
+            self.assertEqual(report['error_count'], 2)
+            self.assertEqual([error['line'] for error in report['errors']], [28, 29])
+            self.assertGreater(report['rows_per_second'], 0)
+
+            self.assertEqual(CashOut.query.filter_by(user_id=user_id, expense_id=rent_id).count(), 25)
+            self.assertEqual(calculate_total_expenses(user_id), Decimal('257.50'))
+            self.assertEqual(calculate_total_income(user_id), Decimal('1500.00'))
+
+            uncategorized = Expense.query.filter_by(user_id=user_id, name='Uncategorized').one()
+            self.assertEqual(CashOut.query.filter_by(expense_id=uncategorized.id).one().description, 'Kiosk')
+            self.assertEqual(Income.query.filter_by(user_id=user_id, name='Salary').count(), 1)
+
+    def test_read_ofx(self):
+        """
+        Test reading the transactions of an SGML OFX statement.
+        """
+        entries = list(read_ofx_statement(io.StringIO(OFX_STATEMENT)))
+
+        self.assertEqual(entries[0], (6, {
+            'date': date(2024, 3, 1),
+            'amount': Decimal('2500.00'),
+            'description': 'ACME PAYROLL',
+            'category': 'CREDIT',
+        }, None))
+        self.assertEqual(entries[1][1]['amount'], Decimal('-42.10'))
+        self.assertEqual(entries[1][1]['description'], 'Grocer')
+        self.assertEqual(entries[2], (19, None, 'Invalid date or amount.'))
+
+    def test_upload_endpoint(self):
+        """
+        Test uploading an OFX statement and importing it with a job worker.
+        """
+        with app.app_context():
+            user_id = self.create_user().id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        response = self.app.post('/import_statement', data={
+            'statement': (io.BytesIO(OFX_STATEMENT.encode()), 'march.ofx'),
+        }, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json['status_url']
+        self.assertEqual(self.app.get(status_url).json['status'], 'queued')
+
+        with app.app_context():
+            self.assertEqual(run_pending_jobs(), 1)
+
+        report = self.app.get(status_url).json
+        self.assertEqual(report['status'], 'done')
+        self.assertEqual(report['result']['inserted'], 2)
+        self.assertEqual(report['result']['error_count'], 1)
+
+        with app.app_context():
+            self.assertEqual(CashIn.query.filter_by(user_id=user_id).one().amount, Decimal('2500.00'))
+            self.assertEqual(Expense.query.filter_by(user_id=user_id).one().name, 'Pos')
+
+        self.assertEqual(self.app.post('/import_statement', data={}, content_type='multipart/form-data').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
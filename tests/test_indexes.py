@@ -0,0 +1,162 @@
+# tests/test_indexes.py
+"""
+Query plan regression tests for the hot queries.
+
+This module runs the application's hot queries, asks the database for the plan of every SELECT they
+send (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on MySQL) and fails if one of them reads a whole
+transaction, category, debt, credit or summary table. It also checks that missing indexes are added
+to existing databases.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestIndexes: A class containing the query plan tests.
+"""
+
+import unittest
+from datetime import date
+from sqlalchemy import event, func
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, Credit, Debt, DebtorPayment
+from ledger import INCOME, EXPENSE, query_income_rows, query_expense_rows
+from analytics import load_ledger_frame
+from rollups import rollup_category_totals, rollup_total
+from balance_index import cumulative_as_of
+from budgets import month_spending
+from categories import category_directory, find_category
+from settlements import reconcile_settlements
+from archive import range_ledger_rows
+from entries import query_ledger_entries
+from indexes import create_missing_indexes, full_table_scans
+
+# Tables that grow with use and must never be read in full by a hot query
+HOT_TABLES = {
+    'cash_in', 'cash_out', 'income', 'expense', 'credit', 'debt', 'debtor_payment', 'creditor_payment',
+    'daily_rollup', 'balance_index', 'budget_expense', 'cash_in_archive', 'cash_out_archive', 'archive_monthly_total',
+    'ledger_entry',
+}
+
+class TestIndexes(unittest.TestCase):
+    """
+    A class containing the query plan tests.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def capture_selects(self, function):
+        statements = []
+
+        def capture(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            function()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+        return statements
+
+    def test_hot_query_plans(self):
+        """
+        Test that none of the hot queries reads a whole hot table.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            rent = Expense(user_id=user.id, name='Rent')
+            credit = Credit(user_id=user.id, debtor='Friend', amount=100, date_taken=date(2024, 1, 1))
+            debt = Debt(user_id=user.id, creditor='Bank', amount=100, date_taken=date(2024, 1, 1))
+            db.session.add_all([salary, rent, credit, debt])
+            db.session.commit()
+
+            db.session.add_all([
+                CashIn(user_id=user.id, income_id=salary.id, amount=1000, date=date(2024, 1, 5)),
+                CashOut(user_id=user.id, expense_id=rent.id, amount=500, date=date(2024, 1, 6)),
+                DebtorPayment(credit_id=credit.id, amount=10, date=date(2024, 1, 7)),
+            ])
+            db.session.commit()
+
+            user_id, salary_id, rent_id = user.id, salary.id, rent.id
+            start_date, end_date = date(2024, 1, 1), date(2024, 1, 31)
+
+            hot_queries = {
+                'income rows': lambda: query_income_rows(user_id, start_date, end_date),
+                'expense rows': lambda: query_expense_rows(user_id, start_date, end_date),
+                'ledger frame': lambda: load_ledger_frame(user_id, start_date, end_date),
+                'ledger entries': lambda: query_ledger_entries(user_id, start_date, end_date),
+                'category rollups': lambda: rollup_category_totals(user_id, EXPENSE, start_date, end_date),
+                'rollup total': lambda: rollup_total(user_id, INCOME, start_date, end_date),
+                'balance as of': lambda: cumulative_as_of(user_id, end_date),
+                'month spending': lambda: month_spending(user_id, 2024, 1, rent_id),
+                'category directory': lambda: (category_directory.clear(), find_category(user_id, EXPENSE, 'Rent')),
+                'category income': lambda: CashIn.query.filter_by(income_id=salary_id, user_id=user_id).all(),
+                'category expenses': lambda: CashOut.query.filter_by(expense_id=rent_id, user_id=user_id).all(),
+                'outstanding credits': lambda: Credit.query.filter_by(user_id=user_id, is_paid=False).all(),
+                'outstanding debts': lambda: Debt.query.filter_by(user_id=user_id, is_paid=False).all(),
+                'credits by date': lambda: Credit.query.filter_by(user_id=user_id).order_by(Credit.date_taken.desc()).all(),
+                'debt taken': lambda: db.session.query(func.sum(Debt.amount)).filter(
+                    Debt.user_id == user_id, Debt.date_taken >= start_date, Debt.date_taken <= end_date
+                ).scalar(),
+                'reconciliation': lambda: reconcile_settlements(repair=False, full=True),
+                'archived income': lambda: range_ledger_rows(user_id, INCOME, date(2023, 11, 15), date(2024, 1, 10)),
+                'archived expenses': lambda: range_ledger_rows(user_id, EXPENSE, date(2023, 11, 15), date(2024, 1, 10)),
+            }
+
+            plans = {name: self.capture_selects(function) for name, function in hot_queries.items()}
+
+            with db.engine.connect() as connection:
+                for name, statements in plans.items():
+                    self.assertTrue(statements, name)
+                    for statement, parameters in statements:
+                        scans = HOT_TABLES.intersection(full_table_scans(connection, statement, parameters))
+                        self.assertFalse(scans, '{} scans {}: {}'.format(name, ', '.join(sorted(scans)), statement))
+
+                # The harness does see full scans
+                statement = 'SELECT * FROM cash_in WHERE description = ?'
+                self.assertEqual(full_table_scans(connection, statement, ('Rent',)), ['cash_in'])
+
+    def test_create_missing_indexes(self):
+        """
+        Test adding the declared indexes to a database created without them.
+        """
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('DROP INDEX ix_cash_in_user_date')
+                connection.exec_driver_sql('DROP INDEX ix_debtor_payment_credit')
+
+            with db.engine.begin() as connection:
+                created = create_missing_indexes(connection, db.metadata)
+            self.assertEqual(created, [('cash_in', 'ix_cash_in_user_date'), ('debtor_payment', 'ix_debtor_payment_credit')])
+
+            with db.engine.begin() as connection:
+                self.assertEqual(create_missing_indexes(connection, db.metadata), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+# tests/test_jobs.py
+"""
+Unit tests for the background job queue.
+
+This module contains unit tests that check jobs are run once each by competing workers, retried
+with a delay when they fail, failed for good after their last attempt, and that their progress and
+result are visible to their owner only, and that the worker keeps the heartbeat of a silent job fresh.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestJobs: A class containing unit tests for the job queue.
+"""
+
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app import app, db
+from models import User, Job
+from jobs import job_task, enqueue_job, claim_job, work, run_pending_jobs, requeue_stale_jobs
+
+calls = []
+
+@job_task('test-count')
+def count_job(progress, number):
+    progress(1, 2)
+    calls.append(number)
+    progress(2, 2)
+    return {'number': number}
+
+@job_task('test-flaky', max_attempts=2)
+def flaky_job(progress):
+    calls.append('flaky')
+    if len(calls) == 1:
+        raise RuntimeError('temporary failure')
+    return 'recovered'
+
+@job_task('test-silent')
+def silent_job(progress, seconds):
+    time.sleep(seconds)
+    return 'quiet'
+
+class TestJobs(unittest.TestCase):
+    """
+    A class containing unit tests for the job queue.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+        del calls[:]
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_status_endpoint(self):
+        """
+        Test a job's progress and result through the status endpoint.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            job_id = enqueue_job('test-count', {'number': 7}, user_id=user_id).id
+            other_job_id = enqueue_job('test-count', {'number': 8}).id
+
+            with self.assertRaises(ValueError):
+                enqueue_job('no-such-job')
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        self.assertEqual(self.app.get('/jobs/{}'.format(job_id)).json['status'], 'queued')
+        self.assertEqual(self.app.get('/jobs/{}'.format(other_job_id)).status_code, 404)
+
+        with app.app_context():
+            self.assertEqual(run_pending_jobs(), 2)
+
+        status = self.app.get('/jobs/{}'.format(job_id)).json
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['progress'], {'done': 2, 'total': 2})
+        self.assertEqual(status['result'], {'number': 7})
+        self.assertEqual(status['attempts'], 1)
+
+    def test_retries_and_failures(self):
+        """
+        Test retrying a failed job after a delay, failing it for good and requeueing stale jobs.
+        """
+        with app.app_context():
+            job_id = enqueue_job('test-flaky').id
+            self.assertEqual(run_pending_jobs(), 1)
+
+            job = db.session.get(Job, job_id)
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertEqual(job.error, 'RuntimeError: temporary failure')
+            self.assertGreater(job.run_after, datetime.utcnow())
+
+            # The retry is not due yet
+            self.assertEqual(run_pending_jobs(), 0)
+            job.run_after = datetime.utcnow()
+            db.session.commit()
+            self.assertEqual(run_pending_jobs(), 1)
+            job = db.session.get(Job, job_id)
+            self.assertEqual((job.status, job.result), ('done', '"recovered"'))
+
+            # Out of attempts
+            job_id = enqueue_job('test-flaky', max_attempts=1).id
+            run_pending_jobs()
+            self.assertEqual(db.session.get(Job, job_id).status, 'done')
+            calls[:] = []
+            job_id = enqueue_job('test-flaky', max_attempts=1).id
+            run_pending_jobs()
+            self.assertEqual(db.session.get(Job, job_id).status, 'failed')
+
+            # A job whose worker died is picked up again
+            job_id = enqueue_job('test-count', {'number': 1}).id
+            claim_job('dead-worker')
+            job = db.session.get(Job, job_id)
+            job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+            db.session.commit()
+            self.assertEqual(requeue_stale_jobs(), 1)
+            self.assertEqual(run_pending_jobs(), 1)
+            job = db.session.get(Job, job_id)
+            self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_heartbeat_without_progress(self):
+        """
+        Test that a job that never reports progress is not requeued while its worker runs it.
+        """
+        with app.app_context():
+            job_id = enqueue_job('test-silent', {'seconds': 0.6}).id
+
+        def worker():
+            with app.app_context():
+                work('silent-worker', stop_when_idle=True)
+                db.session.remove()
+
+        with mock.patch('jobs.HEARTBEAT_INTERVAL', timedelta(seconds=0.05)):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.4)
+            with app.app_context():
+                self.assertEqual(requeue_stale_jobs(timeout=timedelta(seconds=0.2)), 0)
+            thread.join()
+
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            self.assertEqual((job.status, job.attempts), ('done', 1))
+
+    def test_competing_workers(self):
+        """
+        Test that workers racing for the same queue run every job exactly once.
+        """
+        with app.app_context():
+            for number in range(30):
+                enqueue_job('test-count', {'number': number})
+
+        def worker(name):
+            with app.app_context():
+                work(name, stop_when_idle=True)
+                db.session.remove()
+
+        threads = [threading.Thread(target=worker, args=('worker-{}'.format(index),)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(calls), list(range(30)))
+        with app.app_context():
+            self.assertEqual(Job.query.filter_by(status='done').count(), 30)
+
+if __name__ == '__main__':
+    unittest.main()
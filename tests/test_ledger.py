@@ -0,0 +1,156 @@
+# tests/test_ledger.py
+"""
+Unit tests for the ledger read layer.
+
+This module contains unit tests for the shared ledger queries used by the calculation functions.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestLedger: A class containing unit tests for the ledger read layer.
+"""
+
+import unittest
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import app, db
+from ledger import query_income_rows, query_expense_rows
+from calculations import calculate_total_income_between_dates, calculate_total_expenses_between_dates
+from models import User, IncomeType, Income, Expense, CashIn, CashOut
+
+class TestLedger(unittest.TestCase):
+    """
+    A class containing unit tests for the ledger read layer.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def count_queries(self, function, *args):
+        """
+        Call `function` with a cold identity map and return the number of SQL statements it issued.
+        """
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.expunge_all()
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            function(*args)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+        return len(statements)
+
+    def add_transactions(self, user_id, income_id, expense_id, count):
+        today = date.today()
+        db.session.add_all([
+            CashIn(user_id=user_id, income_id=income_id, amount=10.00, date=today - timedelta(days=i % 5))
+            for i in range(count)
+        ])
+        db.session.add_all([
+            CashOut(user_id=user_id, expense_id=expense_id, amount=5.00, date=today - timedelta(days=i % 5))
+            for i in range(count)
+        ])
+        db.session.commit()
+
+    def test_query_rows_shape(self):
+        """
+        Test that the ledger rows carry the category and income type names.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            expense = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, expense])
+            db.session.commit()
+
+            today = date.today()
+            cash_in = CashIn(user_id=user.id, income_id=income.id, amount=1000.00, date=today, description='pay')
+            cash_out = CashOut(user_id=user.id, expense_id=expense.id, amount=100.00, date=today, description='rent')
+            db.session.add_all([cash_in, cash_out])
+            db.session.commit()
+
+            incomes = query_income_rows(user.id, today, today)
+            self.assertEqual(incomes, [{
+                'amount': cash_in.amount,
+                'date': today,
+                'name': 'Monthly Salary',
+                'description': 'pay',
+                'id': cash_in.id,
+                'income_type': 'Salary',
+                'type': 'Income',
+                'income_category_id': income.id
+            }])
+
+            expenses = query_expense_rows(user.id, today, today)
+            self.assertEqual(expenses, [{
+                'amount': cash_out.amount,
+                'date': today,
+                'name': 'Rent',
+                'description': 'rent',
+                'id': cash_out.id,
+                'type': 'Expense',
+                'expense_category_id': expense.id
+            }])
+
+    def test_query_count_is_constant(self):
+        """
+        Test that the calculation functions issue the same number of queries regardless of row count.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            expense = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, expense])
+            db.session.commit()
+
+            user_id, income_id, expense_id = user.id, income.id, expense.id
+            start_date = date.today() - timedelta(days=10)
+            end_date = date.today()
+
+            self.add_transactions(user_id, income_id, expense_id, 3)
+            small_income = self.count_queries(calculate_total_income_between_dates.uncached, user_id, start_date, end_date)
+            small_expense = self.count_queries(calculate_total_expenses_between_dates.uncached, user_id, start_date, end_date)
+
+            self.add_transactions(user_id, income_id, expense_id, 60)
+            large_income = self.count_queries(calculate_total_income_between_dates.uncached, user_id, start_date, end_date)
+            large_expense = self.count_queries(calculate_total_expenses_between_dates.uncached, user_id, start_date, end_date)
+
+            self.assertEqual(small_income, 1)
+            self.assertEqual(small_expense, 1)
+            self.assertEqual(large_income, small_income)
+            self.assertEqual(large_expense, small_expense)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# tests/test_loading.py
+"""
+Query count tests for the list and budget routes.
+
+This module requests each list and budget page with few and with many rows, under both eager
+loading strategies, and checks the number of SQL statements it runs does not grow with the
+number of rows.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestLoading: A class containing the query count tests.
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, Budget, BudgetExpense, Credit, Debt
+from cache import result_cache
+from categories import category_directory
+from loading import eager
+
+class TestLoading(unittest.TestCase):
+    """
+    A class containing the query count tests.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_rows(self, user_id, count):
+        """
+        Add `count` categories, transactions, credits, debts and budgets (each with an expense of every new category).
+        """
+        income_type_id = IncomeType.query.first().id
+        incomes = [Income(user_id=user_id, name='Income {}'.format(index), income_type_id=income_type_id) for index in range(count)]
+        expenses = [Expense(user_id=user_id, name='Expense {}'.format(index)) for index in range(count)]
+        db.session.add_all(incomes + expenses)
+        db.session.commit()
+
+        today = date.today()
+        budgets = Budget.query.filter_by(user_id=user_id).count()
+        for index in range(count):
+            month = budgets + index
+            budget = Budget(user_id=user_id, year=today.year - 1 - month // 12, month=month % 12 + 1)
+            db.session.add(budget)
+            db.session.flush()
+            db.session.add_all([BudgetExpense(budget_id=budget.id, expense_id=expense.id, expected_amount=100, spent_amount=0) for expense in expenses])
+
+        current_budget = Budget.query.filter_by(user_id=user_id, year=today.year, month=today.month).first()
+        db.session.add_all([BudgetExpense(budget_id=current_budget.id, expense_id=expense.id, expected_amount=100, spent_amount=0) for expense in expenses])
+
+        for index in range(count):
+            db.session.add_all([
+                CashIn(user_id=user_id, income_id=incomes[index].id, amount=10, date=today),
+                CashIn(user_id=user_id, income_id=incomes[0].id, amount=10, date=today),
+                CashOut(user_id=user_id, expense_id=expenses[index].id, amount=5, date=today),
+                CashOut(user_id=user_id, expense_id=expenses[0].id, amount=5, date=today),
+                Credit(user_id=user_id, debtor='Debtor {}'.format(index), amount=50, date_taken=today),
+                Debt(user_id=user_id, creditor='Creditor {}'.format(index), amount=50, date_taken=today),
+            ])
+        db.session.commit()
+
+    def count_route_queries(self, requests):
+        """
+        Run each request with cold caches and return the number of SQL statements each one issued.
+        """
+        with app.app_context():
+            engine = db.engine
+
+        counts = {}
+        for name, request in requests.items():
+            result_cache.clear()
+            category_directory.clear()
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                response = request()
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+            self.assertLess(response.status_code, 400, name)
+            counts[name] = len(statements)
+        return counts
+
+    def test_fixed_query_counts(self):
+        """
+        Test that the list and budget routes run as many queries with many rows as with few.
+        """
+        today = date.today()
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            current_budget = Budget(user_id=user_id, year=today.year, month=today.month)
+            db.session.add(current_budget)
+            db.session.commit()
+            budget_id = current_budget.id
+            self.add_rows(user_id, 2)
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        search = '?from={}&to={}'.format(date(today.year, today.month, 1), today)
+        requests = {
+            'dashboard': lambda: self.app.get('/dashboard'),
+            'income': lambda: self.app.get('/income'),
+            'income by category': lambda: self.app.post('/income', json={'category_name': 'Income 0'}),
+            'search income': lambda: self.app.get('/search_income_transactions' + search),
+            'expense': lambda: self.app.get('/expense'),
+            'expense by category': lambda: self.app.post('/expense', json={'category_name': 'Expense 0'}),
+            'search expenses': lambda: self.app.get('/search_expense_transactions' + search),
+            'credit': lambda: self.app.get('/credit'),
+            'debt': lambda: self.app.get('/debt'),
+            'budget': lambda: self.app.get('/budget'),
+            'budget expenses': lambda: self.app.get('/search_budget_expenses/{}'.format(budget_id)),
+            'budget by month': lambda: self.app.post('/search_budget_by_year_month', json={'year': today.year, 'month': today.month}),
+            'recurring': lambda: self.app.get('/recurring_transactions'),
+        }
+
+        for strategy in ('selectin', 'joined'):
+            with mock.patch('loading.EAGER_LOADING', strategy):
+                few = self.count_route_queries(requests)
+                with app.app_context():
+                    self.add_rows(user_id, 15)
+                many = self.count_route_queries(requests)
+                self.assertEqual(many, few, strategy)
+
+    def test_unknown_strategy(self):
+        """
+        Test that an unknown loading strategy is refused.
+        """
+        with self.assertRaises(ValueError):
+            eager(Budget.expenses, strategy='lazy')
+
+if __name__ == '__main__':
+    unittest.main()
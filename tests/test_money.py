@@ -0,0 +1,130 @@
+# tests/test_money.py
+"""
+Unit tests for the integer-cents money type.
+
+This module contains unit tests for parsing and formatting amounts, storing them as cents,
+exact budget arithmetic and the migration of decimal amount columns.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestMoney: A class containing unit tests for the money type.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import Column, Integer, MetaData, Numeric, Table, create_engine, inspect, text, BigInteger
+from app import app, db
+from models import User, Expense, CashOut, Budget, BudgetExpense
+from money import Money, to_cents, from_cents, parse_amount, format_money, migrate_amounts_to_cents
+
+class TestMoney(unittest.TestCase):
+    """
+    A class containing unit tests for the money type.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_parse_and_format(self):
+        """
+        Test the conversions between amounts, cents and display strings.
+        """
+        self.assertEqual(to_cents(12), 1200)
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents(1.005), 101)
+        self.assertEqual(to_cents('1,234.5/='), 123450)
+        self.assertEqual(to_cents(Decimal('-2.345')), -235)
+        self.assertEqual(from_cents(123450), Decimal('1234.50'))
+        self.assertEqual(str(from_cents(0)), '0.00')
+        self.assertEqual(parse_amount(0.1) + parse_amount(0.2), Decimal('0.30'))
+        self.assertEqual(format_money(Decimal('1234567.5')), '1,234,567.50/=')
+        self.assertEqual(format_money(-0.05), '-0.05/=')
+
+        with self.assertRaises(ValueError):
+            to_cents('abc')
+
+    def test_amounts_stored_as_cents(self):
+        """
+        Test that amounts are stored as integers and read back as exact Decimals.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add(rent)
+            db.session.commit()
+
+            cash_out = CashOut(user_id=user.id, expense_id=rent.id, amount=0.1, date=date.today())
+            db.session.add(cash_out)
+            db.session.commit()
+
+            self.assertEqual(db.session.execute(text('SELECT amount FROM cash_out')).scalar(), 10)
+            self.assertEqual(db.session.get(CashOut, cash_out.id).amount, Decimal('0.10'))
+
+            # Spending is accumulated without float drift
+            budget = Budget(user_id=user.id, year=2024, month=1)
+            db.session.add(budget)
+            db.session.commit()
+            budget_expense = BudgetExpense(budget_id=budget.id, expense_id=rent.id, expected_amount=1.00, spent_amount=0)
+            db.session.add(budget_expense)
+            db.session.commit()
+
+            for _ in range(3):
+                budget_expense.update_spent_amount(0.1)
+            self.assertEqual(budget_expense.spent_amount, Decimal('0.30'))
+
+    def test_migrate_decimal_columns(self):
+        """
+        Test that decimal amount columns are converted to cents exactly once.
+        """
+        engine = create_engine('sqlite://')
+        legacy = MetaData()
+        Table('payment', legacy, Column('id', Integer, primary_key=True), Column('amount', Numeric(10, 2)))
+        legacy.create_all(engine)
+
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO payment (amount) VALUES (12.34), (0.1), (99999999.99)"))
+
+        current = MetaData()
+        Table('payment', current, Column('id', Integer, primary_key=True), Column('amount', Money))
+        Table('missing', current, Column('id', Integer, primary_key=True), Column('amount', Money))
+
+        with engine.begin() as connection:
+            self.assertEqual(migrate_amounts_to_cents(connection, current), [('payment', 'amount')])
+        with engine.begin() as connection:
+            self.assertEqual(migrate_amounts_to_cents(connection, current), [])
+
+        with engine.connect() as connection:
+            self.assertIsInstance(inspect(connection).get_columns('payment')[1]['type'], BigInteger)
+            self.assertEqual(
+                [row[0] for row in connection.execute(text('SELECT amount FROM payment ORDER BY id'))],
+                [1234, 10, 9999999999]
+            )
+
+if __name__ == '__main__':
+    unittest.main()
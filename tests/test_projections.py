@@ -0,0 +1,106 @@
+# tests/test_projections.py
+"""
+Unit tests for the read-only row projections.
+
+This module contains unit tests that check the list pages read named-tuple rows of only the
+columns they show, without loading ORM instances into the session, and still return and render
+the same data.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestProjections: A class containing unit tests for the projections.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, Credit, Debt
+from ledger import INCOME
+from projections import TransactionRow, CreditRow, category_transactions, user_credits, user_debts
+
+class TestProjections(unittest.TestCase):
+    """
+    A class containing unit tests for the projections.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_list_pages(self):
+        """
+        Test the projected rows and the pages and filters built from them.
+        """
+        with app.app_context():
+            initialize_default_income_types()
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            db.session.add(user)
+            db.session.commit()
+            salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([salary, rent])
+            db.session.commit()
+            user_id, salary_id = user.id, salary.id
+
+            db.session.add_all([
+                CashIn(user_id=user_id, income_id=salary_id, amount=1000, date=date(2024, 1, 5), description='January'),
+                CashIn(user_id=user_id, income_id=salary_id, amount=250.5, date=date(2024, 2, 5)),
+                CashOut(user_id=user_id, expense_id=rent.id, amount=500, date=date(2024, 1, 6)),
+                Credit(user_id=user_id, debtor='Friend', amount=100, date_taken=date(2024, 1, 1)),
+                Credit(user_id=user_id, debtor='Neighbour', amount=50, date_taken=date(2024, 3, 1)),
+                Debt(user_id=user_id, creditor='Bank', amount=300, date_taken=date(2024, 1, 1)),
+            ])
+            db.session.commit()
+            db.session.expunge_all()
+
+            transactions = category_transactions(user_id, INCOME, salary_id)
+            self.assertEqual(transactions[0], TransactionRow(transactions[0].id, salary_id, Decimal('1000.00'), date(2024, 1, 5), 'January'))
+            credits = user_credits(user_id)
+            self.assertIsInstance(credits[0], CreditRow)
+            self.assertEqual([credit.debtor for credit in credits], ['Neighbour', 'Friend'])
+            self.assertEqual(user_debts(user_id)[0].amount_payed, Decimal('0.00'))
+
+            # Nothing was loaded into the identity map
+            self.assertEqual(len(db.session.identity_map), 0)
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        response = self.app.post('/income', json={'category_name': 'Salary'})
+        self.assertEqual(response.json['total'], '1,250.50/=')
+        self.assertEqual(response.json['transactions'][0], {
+            'id': transactions[0].id, 'category': 'Salary', 'amount': '1,000.00/=', 'date': '2024-01-05', 'description': 'January'
+        })
+        self.assertEqual(self.app.post('/expense', json={'category_name': 'Rent'}).json['total_expenses'], '500.00/=')
+
+        response = self.app.get('/credit')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Neighbour', response.data)
+        response = self.app.get('/debt')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Bank', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# tests/test_recurring.py
+"""
+Unit tests for recurring transactions.
+
+This module contains unit tests that check schedules produce the right occurrence dates and that
+materializing them writes each occurrence once, in batches, however often it is run.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestRecurring: A class containing unit tests for recurring transactions.
+"""
+
+import unittest
+from types import SimpleNamespace
+from decimal import Decimal
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import app, db
+from models import initialize_default_income_types, User, IncomeType, Income, Expense, CashIn, CashOut, UserTotals, RecurringTransaction
+from ledger import INCOME, EXPENSE
+from recurring import occurrence_date, due_dates, due_count, create_recurring_transaction, materialize_recurring
+from jobs import run_pending_jobs
+
+class TestRecurring(unittest.TestCase):
+    """
+    A class containing unit tests for recurring transactions.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user(self):
+        initialize_default_income_types()
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        salary = Income(user_id=user.id, name='Salary', income_type_id=IncomeType.query.first().id)
+        rent = Expense(user_id=user.id, name='Rent')
+        db.session.add_all([salary, rent])
+        db.session.commit()
+        return user.id, salary.id, rent.id
+
+    def test_occurrence_dates(self):
+        """
+        Test month-end clamping and intervals.
+        """
+        start = date(2024, 1, 31)
+        self.assertEqual(
+            [occurrence_date('monthly', 1, start, index) for index in range(4)],
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+        )
+        self.assertEqual(occurrence_date('weekly', 2, date(2024, 1, 1), 3), date(2024, 2, 12))
+        self.assertEqual(occurrence_date('yearly', 1, date(2024, 2, 29), 1), date(2025, 2, 28))
+
+        # Counting the due occurrences agrees with listing them
+        for frequency, interval, end_date, next_date in (
+            ('daily', 1, None, date(2024, 1, 31)), ('weekly', 2, date(2024, 3, 1), date(2024, 1, 31)),
+            ('monthly', 1, None, date(2024, 2, 29)), ('yearly', 1, None, date(2025, 1, 31)), ('daily', 3, None, date(2024, 7, 1)),
+        ):
+            template = SimpleNamespace(frequency=frequency, interval=interval, start_date=start, end_date=end_date, next_date=next_date)
+            self.assertEqual(due_count(template, date(2024, 6, 30)), len(due_dates(template, date(2024, 6, 30))[0]), frequency)
+
+    def test_materialize(self):
+        """
+        Test catching up, batching and re-running without duplicates.
+        """
+        with app.app_context():
+            user_id, salary_id, rent_id = self.create_user()
+
+            create_recurring_transaction(user_id, EXPENSE, rent_id, 1000, 'monthly', date(2024, 1, 31), description='Rent')
+            create_recurring_transaction(user_id, INCOME, salary_id, 3000, 'monthly', date(2024, 1, 25))
+            create_recurring_transaction(user_id, EXPENSE, rent_id, 10, 'weekly', date(2024, 1, 1), interval=2, end_date=date(2024, 2, 1))
+            with self.assertRaises(ValueError):
+                create_recurring_transaction(user_id, EXPENSE, salary_id + rent_id, 10, 'monthly', date(2024, 1, 1))
+
+            statements = []
+            count = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                report = materialize_recurring(until=date(2024, 4, 30), batch_size=2)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            # 4 rents, 4 salaries and 3 fortnightly payments, written in 2 batches
+            self.assertEqual(report, {'templates': 3, 'transactions': 11, 'batches': 2})
+            self.assertEqual(len([statement for statement in statements if statement.startswith('INSERT INTO cash_out')]), 2)
+            self.assertEqual(
+                [row.date for row in CashOut.query.filter_by(amount=1000).order_by(CashOut.date)],
+                [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+            )
+            self.assertEqual(CashIn.query.count(), 4)
+            self.assertEqual(db.session.get(UserTotals, user_id).total_expense, Decimal('4030.00'))
+
+            fortnightly = RecurringTransaction.query.filter_by(frequency='weekly').one()
+            self.assertFalse(fortnightly.is_active)
+            self.assertIsNone(fortnightly.next_date)
+
+            # Running again, or after next_date was moved back, writes nothing twice
+            self.assertEqual(materialize_recurring(until=date(2024, 4, 30))['transactions'], 0)
+            RecurringTransaction.query.filter_by(amount=1000).update({'next_date': date(2024, 1, 31)})
+            db.session.commit()
+            self.assertEqual(materialize_recurring(until=date(2024, 5, 31))['transactions'], 2)
+            self.assertEqual(CashOut.query.filter_by(amount=1000).count(), 5)
+
+    def test_routes(self):
+        """
+        Test creating, listing and deleting recurring transactions through the routes.
+        """
+        with app.app_context():
+            user_id, salary_id, rent_id = self.create_user()
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        start = date.today() - timedelta(days=3)
+        response = self.app.post('/create_recurring_transaction', json={
+            'kind': 'expense', 'category_id': rent_id, 'amount': '5.50', 'frequency': 'daily', 'start_date': start.strftime('%Y-%m-%d')
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['transactions_created'], 4)
+        recurring_id = response.json['recurring_id']
+
+        response = self.app.post('/create_recurring_transaction', json={
+            'kind': 'expense', 'category_id': rent_id, 'amount': '5.50', 'frequency': 'hourly', 'start_date': '2024-01-01'
+        })
+        self.assertEqual(response.status_code, 400)
+
+        recurring = self.app.get('/recurring_transactions').json['recurring_transactions']
+        self.assertEqual(len(recurring), 1)
+        self.assertEqual(recurring[0]['next_date'], (date.today() + timedelta(days=1)).strftime('%Y-%m-%d'))
+
+        self.assertEqual(self.app.post('/delete_recurring_transaction', json={'recurring_id': recurring_id}).status_code, 200)
+        with app.app_context():
+            self.assertEqual(RecurringTransaction.query.count(), 0)
+            self.assertEqual(CashOut.query.count(), 4)
+
+        # A long backlog is left to a job
+        start = date.today() - timedelta(days=999)
+        response = self.app.post('/create_recurring_transaction', json={
+            'kind': 'expense', 'category_id': rent_id, 'amount': '1', 'frequency': 'daily', 'start_date': start.strftime('%Y-%m-%d')
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.app.get(response.json['status_url']).json['status'], 'queued')
+        with app.app_context():
+            self.assertEqual(CashOut.query.count(), 4)
+            self.assertEqual(run_pending_jobs(), 1)
+            self.assertEqual(CashOut.query.count(), 1004)
+
+if __name__ == '__main__':
+    unittest.main()
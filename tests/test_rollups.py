@@ -0,0 +1,149 @@
+# tests/test_rollups.py
+"""
+Unit tests for the daily rollup table.
+
+This module contains unit tests that check the DailyRollup rows are kept in step with
+CashIn/CashOut inserts, edits and deletes, and that the report functions read from them.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestRollups: A class containing unit tests for the daily rollups.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date, timedelta
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, CashOut, DailyRollup
+from ledger import INCOME, EXPENSE
+from rollups import rebuild_rollups, rollup_category_totals, rollup_bucket_totals
+from transactions import add_cash_in_transaction, calculate_income_totals, calculate_expense_totals
+
+class TestRollups(unittest.TestCase):
+    """
+    A class containing unit tests for the daily rollups.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user_and_categories(self):
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        income_type = IncomeType(name='Salary')
+        db.session.add_all([user, income_type])
+        db.session.commit()
+
+        income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+        rent = Expense(user_id=user.id, name='Rent')
+        food = Expense(user_id=user.id, name='Food')
+        db.session.add_all([income, rent, food])
+        db.session.commit()
+        return user, income, rent, food
+
+    def rollup_rows(self):
+        return sorted(
+            (row.user_id, row.kind, row.category_id, row.day, row.amount, row.count)
+            for row in DailyRollup.query.all()
+        )
+
+    def test_rollups_follow_writes(self):
+        """
+        Test that inserts, edits and deletes are reflected in the daily rollups.
+        """
+        with app.app_context():
+            user, income, rent, food = self.create_user_and_categories()
+            today = date.today()
+            yesterday = today - timedelta(days=1)
+
+            # Inserts through the ORM and through add_cash_in_transaction
+            cash_out1 = CashOut(user_id=user.id, expense_id=rent.id, amount=100.00, date=today)
+            cash_out2 = CashOut(user_id=user.id, expense_id=rent.id, amount=50.25, date=today)
+            db.session.add_all([cash_out1, cash_out2])
+            db.session.commit()
+            add_cash_in_transaction(user.id, 1000.00, today, income.id)
+
+            self.assertEqual(rollup_category_totals(user.id, EXPENSE, today, today), {rent.id: Decimal('150.25')})
+            self.assertEqual(rollup_category_totals(user.id, INCOME, today, today), {income.id: Decimal('1000.00')})
+
+            # Edit amount, date and category of an expired instance
+            cash_out2 = db.session.get(CashOut, cash_out2.id)
+            cash_out2.update_transaction('moved', 20.00, yesterday, food.id)
+
+            self.assertEqual(rollup_category_totals(user.id, EXPENSE, today, today), {rent.id: Decimal('100.00')})
+            self.assertEqual(rollup_category_totals(user.id, EXPENSE, yesterday, yesterday), {food.id: Decimal('20.00')})
+
+            # Delete
+            cash_out1.delete_transaction()
+            self.assertEqual(rollup_category_totals(user.id, EXPENSE, today, today), {})
+
+            # Rebuilding from the ledger produces the same rows
+            incremental = self.rollup_rows()
+            rebuild_rollups()
+            self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_rollups_discard_rolled_back_writes(self):
+        """
+        Test that a rolled back write leaves the rollups untouched.
+        """
+        with app.app_context():
+            user, income, rent, food = self.create_user_and_categories()
+            today = date.today()
+
+            db.session.add(CashOut(user_id=user.id, expense_id=rent.id, amount=100.00, date=today))
+            db.session.flush()
+            db.session.rollback()
+
+            self.assertEqual(DailyRollup.query.count(), 0)
+
+    def test_reports_read_rollups(self):
+        """
+        Test the category and weekly totals computed from the rollups.
+        """
+        with app.app_context():
+            user, income, rent, food = self.create_user_and_categories()
+            today = date.today()
+            start_of_month = date(today.year, today.month, 1)
+
+            db.session.add_all([
+                CashIn(user_id=user.id, income_id=income.id, amount=500.00, date=start_of_month),
+                CashOut(user_id=user.id, expense_id=rent.id, amount=100.00, date=start_of_month),
+                CashOut(user_id=user.id, expense_id=rent.id, amount=40.00, date=start_of_month + timedelta(days=8)),
+            ])
+            db.session.commit()
+
+            self.assertEqual(calculate_income_totals(user.id, start_of_month, start_of_month + timedelta(days=27)),
+                             {'Monthly Salary': Decimal('500.00')})
+            self.assertEqual(calculate_expense_totals(user.id, start_of_month, start_of_month + timedelta(days=27)),
+                             {'Rent': Decimal('140.00'), 'Food': 0})
+
+            weeks = [
+                (start_of_month, start_of_month + timedelta(days=6)),
+                (start_of_month + timedelta(days=7), start_of_month + timedelta(days=13)),
+                (start_of_month + timedelta(days=14), start_of_month + timedelta(days=20)),
+            ]
+            self.assertEqual(rollup_bucket_totals(user.id, EXPENSE, weeks), [Decimal('100.00'), Decimal('40.00'), 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+# tests/test_settlements.py
+"""
+Unit tests for the settlement service.
+
+This module contains unit tests that check a settlement writes the payment, the cash movement and
+the paid amount in one commit, refuses over-payments, and stays consistent when many settlements
+of the same credit run concurrently, and that drifted paid amounts are found and repaired.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestSettlements: A class containing unit tests for settlements.
+"""
+
+import threading
+import unittest
+from decimal import Decimal
+from datetime import date
+from app import app, db
+from models import initialize_default_income_types, User, CashIn, CashOut, Credit, Debt, CreditorPayment, DebtorPayment
+from settlements import settle_credit_payment, reconcile_settlements
+
+class TestSettlements(unittest.TestCase):
+    """
+    A class containing unit tests for settlements.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_user(self):
+        initialize_default_income_types()
+        user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    def test_settle_routes(self):
+        """
+        Test settling a debt and a credit through the routes.
+        """
+        with app.app_context():
+            user_id = self.create_user()
+            debt = Debt(user_id=user_id, creditor='Bank', amount=100, date_taken=date(2024, 1, 1))
+            credit = Credit(user_id=user_id, debtor='Friend', amount=50, date_taken=date(2024, 1, 1))
+            db.session.add_all([debt, credit])
+            db.session.commit()
+            debt_id, credit_id = debt.id, credit.id
+
+        with self.app.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        response = self.app.post('/debt/settle', json={'creditId': debt_id, 'amountToPay': 60, 'datePaid': '2024-02-01'})
+        self.assertEqual(response.json, {'amountPaid': '60.00/=', 'progress': '60.00%'})
+
+        response = self.app.post('/debt/settle', json={'creditId': debt_id, 'amountToPay': 50, 'datePaid': '2024-02-02'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Paid amount exceeds the debt amount.')
+
+        response = self.app.post('/debt/settle', json={'creditId': debt_id, 'amountToPay': 40, 'datePaid': '2024-02-03'})
+        self.assertEqual(response.json['progress'], '100.00%')
+
+        self.assertEqual(self.app.post('/credit/settle', json={'creditId': 999, 'amountToPay': 1, 'datePaid': '2024-02-01'}).status_code, 403)
+        self.assertEqual(self.app.post('/credit/settle', json={'creditId': credit_id, 'amountToPay': 20.1, 'datePaid': '2024-02-01'}).status_code, 200)
+
+        with app.app_context():
+            debt = db.session.get(Debt, debt_id)
+            self.assertTrue(debt.is_paid)
+            self.assertEqual(debt.amount_payed, Decimal('100.00'))
+            self.assertEqual(CreditorPayment.query.filter_by(debt_id=debt_id).count(), 2)
+            self.assertEqual(CashOut.query.filter_by(settled_debt_id=debt_id).count(), 2)
+            self.assertEqual(db.session.get(Credit, credit_id).amount_paid, Decimal('20.10'))
+
+    def test_concurrent_settlements(self):
+        """
+        Test that concurrent settlements of one credit never over-pay it or lose a payment.
+        """
+        with app.app_context():
+            user_id = self.create_user()
+            credit = Credit(user_id=user_id, debtor='Friend', amount=1000, date_taken=date(2024, 1, 1))
+            db.session.add(credit)
+            db.session.commit()
+            credit_id = credit.id
+
+        outcomes = []
+        lock = threading.Lock()
+
+        def settle_many():
+            with app.app_context():
+                for _ in range(5):
+                    try:
+                        settle_credit_payment(user_id, credit_id, 30, date(2024, 2, 1))
+                        outcome = 'paid'
+                    except ValueError as e:
+                        outcome = str(e)
+                    with lock:
+                        outcomes.append(outcome)
+                db.session.remove()
+
+        threads = [threading.Thread(target=settle_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        paid = outcomes.count('paid')
+        self.assertEqual(paid, 33)
+        self.assertEqual(len(outcomes), 40)
+        self.assertTrue(all(outcome in ('paid', 'Paid amount exceeds the credit amount.') for outcome in outcomes))
+
+        with app.app_context():
+            credit = db.session.get(Credit, credit_id)
+            self.assertEqual(credit.amount_paid, Decimal('990.00'))
+            self.assertFalse(credit.is_paid)
+            self.assertEqual(DebtorPayment.query.filter_by(credit_id=credit_id).count(), paid)
+            self.assertEqual(CashIn.query.filter_by(settled_credit_id=credit_id).count(), paid)
+
+    def test_reconcile(self):
+        """
+        Test reporting and repairing drifted paid amounts, incrementally and in full.
+        """
+        with app.app_context():
+            user_id = self.create_user()
+            credit = Credit(user_id=user_id, debtor='Friend', amount=100, date_taken=date(2024, 1, 1))
+            other_credit = Credit(user_id=user_id, debtor='Neighbour', amount=10, date_taken=date(2024, 1, 1))
+            debt = Debt(user_id=user_id, creditor='Bank', amount=50, date_taken=date(2024, 1, 1))
+            db.session.add_all([credit, other_credit, debt])
+            db.session.commit()
+            credit_id, other_credit_id, debt_id = credit.id, other_credit.id, debt.id
+
+            settle_credit_payment(user_id, credit_id, 30, date(2024, 2, 1))
+            settle_credit_payment(user_id, credit_id, 20, date(2024, 2, 2))
+            settle_credit_payment(user_id, other_credit_id, 10, date(2024, 2, 2))
+
+            def corrupt(model, record_id, **values):
+                db.session.execute(model.__table__.update().where(model.id == record_id).values(**values))
+                db.session.commit()
+
+            corrupt(Credit, credit_id, amount_paid=80)
+            corrupt(Debt, debt_id, amount_payed=50, is_paid=True)
+
+            expected = [
+                ('credit', credit_id, 'amount_paid', Decimal('80.00'), Decimal('50.00')),
+                ('debt', debt_id, 'amount_payed', Decimal('50.00'), Decimal('0.00')),
+                ('debt', debt_id, 'is_paid', True, False),
+            ]
+            summary = lambda drift: [(entry['table'], entry['id'], entry['column'], entry['stored'], entry['actual']) for entry in drift]
+
+            self.assertEqual(summary(reconcile_settlements(repair=False, batch_size=1)), expected)
+            self.assertEqual(db.session.get(Credit, credit_id).amount_paid, Decimal('80.00'))
+
+            self.assertEqual(summary(reconcile_settlements(batch_size=1)), expected)
+            db.session.expire_all()
+            self.assertEqual(db.session.get(Credit, credit_id).amount_paid, Decimal('50.00'))
+            self.assertFalse(db.session.get(Debt, debt_id).is_paid)
+            self.assertTrue(db.session.get(Credit, other_credit_id).is_paid)
+            self.assertEqual(reconcile_settlements(), [])
+
+            # Incremental runs only look at records paid against since the last run
+            corrupt(Credit, credit_id, amount_paid=0)
+            self.assertEqual(reconcile_settlements(repair=False), [])
+            self.assertEqual(len(reconcile_settlements(repair=False, full=True)), 1)
+
+            corrupt(Debt, debt_id, amount_payed=5)
+            settle_credit_payment(user_id, credit_id, 10, date(2024, 2, 3))
+            self.assertEqual(summary(reconcile_settlements()), [('credit', credit_id, 'amount_paid', Decimal('10.00'), Decimal('60.00'))])
+            self.assertEqual(summary(reconcile_settlements(full=True)), [('debt', debt_id, 'amount_payed', Decimal('5.00'), Decimal('0.00'))])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# tests/test_summaries.py
+"""
+Unit tests for the multi-period summaries.
+
+This module contains unit tests for the period helpers, the grouped summary query and the
+/period_summary endpoint.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestSummaries: A class containing unit tests for the period summaries.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date
+from sqlalchemy import event
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, CashOut
+from calculations import calculate_savings_between_dates
+from summaries import last_periods, period_summaries
+
+class TestSummaries(unittest.TestCase):
+    """
+    A class containing unit tests for the period summaries.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_last_periods(self):
+        """
+        Test the calendar periods ending with the current one.
+        """
+        today = date(2024, 2, 14)
+
+        self.assertEqual(last_periods('month', 2, today), [
+            ('2024-01', date(2024, 1, 1), date(2024, 1, 31)),
+            ('2024-02', date(2024, 2, 1), date(2024, 2, 29)),
+        ])
+        self.assertEqual(last_periods('quarter', 2, today), [
+            ('2023-Q4', date(2023, 10, 1), date(2023, 12, 31)),
+            ('2024-Q1', date(2024, 1, 1), date(2024, 3, 31)),
+        ])
+        self.assertEqual(last_periods('week', 1, today), [('2024-02-12', date(2024, 2, 12), date(2024, 2, 18))])
+
+        with self.assertRaises(ValueError):
+            last_periods('year', 1, today)
+
+    def test_summaries_in_one_query(self):
+        """
+        Test that twelve months are summarized in one query and agree with the per-range calculation.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, rent])
+            db.session.commit()
+
+            periods = last_periods('month', 12)
+            for index, (_, start_date, _) in enumerate(periods):
+                db.session.add_all([
+                    CashIn(user_id=user.id, income_id=income.id, amount=1000.00 + index, date=start_date),
+                    CashOut(user_id=user.id, expense_id=rent.id, amount=300.50, date=start_date),
+                ])
+            db.session.commit()
+            user_id = user.id
+
+            statements = []
+            engine = db.engine
+            count = lambda *args: statements.append(args[2])
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                summaries = period_summaries(user_id, periods)
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(len(summaries), 12)
+            for summary in summaries:
+                savings, savings_percent = calculate_savings_between_dates(user_id, summary['start_date'], summary['end_date'])
+                self.assertEqual(summary['savings'], savings)
+                self.assertEqual(summary['savings_percent'], savings_percent)
+            self.assertEqual(summaries[-1]['income'], Decimal('1011.00'))
+            self.assertEqual(summaries[-1]['expense'], Decimal('300.50'))
+
+            with self.app.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+
+            response = self.app.get('/period_summary?unit=month&count=3')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([period['label'] for period in response.json['periods']], [label for label, _, _ in periods[-3:]])
+
+            response = self.app.post('/period_summary', json={'periods': [
+                {'label': 'first', 'from': periods[0][1].isoformat(), 'to': periods[0][2].isoformat()}
+            ]})
+            self.assertEqual(response.json['periods'][0]['savings'], str(summaries[0]['savings']))
+
+            self.assertEqual(self.app.get('/period_summary?unit=year').status_code, 400)
+            self.assertEqual(self.app.get('/period_summary?unit=week&count=20000').status_code, 400)
+            self.assertEqual(self.app.post('/period_summary').json, {'periods': []})
+            self.assertEqual(self.app.post('/period_summary', data='not json').json, {'periods': []})
+
+            # Overlapping periods are each summarized in full
+            response = self.app.post('/period_summary', json={'periods': [
+                {'label': 'all', 'from': periods[0][1].isoformat(), 'to': periods[-1][2].isoformat()},
+                {'label': 'last', 'from': periods[-1][1].isoformat(), 'to': periods[-1][2].isoformat()},
+            ]})
+            self.assertEqual(response.json['periods'][0]['income'], str(sum(summary['income'] for summary in summaries)))
+            self.assertEqual(response.json['periods'][1]['income'], '1011.00')
+
+if __name__ == '__main__':
+    unittest.main()
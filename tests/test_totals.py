@@ -0,0 +1,96 @@
+# tests/test_totals.py
+"""
+Unit tests for the lifetime income and expense counters.
+
+This module contains unit tests that check the UserTotals counters follow CashIn/CashOut
+writes and that the reconciliation reports and repairs drift.
+
+Note:
+    These tests are designed to be executed using the unittest framework.
+
+Classes:
+    TestTotals: A class containing unit tests for the lifetime counters.
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import date, timedelta
+from app import app, db
+from models import User, IncomeType, Income, Expense, CashIn, CashOut, UserTotals
+from totals import lifetime_totals, reconcile_user_totals
+
+class TestTotals(unittest.TestCase):
+    """
+    A class containing unit tests for the lifetime counters.
+    """
+
+    def setUp(self):
+        """
+        Set up the test environment.
+
+        This method configures the Flask app for testing, creates a separate
+        in-memory SQLite database, and prepares a test client for making requests.
+        """
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.app = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+
+        This method removes the test database and resets the app context after each test.
+        """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_counters_follow_writes_and_reconcile(self):
+        """
+        Test that the counters follow inserts, edits and deletes, and that drift is repaired.
+        """
+        with app.app_context():
+            user = User(first_name='test_user', last_name='test_user', password='test_password', email='test@example.com')
+            income_type = IncomeType(name='Salary')
+            db.session.add_all([user, income_type])
+            db.session.commit()
+
+            income = Income(user_id=user.id, name='Monthly Salary', income_type_id=income_type.id)
+            rent = Expense(user_id=user.id, name='Rent')
+            db.session.add_all([income, rent])
+            db.session.commit()
+
+            today = date.today()
+            cash_out = CashOut(user_id=user.id, expense_id=rent.id, amount=100.00, date=today)
+            db.session.add_all([
+                CashIn(user_id=user.id, income_id=income.id, amount=1000.00, date=today - timedelta(days=400)),
+                CashIn(user_id=user.id, income_id=income.id, amount=250.50, date=today),
+                cash_out,
+            ])
+            db.session.commit()
+            self.assertEqual(lifetime_totals(user.id), (Decimal('1250.50'), Decimal('100.00')))
+
+            cash_out.update_transaction('edited', 120.00, today, rent.id)
+            self.assertEqual(lifetime_totals(user.id), (Decimal('1250.50'), Decimal('120.00')))
+
+            cash_out.delete_transaction()
+            counters = db.session.get(UserTotals, user.id)
+            self.assertEqual((counters.total_expense, counters.income_count, counters.expense_count), (Decimal('0.00'), 2, 0))
+            self.assertEqual(reconcile_user_totals(), [])
+
+            # Drift introduced behind the counters' back is reported and repaired
+            counters.total_income = Decimal('1.00')
+            db.session.commit()
+
+            drift = reconcile_user_totals(repair=False)
+            self.assertEqual(drift, [{'user_id': user.id, 'column': 'total_income', 'stored': Decimal('1.00'), 'actual': Decimal('1250.50')}])
+            self.assertEqual(lifetime_totals(user.id)[0], Decimal('1.00'))
+
+            reconcile_user_totals()
+            self.assertEqual(lifetime_totals(user.id)[0], Decimal('1250.50'))
+            self.assertEqual(reconcile_user_totals(), [])
+
+if __name__ == '__main__':
+    unittest.main()
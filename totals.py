@@ -0,0 +1,110 @@
+from decimal import Decimal
+from sqlalchemy import func, select
+from models import db, UserTotals
+from ledger import INCOME, EXPENSE, register_delta_listener
+from archive import ledger_rows
+from counters import increment_counters
+
+@register_delta_listener
+def apply_total_deltas(connection, deltas):
+    """
+    Fold a batch of ledger deltas into the per-user lifetime counters.
+
+    Args:
+        connection (Connection): The connection of the transaction that wrote the ledger rows.
+        deltas (list): LedgerDelta instances.
+    """
+    table = UserTotals.__table__
+
+    # Net change per user: [income, expense, income count, expense count]
+    changes = {}
+    for delta in deltas:
+        change = changes.setdefault(delta.user_id, [Decimal('0.00'), Decimal('0.00'), 0, 0])
+        if delta.kind == INCOME:
+            change[0] += delta.amount
+            change[2] += delta.count
+        else:
+            change[1] += delta.amount
+            change[3] += delta.count
+
+    for user_id, (income, expense, income_count, expense_count) in changes.items():
+        updated = increment_counters(connection, table, table.c.user_id == user_id, {
+            'total_income': income,
+            'total_expense': expense,
+            'income_count': income_count,
+            'expense_count': expense_count,
+        })
+
+        if updated == 0:
+            connection.execute(table.insert().values(
+                user_id=user_id,
+                total_income=income,
+                total_expense=expense,
+                income_count=income_count,
+                expense_count=expense_count
+            ))
+
+def lifetime_totals(user_id):
+    """
+    Look up a user's lifetime income and expense.
+
+    Args:
+        user_id (int): The user's ID.
+
+    Returns:
+        tuple: (total_income, total_expense) as Decimals, zero for users without transactions.
+    """
+    row = db.session.query(UserTotals.total_income, UserTotals.total_expense).filter(
+        UserTotals.user_id == user_id
+    ).first()
+
+    if row is None:
+        return Decimal('0.00'), Decimal('0.00')
+    return tuple(row)
+
+def reconcile_user_totals(repair=True):
+    """
+    Recompute every user's lifetime counters from the ledger and compare them with the stored ones.
+
+    Args:
+        repair (bool, optional): Overwrite the counters that drifted. Defaults to True.
+
+    Returns:
+        list: One dictionary per drifted counter with the keys 'user_id', 'column', 'stored' and 'actual'.
+    """
+    columns = ['total_income', 'total_expense', 'income_count', 'expense_count']
+    actual = {}
+
+    for kind, amount_column, count_column in ((INCOME, 'total_income', 'income_count'), (EXPENSE, 'total_expense', 'expense_count')):
+        # Archived transactions still count towards the lifetime totals
+        rows = ledger_rows(kind)
+        grouped = db.session.execute(
+            select(rows.c.user_id, func.sum(rows.c.amount), func.count(rows.c.id)).group_by(rows.c.user_id)
+        ).all()
+        for user_id, amount, count in grouped:
+            totals = actual.setdefault(user_id, dict.fromkeys(columns, 0))
+            totals[amount_column] = amount
+            totals[count_column] = count
+
+    stored = {
+        row.user_id: {column: getattr(row, column) for column in columns}
+        for row in db.session.execute(select(UserTotals.__table__)).all()
+    }
+
+    drift = []
+    for user_id in sorted(set(actual) | set(stored)):
+        expected = actual.get(user_id, dict.fromkeys(columns, 0))
+        current = stored.get(user_id, dict.fromkeys(columns, 0))
+        for column in columns:
+            if Decimal(expected[column] or 0) != Decimal(current[column] or 0):
+                drift.append({'user_id': user_id, 'column': column, 'stored': current[column], 'actual': expected[column]})
+
+        if repair and user_id not in stored:
+            db.session.add(UserTotals(user_id=user_id, **expected))
+        elif repair and any(entry['user_id'] == user_id for entry in drift):
+            db.session.execute(UserTotals.__table__.update().where(UserTotals.user_id == user_id).values(**expected))
+
+    if repair:
+        db.session.commit()
+
+    return drift
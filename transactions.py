@@ -1,5 +1,4 @@
 from models import db
-from decimal import Decimal
 
 def add_income(user_id, income_name, income_type_id):
     """
@@ -15,6 +14,8 @@ def add_income(user_id, income_name, income_type_id):
 
     """
     from models import Income
+    from categories import find_category
+    from ledger import INCOME
 
     # Convert income_name to title case and remove leading/trailing whitespace
     income_name = income_name.strip().title()
@@ -23,8 +24,7 @@ def add_income(user_id, income_name, income_type_id):
         return "Empty strings are not allowed"
 
     # Check if the income already exists
-    existing_income = Income.query.filter_by(user_id=user_id, name=income_name).first()
-    if existing_income:
+    if find_category(user_id, INCOME, income_name):
         return "Income transaction already exists."
     
     # Create a new income transaction instance
@@ -51,13 +51,14 @@ def add_expense(user_id, expense_name):
 
     """
     from models import Expense
+    from categories import find_category
+    from ledger import EXPENSE
 
     # Convert expense_name to title case and remove leading/trailing whitespace
     expense_name = expense_name.strip().title()
     
     # Check if the expense already exists
-    existing_expense = Expense.query.filter_by(user_id=user_id, name=expense_name).first()
-    if existing_expense:
+    if find_category(user_id, EXPENSE, expense_name):
         return "Expense transaction already exists."
     
     # Create a new expense transaction instance
@@ -86,7 +87,8 @@ def calculate_income_totals(user_id, start_date=None, end_date=None):
         dict: A dictionary where keys are income category names (str) and values are the corresponding total amounts (float).
     """
     from datetime import date
-    from models import Income, CashIn
+    from ledger import INCOME
+    from breakdown import category_breakdown, breakdown_amounts
 
     # If start_date is not provided, set it to the beginning of the current month
     if not start_date:
@@ -97,30 +99,8 @@ def calculate_income_totals(user_id, start_date=None, end_date=None):
     if not end_date:
         end_date = date.today()
 
-    # Query all income categories for the user
-    income_categories = Income.query.filter_by(user_id=user_id).all()
-
-    # Initialize a dictionary to store income category names and their corresponding total amounts
-    income_totals = {}
-
-    # Iterate through each income category
-    for category in income_categories:
-        # Query CashIn transactions for the specific income category within the date range
-        total_amount = CashIn.query.filter(
-            CashIn.user_id == user_id,
-            CashIn.income_id == category.id,
-            CashIn.date >= start_date,
-            CashIn.date <= end_date
-        ).with_entities(db.func.sum(CashIn.amount)).scalar()
-
-        # If there are no transactions, set total_amount to 0
-        if total_amount is None:
-            total_amount = 0
-
-        # Add the income category name and total amount to the income_totals dictionary
-        income_totals[category.name] = total_amount
-
-    return income_totals
+    # Every income category of the user with its total (0 without transactions) in one query
+    return breakdown_amounts(category_breakdown(user_id, INCOME, start_date, end_date, include_system=False))
 
 def calculate_income_totals_formatted_debt(user_id, start_date=None, end_date=None):
     """
@@ -134,12 +114,12 @@ def calculate_income_totals_formatted_debt(user_id, start_date=None, end_date=No
             current date.
 
     Returns:
-        dict: A dictionary where keys are income category names (str) and values are the corresponding total amounts (float).
+        dict: A dictionary where keys are income category names (str) and values are (formatted amount, percentage) tuples.
 
     """
     from datetime import date
-    from models import Credit, Debt, CashIn
-    from sqlalchemy import func
+    from ledger import INCOME
+    from breakdown import category_breakdown, format_breakdown
 
     # If start_date is not provided, set it to the beginning of the current month
     if not start_date:
@@ -150,53 +130,8 @@ def calculate_income_totals_formatted_debt(user_id, start_date=None, end_date=No
     if not end_date:
         end_date = date.today()
 
-    income_totals = calculate_income_totals(user_id, start_date, end_date)
-
-    # Sum the amount for the current user's credits settled since the beginning of the month
-    total_amount_paid = db.session.query(func.sum(CashIn.amount)).filter(
-        CashIn.income_id==2,
-        CashIn.user_id == user_id,
-        CashIn.date >= start_date,
-        CashIn.date <= end_date
-    ).scalar()
-
-    if total_amount_paid is None:
-        total_amount_paid = 0 
-    
-    income_totals['Settled Credit'] = total_amount_paid
-
-    # Sum the debt taken the beginning of the month
-    total_amount_taken = db.session.query(func.sum(Debt.amount)).filter(
-        Debt.user_id == user_id,
-        Debt.date_taken >= start_date,
-        Debt.date_taken <= end_date
-    ).scalar()
-
-    if total_amount_taken is None:
-        total_amount_taken = 0
-        
-    income_totals['Debt'] = total_amount_taken 
-
-    # Calculate the total income
-    total_income = sum(income_totals.values())
-
-    # Initialize a dictionary to store formatted amounts and percentages
-    formatted_income_totals = {}
-
-    
-    # Format the amount values and update the income_totals dictionary
-    for category, amount in income_totals.items():
-        formatted_amount = "{:,.2f}/=".format(amount)
-        try:
-            percentage = "{:.2f}".format((amount / total_income) * 100)
-        except:
-            percentage = "{:.2f}".format(0)
-        formatted_income_totals[category] = (formatted_amount, percentage)
-
-    # Replace the original income_totals dictionary with the formatted one
-    income_totals = formatted_income_totals
-
-    return income_totals
+    # The user's categories plus the Settled Credit and Debt buckets in one query, formatted once
+    return format_breakdown(category_breakdown(user_id, INCOME, start_date, end_date))
 
 def calculate_expense_totals(user_id, start_date=None, end_date=None):
     """
@@ -210,10 +145,11 @@ def calculate_expense_totals(user_id, start_date=None, end_date=None):
             current date.
 
     Returns:
-        list: A list of dictionaries, where each dictionary contains 'name', 'amount', and 'percentage' keys.
+        dict: A dictionary where keys are expense category names (str) and values are the corresponding total amounts.
     """
     from datetime import date
-    from models import Expense, CashOut
+    from ledger import EXPENSE
+    from breakdown import category_breakdown, breakdown_amounts
     
     # If start_date is not provided, set it to the beginning of the current month
     if not start_date:
@@ -224,30 +160,38 @@ def calculate_expense_totals(user_id, start_date=None, end_date=None):
     if not end_date:
         end_date = date.today()
 
-    # Query all expense categories for the user
-    expense_categories = Expense.query.filter_by(user_id=user_id).all()
+    # Every expense category of the user with its total (0 without transactions) in one query
+    return breakdown_amounts(category_breakdown(user_id, EXPENSE, start_date, end_date, include_system=False))
 
-    # Initialize a list to store expense category totals
-    expense_totals = {}
+def calculate_expense_totals_formatted_credit(user_id, start_date=None, end_date=None):
+    """
+    Calculate the total expense amounts for each expense category including settled debt and credit given of a user within a specified date range.
 
-    # Iterate through each expense category
-    for category in expense_categories:
-        # Query CashOut transactions for the specific expense category within the date range
-        total_amount = CashOut.query.filter(
-            CashOut.user_id == user_id,
-            CashOut.expense_id == category.id,
-            CashOut.date >= start_date,
-            CashOut.date <= end_date
-        ).with_entities(db.func.sum(CashOut.amount)).scalar()
+    Args:
+        user_id (int): The user's ID for whom expense totals are calculated.
+        start_date (date, optional): The start date of the date range (inclusive). If not provided, it defaults to the
+            beginning of the current month.
+        end_date (date, optional): The end date of the date range (inclusive). If not provided, it defaults to the
+            current date.
 
-        # If there are no transactions, set total_amount to 0
-        if total_amount is None:
-            total_amount = 0
+    Returns:
+        dict: A dictionary where keys are expense category names (str) and values are (formatted amount, percentage) tuples.
+    """
+    from datetime import date
+    from ledger import EXPENSE
+    from breakdown import category_breakdown, format_breakdown
 
-        # Add the income category name and total amount to the income_totals dictionary
-        expense_totals[category.name] = total_amount
+    # If start_date is not provided, set it to the beginning of the current month
+    if not start_date:
+        today = date.today()
+        start_date = date(today.year, today.month, 1)
+
+    # If end_date is not provided, set it to the current date
+    if not end_date:
+        end_date = date.today()
 
-    return expense_totals
+    # The user's categories plus the Settled Debt and Credit buckets in one query, formatted once
+    return format_breakdown(category_breakdown(user_id, EXPENSE, start_date, end_date))
 
 def create_budget(user_id, year, month):
     """
@@ -284,7 +228,7 @@ def add_cash_out_transaction(user_id, amount, date, expense_id, description=None
 
     Args:
         user_id (int): The user's ID associated with the transaction.
-        amount (float): The amount of the cash outflow.
+        amount (float or Decimal): The amount of the cash outflow.
         date (date): The date of the transaction.
         expense_id (int): The ID of the associated expense.
         description (str, optional): A description of the transaction.
@@ -298,52 +242,26 @@ def add_cash_out_transaction(user_id, amount, date, expense_id, description=None
         ValueError: If the debt is already paid.
         ValueError: If the paid amount exceeds the debt amount.
     """
-    from models import Expense, CashOut, Debt
+    from models import CashOut
+    from money import parse_amount
+    from categories import get_category
+    from ledger import EXPENSE
+    from settlements import SettlementNotFound, settle_debt_payment
+
+    # Work with an exact two-place amount, whatever the caller passed
+    amount = parse_amount(amount)
 
     if expense_id:
-        expense = Expense.query.get(expense_id)
+        expense = get_category(user_id, EXPENSE, expense_id)
         if expense and expense.user_id == 0:
             if not settled_debt_id:
                 raise ValueError("For debt payment transactions, settled_debt must be provided.")
 
-            # Query the debt being paid by its ID
-            debt_to_pay = Debt.query.get(settled_debt_id)
-            if not debt_to_pay:
-                raise ValueError("Invalid debt ID provided for settlement.")
-
-            if debt_to_pay.is_paid:
-                raise ValueError("The debt is already paid.")
-
-            if debt_to_pay.amount_payed + amount > debt_to_pay.amount:
-                raise ValueError("Paid amount exceeds the debt amount.")
-
-            # Add cash out with all fields populated
-            cash_out = CashOut(
-                user_id=user_id,
-                amount=amount,
-                date=date,
-                expense_id=expense_id,
-                description=description,
-                settled_debt_id=settled_debt_id)
-
+            # Raise the paid amount in the database and record the payment and the cash out with it
             try:
-                db.session.add(cash_out)
-                db.session.commit()
-
-                # Update the debt being paid by this transaction
-                debt_to_pay.amount_payed += amount
-
-                # If paid amount equals or exceeds debt amount, mark the debt as paid
-                if debt_to_pay.amount_payed >= debt_to_pay.amount:
-                    debt_to_pay.is_paid = True
-
-                db.session.commit()
-
-            except Exception as e:
-                db.session.rollback()
-                return str(e)
-
-            return cash_out
+                return settle_debt_payment(user_id, settled_debt_id, amount, date, expense_id=expense_id, description=description).transaction
+            except SettlementNotFound:
+                raise ValueError("Invalid debt ID provided for settlement.")
 
     cash_out = CashOut(
         user_id=user_id,
@@ -368,7 +286,7 @@ def add_cash_in_transaction(user_id, amount, date, income_id, description=None,
 
     Args:
         user_id (int): The user's ID associated with the transaction.
-        amount (float): The amount of the cash inflow.
+        amount (float or Decimal): The amount of the cash inflow.
         date (date): The date of the transaction.
         income_id (int): The ID of the associated income.
         description (str, optional): A description of the transaction.
@@ -382,53 +300,26 @@ def add_cash_in_transaction(user_id, amount, date, income_id, description=None,
         ValueError: If the credit is already settled.
         ValueError: If the received amount exceeds the credit amount.
     """
-    from models import Income, CashIn, Credit
+    from models import CashIn
+    from money import parse_amount
+    from categories import get_category
+    from ledger import INCOME
+    from settlements import SettlementNotFound, settle_credit_payment
+
+    # Work with an exact two-place amount, whatever the caller passed
+    amount = parse_amount(amount)
 
     if income_id:
-        income = Income.query.get(income_id)
+        income = get_category(user_id, INCOME, income_id)
         if income and income.user_id == 0:
             if not settled_credit_id:
                 raise ValueError("For credit settlement transactions, settled_credit_id must be provided.")
 
-            # Query the credit being settled by its ID
-            credit_to_settle = Credit.query.get(settled_credit_id)
-            if not credit_to_settle:
-                raise ValueError("Invalid credit ID provided for settlement.")
-
-            if credit_to_settle.is_paid:
-                raise ValueError("The credit is already settled.")
-
-            if credit_to_settle.amount_paid + Decimal(amount) > credit_to_settle.amount:
-                raise ValueError("Received amount exceeds the credit amount.")
-
-            # Add cash in with all fields populated
-            cash_in = CashIn(
-                user_id=user_id,
-                amount=amount,
-                date=date,
-                income_id=income_id,
-                description=description,
-                settled_credit_id=settled_credit_id
-            )
-
+            # Raise the paid amount in the database and record the payment and the cash in with it
             try:
-                db.session.add(cash_in)
-                db.session.commit()
-
-                # Update the credit being settled by this transaction
-                credit_to_settle.amount_paid += Decimal(amount)
-
-                # If received amount equals or exceeds credit amount, mark the credit as settled
-                if credit_to_settle.amount_paid >= credit_to_settle.amount:
-                    credit_to_settle.is_paid = True
-
-                db.session.commit()
-
-            except Exception as e:
-                db.session.rollback()
-                return str(e)
-
-            return cash_in
+                return settle_credit_payment(user_id, settled_credit_id, amount, date, income_id=income_id, description=description).transaction
+            except SettlementNotFound:
+                raise ValueError("Invalid credit ID provided for settlement.")
 
     cash_in = CashIn(
         user_id=user_id,
@@ -0,0 +1,55 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, CacheVersion
+from counters import increment_counters
+
+# The version bumped by writes that affect every user, e.g. to a shared system category
+ALL_USERS = 0
+
+def bump_versions(connection, users):
+    """
+    Increment the cache versions of some users in the transaction that wrote their rows.
+
+    The new versions become visible to other processes when that transaction commits, together
+    with the rows, and make them miss on their cached results and categories of those users.
+
+    Args:
+        connection (Connection): The connection of the writing transaction.
+        users (set): The user IDs; None stands for every user.
+    """
+    table = CacheVersion.__table__
+
+    # In a fixed order, so concurrent writers lock the rows in the same order
+    for user_id in sorted({ALL_USERS if user_id is None else user_id for user_id in users}):
+        if increment_counters(connection, table, table.c.user_id == user_id, {'version': 1}) == 0:
+            connection.execute(table.insert().values(user_id=user_id, version=1))
+
+def current_versions(user_id):
+    """
+    Return the cache versions a user's cached entries must have been computed at.
+
+    The versions are read once per session transaction, so a request pays for one primary key
+    lookup however many cached calculations and category lookups it makes.
+
+    Args:
+        user_id (int): The user's ID.
+
+    Returns:
+        tuple: (the version of every user, the version of this user).
+    """
+    versions = db.session.info.setdefault('cache_versions', {})
+    if user_id not in versions:
+        table = CacheVersion.__table__
+        rows = dict(db.session.execute(
+            select(table.c.user_id, table.c.version).where(table.c.user_id.in_((ALL_USERS, user_id)))
+        ).all())
+        versions[user_id] = (rows.get(ALL_USERS, 0), rows.get(user_id, 0))
+    return versions[user_id]
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_versions(session, transaction):
+    """
+    Read the versions again in the next transaction, which may see newer commits.
+    """
+    if transaction.parent is None:
+        session.info.pop('cache_versions', None)